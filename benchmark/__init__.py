@@ -0,0 +1 @@
+''' Benchmarks, run each module with python -m benchmark.<module> from the root of the repository '''
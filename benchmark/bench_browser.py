@@ -0,0 +1,42 @@
+''' Time the browser launch to the authorization token against the real portal, with and without the lean browser mode
+
+Requires Chromium and the credentials in the environment variables SEY_USERNAME and SEY_PASSWORD.
+'''
+
+import os
+import tempfile
+import time
+
+from sey_meter_data_web_scraping.utils import SeyWebScraper
+
+RUNS = 3
+
+
+def login(folder, lean_browser):
+    scrapper = SeyWebScraper(folder, save_json=False, lean_browser=lean_browser)
+
+    try:
+        start = time.perf_counter()
+        scrapper.login(os.environ["SEY_USERNAME"], os.environ["SEY_PASSWORD"])
+        return time.perf_counter() - start
+    finally:
+        scrapper.close()
+
+
+def main():
+    results = {}
+
+    with tempfile.TemporaryDirectory() as folder:
+        results["default"] = [login(tempfile.mkdtemp(dir=folder), False) for _ in range(RUNS)]
+
+        # The first lean run starts from an empty profile, the next ones reuse it
+        lean_folder = tempfile.mkdtemp(dir=folder)
+        results["lean, cold profile"] = [login(lean_folder, True)]
+        results["lean, warm profile"] = [login(lean_folder, True) for _ in range(RUNS)]
+
+    for name, times in results.items():
+        print(f"{name:20s}: {min(times):5.1f} s best, {sum(times) / len(times):5.1f} s mean over {len(times)} run(s)")
+
+
+if __name__ == '__main__':
+    main()
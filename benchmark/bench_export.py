@@ -0,0 +1,114 @@
+''' Benchmark the import time of the package, the parsing of the responses and the offline export of the days
+
+The fixtures of test/data are parsed as is, the multi-year series are generated. With --record, the results are
+appended as a JSON line to a file, to track them from one version to the other.
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sey_meter_data_web_scraping.export import export_days, read_json_file
+from sey_meter_data_web_scraping.tariffs import load_tariffs
+from test.fake_sey import DEFAULT_CONTRACTS, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, generate_timeseries
+
+FIXTURES = ("test/data/electrical_data_20250818.json", "test/data/water_json_data_20250818.json")
+YEARS = 2
+IMPORT_RUNS = 5
+
+IMPORTS = {
+    "saver": "from sey_meter_data_web_scraping.utils import SeyDataSaver",
+    # Loaded by the first scraper created
+    "scraper": "import requests; from selenium import webdriver; from selenium.webdriver.support.ui import WebDriverWait",
+}
+
+
+def import_time(statement):
+    ''' Best wall time of the statement in a new interpreter, where nothing is imported yet '''
+
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    return min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout) for _ in range(IMPORT_RUNS))
+
+
+def parse_throughput(filenames, repeat):
+    ''' Return the samples and the bytes parsed per second '''
+
+    size = sum(map(os.path.getsize, filenames))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        samples = sum(len(series) for filename in filenames for series in read_json_file(filename))
+    elapsed = time.perf_counter() - start
+    return samples * repeat / elapsed, size * repeat / elapsed
+
+
+def write_years(folder, years):
+    ''' Save one response per contract and month over the years, as a backfill would '''
+
+    first = datetime(2024 - years, 1, 1)
+    month = first
+    while month.year < 2024:
+        next_month = (month + timedelta(days = 32)).replace(day = 1)
+        for prefix, contract_id in (("electrical_data", ELECTRICAL_CONTRACT_ID), ("water_json_data", WATER_CONTRACT_ID)):
+            with open(os.path.join(folder, f"{prefix}_{month:%Y%m%d}_{next_month - timedelta(days = 1):%Y%m%d}.json"), "w", encoding="utf-8") as f:
+                json.dump(generate_timeseries(DEFAULT_CONTRACTS[contract_id], month, next_month - timedelta(minutes = 1)), f)
+        month = next_month
+
+    return first, datetime(2023, 12, 31)
+
+
+def export_throughput(folder, date_from, date_to, max_workers):
+    ''' Return the days exported per second '''
+
+    for filename in os.listdir(folder):
+        if filename.endswith(".tsv"):
+            os.remove(os.path.join(folder, filename))
+
+    tariffs = load_tariffs()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        export_days(folder, date_from, date_to, tariffs, max_workers=max_workers)
+    return ((date_to - date_from).days + 1) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", help="Append the results as a JSON line to this file")
+    args = parser.parse_args()
+
+    results = {"time": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0]}
+
+    for name, statement in IMPORTS.items():
+        results[f"import_{name}_ms"] = round(import_time(statement) * 1000, 1)
+        print(f"import {name}: {results[f'import_{name}_ms']:.1f} ms")
+
+    samples, size = parse_throughput(FIXTURES, 200)
+    results["parse_fixtures_samples_per_s"] = round(samples)
+    print(f"parse test/data: {samples:,.0f} samples/s, {size / 1e6:.2f} MB/s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        date_from, date_to = write_years(folder, YEARS)
+        files = [os.path.join(folder, filename) for filename in os.listdir(folder)]
+        samples, size = parse_throughput(files, 1)
+        results["parse_years_samples_per_s"] = round(samples)
+        print(f"parse {YEARS} years ({len(files)} files): {samples:,.0f} samples/s, {size / 1e6:.2f} MB/s")
+
+        # The days one after the other, then in parallel with at least two processes
+        for mode, max_workers in (("sequential", 1), ("parallel", max(2, os.cpu_count() or 1))):
+            days = export_throughput(folder, date_from, date_to, max_workers)
+            results[f"export_{mode}_days_per_s"] = round(days, 1)
+            print(f"export {YEARS} years, {mode} ({max_workers} worker(s)): {days:.1f} days/s")
+
+    if args.record:
+        with open(args.record, "a", encoding="utf-8") as f:
+            f.write(json.dumps(results) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+''' Benchmark the concurrent fetching of the contracts against a local SEY stand-in with injected latency '''
+
+import tempfile
+import time
+from datetime import datetime
+
+from sey_meter_data_web_scraping.utils import SeyScraper
+from test.fake_sey import SUBJECT_ID, FakeSeyServer
+
+LATENCY = 0.25  # Seconds added to every request by the stand-in
+CONTRACTS = {f"contract-{i}": ["1-1:1.29.0*255", "1-1:2.29.0*255"] for i in range(4)}
+
+
+def collect(server, folder, max_workers, date_from, date_to):
+    scrapper = SeyScraper(folder, base_url=server.url, max_workers=max_workers)
+    scrapper._set_header({"Authorization": server.token})
+
+    try:
+        start = time.perf_counter()
+        scrapper.collect_contracts(list(CONTRACTS), SUBJECT_ID, date_from, date_to, chunk_days=31)
+        return time.perf_counter() - start
+    finally:
+        scrapper.close()
+
+
+def main():
+    date_from, date_to = datetime(2025, 1, 1), datetime(2025, 3, 31)  # 3 chunks per contract
+
+    with tempfile.TemporaryDirectory() as folder, FakeSeyServer(contracts=CONTRACTS, latency=LATENCY) as server:
+        print(f"{len(CONTRACTS)} contracts, 3 chunks each, {LATENCY * 1000:.0f} ms of latency per request")
+
+        for max_workers in (1, 2, 4, 12):
+            server.requests.clear()
+            elapsed = collect(server, folder, max_workers, date_from, date_to)
+            print(f"max_workers={max_workers:2d}: {len(server.requests)} requests in {elapsed:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
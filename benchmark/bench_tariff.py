@@ -0,0 +1,67 @@
+''' Benchmark the classification and pricing of a synthetic multi-year hourly series '''
+
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from sey_meter_data_web_scraping.tariffs import TariffSchedule
+
+YEARS = 5
+
+HIGH_PRICE = (16.76 + 15.31 + 0.59 + 0.25 + 2.49 + 0.6 + 0.022 + 0.76 + 0.7 + 0.6) * 1.081 / 100.0
+LOW_PRICE = (14.32 + 9.31 + 0.59 + 0.25 + 2.49 + 0.6 + 0.022 + 0.76 + 0.7 + 0.6) * 1.081 / 100.0
+
+
+def schedule_config():
+    periods = []
+    for year in range(2021, 2021 + YEARS):
+        periods.append({
+            "valid_from": f"{year}-01-01",
+            "high_tariff": [
+                {"weekdays": [0, 1, 2, 3], "hours": [[6, 22]]},
+                {"weekdays": [4, 5, 6], "hours": [[10, 13], [17, 22]]},
+            ],
+            "holidays": [f"{year}-01-01", f"{year}-08-01", f"{year}-12-25"],
+            "prices": {"electricity_consumption": {"unit": "ct", "vat": 0.081, "high": [16.76 + year - 2021], "low": [14.32 + year - 2021]}},
+        })
+    return {"periods": periods}
+
+
+def legacy(local_times):
+    ''' Per-sample datetime arithmetic, as SeyDataSaver did before the lookup tables '''
+
+    mask = bytearray(len(local_times))
+    prices = array('d', bytes(8 * len(local_times)))
+    for i, t in enumerate(local_times):
+        # Timestamp of the end of the hour shifted back to its start, as for each API sample
+        dt = datetime.fromtimestamp(t + 3600, timezone.utc) - timedelta(hours=1)
+        if dt.weekday() in range(0, 4):
+            high = dt.hour >= 6 and dt.hour < 22
+        else:
+            high = (dt.hour >= 10 and dt.hour < 13) or (dt.hour >= 17 and dt.hour < 22)
+        mask[i] = high
+        prices[i] = HIGH_PRICE if high else LOW_PRICE
+    return mask, prices
+
+
+def main():
+    start = int(datetime(2021, 1, 1, tzinfo=timezone.utc).timestamp())
+    local_times = array('q', range(start, start + YEARS * 365 * 86400, 3600))
+    print(f"{len(local_times)} hourly samples over {YEARS} years")
+
+    t = time.perf_counter()
+    legacy(local_times)
+    print(f"datetime per sample:  {time.perf_counter() - t:.3f} s")
+
+    t = time.perf_counter()
+    schedule = TariffSchedule(schedule_config())
+    compiled = time.perf_counter() - t
+
+    t = time.perf_counter()
+    schedule.high_tariff_mask(local_times)
+    schedule.prices("electricity_consumption", local_times)
+    print(f"hour-of-week lookup:  {time.perf_counter() - t:.3f} s (+ {compiled * 1000:.2f} ms to compile {YEARS} periods)")
+
+
+if __name__ == '__main__':
+    main()
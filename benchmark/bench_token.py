@@ -0,0 +1,45 @@
+''' Benchmark the extraction of the authorization token from a performance log of a login into the portal '''
+
+import json
+import time
+
+from sey_meter_data_web_scraping.utils import SeyWebScraper
+from test.fake_sey import generate_performance_log
+
+TOKEN = "Bearer header.payload.signature"
+REPEAT = 20
+
+
+def legacy(scrapper, logs):
+    ''' Parse every event and walk it for an Authorization key, as the scraper did before the targeted scan '''
+
+    for entry in logs:
+        log = json.loads(entry["message"])["message"]
+        l = list(scrapper._findkeys(log, "Authorization"))
+        if len(l) > 0:
+            return { "Authorization" : str(l[0]) }
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = function(*args)
+    return (time.perf_counter() - start) / REPEAT, result
+
+
+def main():
+    scrapper = SeyWebScraper(".", save_json=False)
+    scrapper.close()
+
+    for events in (1000, 5000, 20000):
+        logs = generate_performance_log(TOKEN, events)
+
+        legacy_time, legacy_header = measure(legacy, scrapper, logs)
+        targeted_time, header = measure(scrapper._get_authorization_token_id, logs)
+        assert header == legacy_header == {"Authorization": TOKEN}
+
+        print(f"{len(logs):6d} events: legacy {legacy_time * 1000:8.2f} ms, targeted {targeted_time * 1000:7.2f} ms ({legacy_time / targeted_time:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
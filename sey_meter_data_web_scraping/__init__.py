@@ -1,22 +1,294 @@
 ''' Entry file '''
 
-from .utils import SeyDataSaver, SeyWebScraper
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 
-def collect_meterdatavalues(username, password, electrical_contract_id, water_contract_id, subject_id, data_folder, dt):
-    ''' Collect the meter data values '''
+from .daemon import SeyDaemon
+from .export import export_days, index_json_files
+from .gaps import coalesce_days, find_gaps
+from .response_cache import ResponseCache
+from .series import SAMPLE_INTERVAL
+from .store import SeyStore
+from .token_cache import TokenCache
+from .utils import ARTIFACTS_ON_FAILURE, ELECTRICAL_JSON_FILENAME, HOURLY_AGGREGATION, WATER_JSON_FILENAME, SeyDataSaver, SeyWebScraper
+
+LOGIN_ENGINE_SELENIUM = "selenium"
+LOGIN_ENGINE_HTTP = "http"
+
+@dataclass
+class CollectOptions:
+    ''' Options of the collection, built once from the settings and shared by the entry points '''
+
+    token_cache: bool = True
+    login_engine: str = LOGIN_ENGINE_SELENIUM
+    keycloak: dict = None  # issuer, client_id and redirect_uri of the HTTP login engine
+    browser_pool: object = None
+    tariffs: object = None
+    save_json: bool = True
+    compress_json: bool = False
+    lean_browser: bool = False
+    artifacts: str = ARTIFACTS_ON_FAILURE
+    response_cache: bool = True
+    aggregation: int = HOURLY_AGGREGATION
+    sample_interval: int = SAMPLE_INTERVAL
+    statistics: object = None
+    metrics: object = None
+
+def login_scraper(username, password, data_folder, options=None, response_cache=None):
+    ''' Create the scraper of the login engine and login, fallback to Selenium if the HTTP login fails '''
 
-    scrapper = SeyWebScraper(data_folder)
+    options = options or CollectOptions()
+    cache = TokenCache(data_folder) if options.token_cache else None
+    scraper_options = dict(save_json=options.save_json, compress_json=options.compress_json, response_cache=response_cache, aggregation=options.aggregation, sample_interval=options.sample_interval, metrics=options.metrics)
 
+    if options.login_engine == LOGIN_ENGINE_HTTP:
+        import requests
+
+        from .http_scraper import SeyHttpScraper, SeyLoginError
+
+        scrapper = None
+        try:
+            scrapper = SeyHttpScraper(data_folder, cache, **scraper_options, **(options.keycloak or {}))
+            scrapper.login(username, password)
+            return scrapper
+        except (SeyLoginError, requests.RequestException) as e:
+            print(f"WARNING: HTTP login failed ({e}), fallback to the browser login")
+            if scrapper is not None:
+                scrapper.close()
+
+    scrapper = SeyWebScraper(data_folder, cache, browser_pool=options.browser_pool, lean_browser=options.lean_browser, artifacts=options.artifacts, **scraper_options)
     try:
         scrapper.login(username, password)
+    except BaseException:
+        scrapper.close()
+        raise
+
+    return scrapper
 
-        data_electricity, data_water = scrapper.collect(electrical_contract_id, water_contract_id, subject_id, dt)
+def _scraper_session(username, password, data_folder, options, fetch, save=None):
+    ''' Login, run fetch(scrapper) and logout, then run save(result) and return the result
+
+    The answers of the API are remembered once the statistics are pushed, or kept in the outbox.
+    '''
+
+    responses = ResponseCache(data_folder) if options.response_cache else None
+    scrapper = login_scraper(username, password, data_folder, options, responses)
+
+    try:
+        result = fetch(scrapper)
         scrapper.logout()
+    finally:
+        scrapper.close()
 
-        saver = SeyDataSaver(data_folder, dt)
+    if save is not None:
+        save(result)
 
-        saver.save(data_electricity, data_water)
+    if options.statistics is not None:
+        options.statistics.flush()
+
+    if responses is not None:
+        responses.save()
+
+    return result
+
+def collect_meterdatavalues(username, password, electrical_contract_id, water_contract_id, subject_id, data_folder, dt, options=None):
+    ''' Collect the meter data values '''
 
-        saver.save_sums()
+    options = options or CollectOptions()
+    _scraper_session(
+        username, password, data_folder, options,
+        lambda scrapper: [(dt, *scrapper.collect(electrical_contract_id, water_contract_id, subject_id, dt))],
+        lambda days: save_days(data_folder, electrical_contract_id, water_contract_id, days, options.tariffs, options.statistics, options.metrics),
+    )
+
+def collect_meterdatavalues_range(username, password, electrical_contract_id, water_contract_id, subject_id, data_folder, date_from, date_to, options=None):
+    ''' Backfill the meter data values of every day from date_from to date_to (included) with a single login '''
+
+    if date_from > date_to:
+        print("Nothing to collect")
+        return
+
+    # All the days are imported together, before the answers are remembered
+    options = options or CollectOptions()
+    _scraper_session(
+        username, password, data_folder, options,
+        lambda scrapper: scrapper.collect_range(electrical_contract_id, water_contract_id, subject_id, date_from, date_to),
+        lambda days: save_days(data_folder, electrical_contract_id, water_contract_id, days, options.tariffs, options.statistics, options.metrics),
+    )
+
+def save_days(data_folder, electrical_contract_id, water_contract_id, days, tariffs=None, statistics=None, metrics=None):
+    ''' Store the collected (date, electrical series, water series) days and save them from the first new or changed one
+
+    The days are saved in chronological order so the sums carry forward, the already saved days whose readings
+    did not change are skipped, and the saved days after a changed one are saved again from the local store.
+    '''
+    with SeyStore(data_folder) as store:
+        days, changed = store.upsert_days(electrical_contract_id, water_contract_id, days)
+
+    last_date = SeyDataSaver.last_date(data_folder)
+    first = next((dt for dt, _, _ in days if last_date is None or dt > last_date or dt in changed), None)
+    if first is None:
+        print("No new or changed data to save")
+        return
+
+    # Saving a day invalidates every later checkpoint, those of the days after the batch included
+    invalidated = set()
+    saved = set()
+    for dt, data_electricity, data_water in days:
+        if dt < first:
+            continue
+
+        saver = SeyDataSaver(data_folder, dt, tariffs, statistics, metrics)
+
+        saver.save_series(data_electricity, data_water)
+
+        invalidated.update(saver.save_sums())
+        saved.add(dt.strftime("%Y%m%d"))
+
+    resave_days(data_folder, electrical_contract_id, water_contract_id, sorted(invalidated - saved), tariffs, statistics, metrics)
+
+def run_daemon(username, password, electrical_contract_id, water_contract_id, subject_id, data_folder, first_day=None, options=None):
+    ''' Keep running and save every day as soon as its data are available, starting after the last saved day or on first_day '''
+
+    options = options or CollectOptions()
+    responses = ResponseCache(data_folder) if options.response_cache else None
+    daemon = SeyDaemon(
+        lambda: login_scraper(username, password, data_folder, options, responses),
+        electrical_contract_id, water_contract_id, subject_id, data_folder, options.tariffs, first_day, statistics=options.statistics, response_cache=responses, metrics=options.metrics,
+    )
+
+    try:
+        daemon.run()
     finally:
-        scrapper.close()
\ No newline at end of file
+        daemon.close()
+
+def refetch_gaps(scrapper, electrical_contract_id, water_contract_id, subject_id, data_folder, date_from, date_to, tariffs=None, statistics=None, metrics=None):
+    ''' Fetch again the days with missing readings from date_from to date_to (included) and save again the sums from the first corrected day
+
+    Return the remaining (contract_id, obis, day, missing readings) the portal could not provide.
+    '''
+    contract_ids = [electrical_contract_id, water_contract_id]
+
+    with SeyStore(data_folder) as store:
+        spans = []
+        for contract_id in contract_ids:
+            gaps = find_gaps(store, contract_id, date_from, date_to)
+            for obis, day, missing in gaps:
+                print(f"Gap: {contract_id} {obis} {day.strftime('%Y-%m-%d')}, {missing} missing reading(s)")
+            spans += [(contract_id, datetime.combine(first, datetime.min.time()), datetime.combine(last, datetime.min.time())) for first, last in coalesce_days(day for _, day, _ in gaps)]
+
+        if not spans:
+            print("No gap found")
+            return []
+
+        print(f"Fetch again {len(spans)} range(s) of days")
+        contracts = scrapper.collect_spans(spans, subject_id, {electrical_contract_id: ELECTRICAL_JSON_FILENAME, water_contract_id: WATER_JSON_FILENAME})
+
+        changed = [day for contract_id, days in contracts.items() for day, series_list in days.items() if store.upsert_series(contract_id, series_list) > 0]
+
+        remaining = [(contract_id, obis, day, missing) for contract_id in contract_ids for obis, day, missing in find_gaps(store, contract_id, date_from, date_to)]
+
+    last_date = SeyDataSaver.last_date(data_folder)
+    if changed and last_date is not None and min(changed) <= last_date.date():
+        export_from_store(data_folder, electrical_contract_id, water_contract_id, datetime.combine(min(changed), datetime.min.time()), last_date, tariffs, statistics, metrics)
+
+    return remaining
+
+def fill_gaps(username, password, electrical_contract_id, water_contract_id, subject_id, data_folder, date_from=None, date_to=None, options=None):
+    ''' Fill the gaps of the local store, by default from its first day to the last saved day '''
+
+    if date_from is None:
+        with SeyStore(data_folder) as store:
+            days = store.days(electrical_contract_id) + store.days(water_contract_id)
+        date_from = datetime.combine(min(days), datetime.min.time()) if days else None
+
+    date_to = date_to or SeyDataSaver.last_date(data_folder)
+
+    if date_from is None or date_to is None or date_from > date_to:
+        print("Nothing to check")
+        return
+
+    options = options or CollectOptions()
+    remaining = _scraper_session(
+        username, password, data_folder, options,
+        lambda scrapper: refetch_gaps(scrapper, electrical_contract_id, water_contract_id, subject_id, data_folder, date_from, date_to, options.tariffs, options.statistics, options.metrics),
+    )
+
+    if remaining:
+        print(f"WARNING: {len(remaining)} gap(s) could not be filled")
+
+def export_from_store(data_folder, electrical_contract_id, water_contract_id, date_from, date_to, tariffs=None, statistics=None, metrics=None):
+    ''' Save again the files and the sums of every day from date_from to date_to (included) from the local store '''
+
+    with SeyStore(data_folder) as store:
+        dt = date_from
+        while dt <= date_to:
+            saver = SeyDataSaver(data_folder, dt, tariffs, statistics, metrics)
+
+            saver.save_series(store.series(electrical_contract_id, dt, dt), store.series(water_contract_id, dt, dt))
+
+            saver.save_sums()
+            dt += timedelta(days = 1)
+
+def resave_days(data_folder, electrical_contract_id, water_contract_id, days, tariffs=None, statistics=None, metrics=None):
+    ''' Save again the days (YYYYMMDD) whose sums were invalidated by saving an earlier day '''
+
+    if not days:
+        return
+
+    print(f"Saving again {len(days)} day(s) from the local store")
+    export_from_store(data_folder, electrical_contract_id, water_contract_id, datetime.strptime(days[0], "%Y%m%d"), datetime.strptime(days[-1], "%Y%m%d"), tariffs, statistics, metrics)
+
+def export_json(data_folder, date_from, date_to=None, tariffs=None, max_workers=None):
+    ''' Save again the files and the sums of every day from date_from to date_to (included) from the saved JSON, without login
+
+    date_to defaults to the last day of the saved JSON, the saved days after date_to are exported too.
+    '''
+
+    if date_to is None:
+        days = list(index_json_files(data_folder, ELECTRICAL_JSON_FILENAME)) + list(index_json_files(data_folder, WATER_JSON_FILENAME))
+        date_to = datetime.combine(max(days), datetime.min.time()) if days else None
+
+    if date_to is None or date_from > date_to:
+        print("Nothing to export")
+        return
+
+    export_days(data_folder, date_from, date_to, tariffs, max_workers)
+
+def regenerate_json(data_folder, electrical_contract_id, water_contract_id, date_from, date_to):
+    ''' Write again the JSON files of every day from date_from to date_to (included) from the local store '''
+
+    with SeyStore(data_folder) as store:
+        dt = date_from
+        while dt <= date_to:
+            for filename, contract_id in ((ELECTRICAL_JSON_FILENAME, electrical_contract_id), (WATER_JSON_FILENAME, water_contract_id)):
+                with open(os.path.join(data_folder, filename.format(dt)), "w", encoding="utf-8") as f:
+                    json.dump(store.document(contract_id, dt, dt), f, ensure_ascii=False, indent=2)
+            dt += timedelta(days = 1)
+
+def regenerate(data_folder, electrical_contract_id, water_contract_id, date_from, date_to=None, tariffs=None):
+    ''' Write again the JSON files, the files and the sums of every day from date_from to date_to (included) from the local store, without login
+
+    date_to defaults to the last stored day, the saved days after date_to are saved again too since their sums carry forward.
+    '''
+
+    with SeyStore(data_folder) as store:
+        days = store.days(electrical_contract_id) + store.days(water_contract_id)
+
+    if not days:
+        print("Nothing to regenerate")
+        return
+
+    # The days before the first stored one have no readings to regenerate
+    date_from = max(date_from, datetime.combine(min(days), datetime.min.time()))
+    date_to = date_to or datetime.combine(max(days), datetime.min.time())
+    if date_from > date_to:
+        print("Nothing to regenerate")
+        return
+
+    regenerate_json(data_folder, electrical_contract_id, water_contract_id, date_from, date_to)
+
+    last_date = SeyDataSaver.last_date(data_folder)
+    export_from_store(data_folder, electrical_contract_id, water_contract_id, date_from, max(date_to, last_date) if last_date is not None else date_to, tariffs)
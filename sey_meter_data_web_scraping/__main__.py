@@ -1,5 +1,11 @@
-from . import collect_meterdatavalues
+from . import CollectOptions, collect_meterdatavalues, collect_meterdatavalues_range, export_json, fill_gaps, regenerate, run_daemon
+from .fleet import DEFAULT_BROWSER_POOL_SIZE, run_fleet
+from .homeassistant import SUPERVISOR_WEBSOCKET_URL, HomeAssistantStatistics
+from .metrics import Metrics
+from .tariffs import load_tariffs
+from .utils import HOURLY_AGGREGATION
 
+import argparse
 import json
 import os
 import sys
@@ -15,31 +21,186 @@ def load_settings():
         with OPTIONS_FILE.open("r", encoding="utf-8") as handle:
             settings = json.load(handle)
 
+    data_folder = settings.get("data_folder", "/config/sey_meter_data_web_scraping")
+
+    accounts = [{
+        "NAME": account["name"],
+        "SEY_USERNAME": account.get("sey_username", ""),
+        "SEY_PASSWORD": account.get("sey_password", ""),
+        "SEY_SUBJECT_ID": account.get("sey_subject_id", ""),
+        "SEY_ELECTRICAL_CONTRACT_ID": account.get("sey_electrical_contract_id", ""),
+        "SEY_WATER_CONTRACT_ID": account.get("sey_water_contract_id", ""),
+        "DATA_FOLDER": account.get("data_folder") or os.path.join(data_folder, account["name"]),
+    } for account in settings.get("accounts", [])]
+
     return {
         "SEY_USERNAME": settings.get("sey_username", ""),
         "SEY_PASSWORD": settings.get("sey_password", ""),
         "SEY_SUBJECT_ID": settings.get("sey_subject_id", ""),
         "SEY_ELECTRICAL_CONTRACT_ID": settings.get("sey_electrical_contract_id", ""),
         "SEY_WATER_CONTRACT_ID": settings.get("sey_water_contract_id", ""),
-        "DATA_FOLDER": settings.get("data_folder", "/config/sey_meter_data_web_scraping"),
+        "DATA_FOLDER": data_folder,
+        "TOKEN_CACHE": settings.get("token_cache", True),
+        "LOGIN_ENGINE": settings.get("login_engine", "selenium"),
+        "KEYCLOAK_ISSUER": settings.get("keycloak_issuer", ""),
+        "KEYCLOAK_CLIENT_ID": settings.get("keycloak_client_id", ""),
+        "KEYCLOAK_REDIRECT_URI": settings.get("keycloak_redirect_uri", ""),
+        "ACCOUNTS": accounts,
+        "BROWSER_POOL_SIZE": settings.get("browser_pool_size", DEFAULT_BROWSER_POOL_SIZE),
+        "TARIFF_FILE": settings.get("tariff_file", ""),
+        "SAVE_JSON": settings.get("save_json", True),
+        "COMPRESS_JSON": settings.get("compress_json", False),
+        "LEAN_BROWSER": settings.get("lean_browser", False),
+        "ARTIFACTS": settings.get("artifacts", "on-failure"),
+        "DAEMON": settings.get("daemon", False),
+        "RESPONSE_CACHE": settings.get("response_cache", True),
+        "AGGREGATION": settings.get("aggregation", HOURLY_AGGREGATION),
+        "SAMPLE_INTERVAL": settings.get("sample_interval", 60) * 60,
+        "METRICS": settings.get("metrics", True),
+        "PUSH_STATISTICS": settings.get("push_statistics", False),
+        "HOME_ASSISTANT_URL": settings.get("home_assistant_url") or SUPERVISOR_WEBSOCKET_URL,
+        "HOME_ASSISTANT_TOKEN": settings.get("home_assistant_token") or os.environ.get("SUPERVISOR_TOKEN", ""),
     }
 
 
+def parse_date(value):
+    return datetime.strptime(value, "%Y%m%d")
+
+
+def parse_export_args(argv):
+    parser = argparse.ArgumentParser(prog="sey_meter_data_web_scraping export", description="Save again the files and the sums from the saved JSON, without login")
+    parser.add_argument("--from", dest="date_from", type=parse_date, required=True, help="First day to export (YYYYMMDD)")
+    parser.add_argument("--to", dest="date_to", type=parse_date, help="Last day to export (YYYYMMDD), default: last day of the saved JSON")
+    parser.add_argument("--workers", type=int, help="Number of processes, 1 to export the days one after the other, default: one per CPU")
+
+    args = parser.parse_args(argv)
+    args.command = "export"
+
+    if args.date_to is not None and args.date_to < args.date_from:
+        parser.error("--to must not be before --from")
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    return args
+
+
+def parse_regenerate_args(argv):
+    parser = argparse.ArgumentParser(prog="sey_meter_data_web_scraping regenerate", description="Write again the JSON files, the files and the sums from the local store, without login")
+    parser.add_argument("--from", dest="date_from", type=parse_date, required=True, help="First day to regenerate (YYYYMMDD)")
+    parser.add_argument("--to", dest="date_to", type=parse_date, help="Last day to regenerate (YYYYMMDD), default: last stored day")
+
+    args = parser.parse_args(argv)
+    args.command = "regenerate"
+
+    if args.date_to is not None and args.date_to < args.date_from:
+        parser.error("--to must not be before --from")
+
+    return args
+
+
+def parse_args(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["export"]:
+        return parse_export_args(argv[1:])
+    if argv[:1] == ["regenerate"]:
+        return parse_regenerate_args(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="sey_meter_data_web_scraping", description="Collect the meter data of electricity and water from SEY")
+    parser.add_argument("date", nargs="?", type=parse_date, help="Day to collect (YYYYMMDD), default: 2 days ago")
+    parser.add_argument("--from", dest="date_from", type=parse_date, help="Backfill every day from this date (YYYYMMDD)")
+    parser.add_argument("--to", dest="date_to", type=parse_date, help="Last day of the backfill (YYYYMMDD), default: 2 days ago")
+    parser.add_argument("--fill-gaps", action="store_true", help="Fetch again the missing hours of the local store, from --from (default: first stored day) to --to (default: last saved day)")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and save each day as soon as it is available, from the day after the last saved one (or --from)")
+    parser.add_argument("--no-daemon", action="store_true", help="Collect once even with the daemon option, as the daily run of cron")
+
+    parser.set_defaults(command=None)
+
+    args = parser.parse_args(argv)
+
+    if args.date is not None and (args.date_from is not None or args.date_to is not None):
+        parser.error("a single date cannot be combined with --from/--to")
+
+    if args.date_to is not None and args.date_from is None:
+        parser.error("--to requires --from")
+
+    if args.daemon and (args.date is not None or args.date_to is not None):
+        parser.error("--daemon can only be combined with --from")
+
+    if args.daemon and args.no_daemon:
+        parser.error("--daemon cannot be combined with --no-daemon")
+
+    if args.fill_gaps and (args.date is not None or args.daemon):
+        parser.error("--fill-gaps can only be combined with --from/--to")
+
+    return args
+
+
+def run_collection(account, settings, args, tariffs, browser_pool=None):
+    ''' Collect the data of one account according to the command line arguments '''
+
+    default_dt = datetime.combine((datetime.now() - timedelta(days = 2)).date(), datetime.min.time())
+
+    credentials = (
+        account["SEY_USERNAME"],
+        account["SEY_PASSWORD"],
+        account["SEY_ELECTRICAL_CONTRACT_ID"],
+        account["SEY_WATER_CONTRACT_ID"],
+        account["SEY_SUBJECT_ID"],
+        account["DATA_FOLDER"],
+    )
+    options = CollectOptions(
+        token_cache=settings["TOKEN_CACHE"],
+        login_engine=settings["LOGIN_ENGINE"],
+        keycloak={
+            "issuer": settings["KEYCLOAK_ISSUER"],
+            "client_id": settings["KEYCLOAK_CLIENT_ID"],
+            "redirect_uri": settings["KEYCLOAK_REDIRECT_URI"] or None,
+        },
+        browser_pool=browser_pool,
+        tariffs=tariffs,
+        save_json=settings["SAVE_JSON"],
+        compress_json=settings["COMPRESS_JSON"],
+        lean_browser=settings["LEAN_BROWSER"],
+        artifacts=settings["ARTIFACTS"],
+        response_cache=settings["RESPONSE_CACHE"],
+        aggregation=settings["AGGREGATION"],
+        sample_interval=settings["SAMPLE_INTERVAL"],
+        statistics=HomeAssistantStatistics(settings["HOME_ASSISTANT_URL"], settings["HOME_ASSISTANT_TOKEN"], folder=account["DATA_FOLDER"], account=account.get("NAME")) if settings["PUSH_STATISTICS"] else None,
+        metrics=Metrics(account["DATA_FOLDER"], account.get("NAME")) if settings["METRICS"] else None,
+    )
+
+    success = False
+    try:
+        if args.command == "export":
+            export_json(account["DATA_FOLDER"], args.date_from, args.date_to, tariffs, args.workers)
+        elif args.command == "regenerate":
+            regenerate(account["DATA_FOLDER"], account["SEY_ELECTRICAL_CONTRACT_ID"], account["SEY_WATER_CONTRACT_ID"], args.date_from, args.date_to, tariffs)
+        elif args.fill_gaps:
+            fill_gaps(*credentials, args.date_from, args.date_to, options)
+        elif args.daemon or (settings["DAEMON"] and not args.no_daemon and args.date is None and args.date_from is None):
+            run_daemon(*credentials, args.date_from, options)
+        elif args.date_from is not None:
+            collect_meterdatavalues_range(*credentials, args.date_from, args.date_to or default_dt, options)
+        else:
+            collect_meterdatavalues(*credentials, args.date or datetime.now() - timedelta(days = 2), options)
+        success = True
+    finally:
+        if options.statistics is not None:
+            options.statistics.close()
+        if options.metrics is not None:
+            options.metrics.flush(success)
+
+
 if __name__ == '__main__':
     settings = load_settings()
+    args = parse_args()
+    tariffs = load_tariffs(settings["TARIFF_FILE"])
 
-    if len(sys.argv) > 1:
-        dt = datetime.strptime(sys.argv[1], "%Y%m%d")
+    if settings["ACCOUNTS"]:
+        failed = run_fleet(settings["ACCOUNTS"], lambda account, browser_pool: run_collection(account, settings, args, tariffs, browser_pool), settings["BROWSER_POOL_SIZE"])
+        if failed:
+            print(f"ERROR: Collection failed for: {', '.join(failed)}")
+            sys.exit(1)
     else:
-        dt = datetime.now() - timedelta(days = 2)
-
-    collect_meterdatavalues(
-        settings["SEY_USERNAME"],
-        settings["SEY_PASSWORD"],
-        settings["SEY_ELECTRICAL_CONTRACT_ID"],
-        settings["SEY_WATER_CONTRACT_ID"],
-        settings["SEY_SUBJECT_ID"],
-        settings["DATA_FOLDER"],
-        dt,
-    )
-
+        run_collection(settings, settings, args, tariffs)
@@ -0,0 +1,150 @@
+''' Resident mode: poll the SEY portal and save each day as soon as its data are complete '''
+
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from .series import expected_samples
+from .store import SeyStore
+from .utils import SeyDataSaver
+
+POLL_MIN_INTERVAL = 15 * 60  # Seconds between two polls while a day is not complete, doubled at each unsuccessful poll
+POLL_MAX_INTERVAL = 4 * 3600  # Upper bound of the delay between two polls
+MIDNIGHT_DELAY = 15 * 60  # Seconds after midnight before polling the new pending day
+INCOMPLETE_DAY_MAX_AGE = 3  # Days after which an incomplete day is saved as it is, its gaps left to fill_gaps
+
+
+def is_complete(series_list, day):
+    ''' True if every series of the day holds all its samples '''
+
+    return len(series_list) > 0 and all(len(series) >= expected_samples(day, series.interval) for series in series_list)
+
+
+class SeyDaemon:
+    ''' Keep an authenticated scraper and save every pending day, in order, as soon as it is complete
+
+    The pending days go from the day after the last saved sums to yesterday, so the days missed while the
+    daemon was stopped are caught up first. A day still incomplete after INCOMPLETE_DAY_MAX_AGE days is saved
+    as it is.
+    '''
+
+    def __init__(self, login, electrical_contract_id, water_contract_id, subject_id, data_folder, tariffs=None, first_day=None, now=datetime.now, sleep=time.sleep, statistics=None, response_cache=None, metrics=None) -> None:
+        self._login = login
+        self._electrical_contract_id = electrical_contract_id
+        self._water_contract_id = water_contract_id
+        self._subject_id = subject_id
+        self._data_folder = data_folder
+        self._tariffs = tariffs
+        self._first_day = first_day
+        self._now = now
+        self._sleep = sleep
+        self._statistics = statistics
+        self._response_cache = response_cache
+        self._metrics = metrics
+        self._scrapper = None
+
+    def pending_days(self):
+        ''' Return the first and the last day to save, or None if every day until yesterday is saved '''
+
+        yesterday = datetime.combine(self._now().date() - timedelta(days = 1), datetime.min.time())
+
+        last_date = SeyDataSaver.last_date(self._data_folder)
+        if last_date is not None:
+            first_day = last_date + timedelta(days = 1)
+        else:
+            first_day = self._first_day or yesterday - timedelta(days = 1)
+
+        return (first_day, yesterday) if first_day <= yesterday else None
+
+    def poll(self):
+        ''' Collect the pending days and save the complete ones, return the number of saved days '''
+
+        pending = self.pending_days()
+        if pending is None:
+            # Retry the statistics of the outbox
+            if self._statistics is not None:
+                self._statistics.flush()
+            return 0
+
+        if self._scrapper is None:
+            self._scrapper = self._login()
+            # The token is enough to call the API, do not keep Chromium running between the polls
+            self._scrapper.release_browser()
+
+        days = self._scrapper.collect_range(self._electrical_contract_id, self._water_contract_id, self._subject_id, *pending)
+
+        with SeyStore(self._data_folder) as store:
+            days, _ = store.upsert_days(self._electrical_contract_id, self._water_contract_id, days)
+
+        saved = 0
+        for dt, data_electricity, data_water in days:
+            # The sums carry forward, a day cannot be saved before the previous one
+            if not is_complete(data_electricity + data_water, dt.date()):
+                if (self._now().date() - dt.date()).days <= INCOMPLETE_DAY_MAX_AGE:
+                    print(f"Data of {dt.strftime('%Y-%m-%d')} not complete yet")
+                    break
+
+                # The portal may never publish the missing readings, do not block the next days
+                missing = sum(max(expected_samples(dt.date(), series.interval) - len(series), 0) for series in data_electricity + data_water)
+                print(f"WARNING: Data of {dt.strftime('%Y-%m-%d')} still not complete after {INCOMPLETE_DAY_MAX_AGE} days, saved with {missing} missing reading(s), run fill_gaps to fetch them again")
+
+            saver = SeyDataSaver(self._data_folder, dt, self._tariffs, self._statistics, self._metrics)
+            saver.save_series(data_electricity, data_water)
+            saver.save_sums()
+            saved += 1
+
+        if self._statistics is not None:
+            self._statistics.flush()
+
+        if self._response_cache is not None:
+            self._response_cache.save()
+
+        return saved
+
+    def _seconds_until_next_day(self):
+        now = self._now()
+        next_day = datetime.combine(now.date() + timedelta(days = 1), datetime.min.time())
+        return (next_day - now).total_seconds() + MIDNIGHT_DELAY
+
+    def run(self, cycles=None):
+        ''' Poll forever, or for a number of cycles, backing off while no new day is complete '''
+
+        delay = POLL_MIN_INTERVAL
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            cycle += 1
+
+            try:
+                saved = self.poll()
+                success = True
+            except Exception:
+                # Login again at the next poll
+                print("ERROR: Poll of the SEY portal failed")
+                traceback.print_exc()
+                self.close()
+                saved = 0
+                success = False
+
+            # One run in the metrics per poll
+            if self._metrics is not None:
+                self._metrics.flush(success)
+
+            if self.pending_days() is None:
+                delay = POLL_MIN_INTERVAL
+                wait = self._seconds_until_next_day()
+            elif saved > 0:
+                delay = POLL_MIN_INTERVAL
+                wait = delay
+            else:
+                wait = delay
+                delay = min(delay * 2, POLL_MAX_INTERVAL)
+
+            print(f"Next poll in {wait / 60:.0f} min")
+            self._sleep(wait)
+
+    def close(self):
+        if self._scrapper is not None:
+            try:
+                self._scrapper.close()
+            finally:
+                self._scrapper = None
@@ -0,0 +1,176 @@
+''' Offline export of the files and the sums from the JSON responses saved by the previous runs '''
+
+import gzip
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import add
+
+from .journal import SumsJournal
+from .series import SAMPLE_INTERVAL, data_interval, split_by_day
+from .stream import CHUNK_SIZE, parse_meterdatavalues
+from .tariffs import load_tariffs
+from .utils import ELECTRICAL_JSON_FILENAME, WATER_JSON_FILENAME, SeyDataSaver
+
+# electrical_data_20250801.json, electrical_data_20250801_20250831.json.gz...
+JSON_FILENAME_PATTERN = r"^{}_(\d{{8}})(?:_(\d{{8}}))?\.json(\.gz)?$"
+
+
+def index_json_files(folder, template):
+    ''' Return {date: filename} of the saved responses of a contract, template being e.g. ELECTRICAL_JSON_FILENAME
+
+    A day covered by several files is read from the most recent one, which holds the latest fetched readings (the
+    refetches of fill_gaps included), then from the narrowest one.
+    '''
+
+    pattern = re.compile(JSON_FILENAME_PATTERN.format(re.escape(template.split("_{")[0])))
+
+    candidates = {}
+    for filename in os.listdir(folder):
+        match = pattern.match(filename)
+        if match is None:
+            continue
+
+        first_day = datetime.strptime(match.group(1), "%Y%m%d").date()
+        last_day = datetime.strptime(match.group(2), "%Y%m%d").date() if match.group(2) else first_day
+        rank = (-os.path.getmtime(os.path.join(folder, filename)), (last_day - first_day).days)
+
+        day = first_day
+        while day <= last_day:
+            if day not in candidates or rank < candidates[day][0]:
+                candidates[day] = (rank, filename)
+            day += timedelta(days = 1)
+
+    return {day: filename for day, (_, filename) in candidates.items()}
+
+
+def read_json_file(filename):
+    ''' Parse a saved response, compressed or not, into a list of MeterSeries
+
+    The saved responses may come from different aggregations, the seconds covered by each sample are taken from the
+    spacing of the samples, hourly if no series holds two samples.
+    '''
+
+    with (gzip.open if filename.endswith(".gz") else open)(filename, "rb") as f:
+        series_list = parse_meterdatavalues(iter(lambda: f.read(CHUNK_SIZE), b""))
+
+    interval = data_interval(series_list)
+    if interval != SAMPLE_INTERVAL:
+        for series in series_list:
+            series.set_interval(interval)
+
+    return series_list
+
+
+def parse_days(folder, electrical_filename, water_filename, days):
+    ''' Return [(date, electrical series, water series)] of the days read from a pair of saved responses '''
+
+    def read(filename):
+        if filename is None:
+            return {day.date(): [] for day in days}
+        return split_by_day(read_json_file(os.path.join(folder, filename)), days)
+
+    data_electricity = read(electrical_filename)
+    data_water = read(water_filename)
+    return [(day, data_electricity[day.date()], data_water[day.date()]) for day in days]
+
+
+def day_increments(folder, electrical_filename, water_filename, days, tariffs):
+    ''' Return [(date, {entity_id: values added to its sum})] of the days read from a pair of saved responses '''
+
+    return [
+        (dt, SeyDataSaver(folder, dt, tariffs, sums={}).increments(data_electricity, data_water))
+        for dt, data_electricity, data_water in parse_days(folder, electrical_filename, water_filename, days)
+    ]
+
+
+def write_days(folder, electrical_filename, water_filename, days, tariffs, sums):
+    ''' Write the files and the checkpoint of the days read from a pair of saved responses, sums being {date: (start sums, end sums)} '''
+
+    journal = SumsJournal(folder)
+    for dt, data_electricity, data_water in parse_days(folder, electrical_filename, water_filename, days):
+        start_sums, end_sums = sums[dt]
+        saver = SeyDataSaver(folder, dt, tariffs, sums=start_sums)
+        saver.save_series(data_electricity, data_water)
+        journal.checkpoint(end_sums['date'], end_sums)
+
+
+def export_days(folder, date_from, date_to, tariffs=None, max_workers=None):
+    ''' Export every day from date_from to date_to (included) from the saved responses, return the number of exported days
+
+    The already saved days after date_to are exported too, since their sums carry forward from the exported days.
+    Nothing is written if a day to export, other than the first ones, has no saved response.
+
+    With several workers the responses are parsed in parallel into the values added to each sum, the sums are
+    carried forward from day to day from these values, then the days are written in parallel from their start
+    sums. The files are the same as when saving the days one after the other.
+    '''
+
+    tariffs = tariffs if tariffs is not None else load_tariffs()
+    journal = SumsJournal(folder)
+    electrical_files = index_json_files(folder, ELECTRICAL_JSON_FILENAME)
+    water_files = index_json_files(folder, WATER_JSON_FILENAME)
+
+    last_day = journal.last_day()
+    if last_day is not None and datetime.strptime(last_day, "%Y%m%d") > date_to:
+        date_to = datetime.strptime(last_day, "%Y%m%d")
+        print(f"The saved days until {date_to.strftime('%Y-%m-%d')} are exported too")
+
+    # Days grouped by the pair of files to parse, so each file is parsed once
+    groups = {}
+    missing = []
+    dt = date_from
+    while dt <= date_to:
+        files = (electrical_files.get(dt.date()), water_files.get(dt.date()))
+        if files == (None, None):
+            missing.append(dt)
+        else:
+            groups.setdefault(files, []).append(dt)
+        dt += timedelta(days = 1)
+
+    if not groups:
+        print("Nothing to export")
+        return 0
+
+    # The first days can be missing, the sums of the following ones would miss any other
+    first_day = min(min(group) for group in groups.values())
+    for dt in missing:
+        print(f"{'WARNING' if dt < first_day else 'ERROR'}: No saved JSON for {dt.strftime('%Y-%m-%d')}")
+    if any(dt > first_day for dt in missing):
+        print("ERROR: Nothing exported, the missing JSON can be written again from the local store with the regenerate command")
+        return 0
+
+    count = sum(map(len, groups.values()))
+    print(f"Export {count} day(s) from {len(groups)} group(s) of saved JSON")
+
+    workers = min(max_workers or os.cpu_count() or 1, len(groups))
+    if workers == 1:
+        for dt, data_electricity, data_water in sorted(day for files, group in groups.items() for day in parse_days(folder, *files, group)):
+            saver = SeyDataSaver(folder, dt, tariffs)
+            saver.save_series(data_electricity, data_water)
+            saver.save_sums()
+        return count
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = [executor.submit(day_increments, folder, *files, group, tariffs) for files, group in groups.items()]
+        days = sorted((day for future in parsed for day in future.result()), key=lambda day: day[0])
+
+        # Same additions, in the same order, as saving the days one after the other
+        sums = {}
+        end_sums = journal.load_before(first_day.strftime("%Y%m%d"))
+        for dt, increments in days:
+            start_sums = end_sums
+            end_sums = dict(start_sums)
+            for entity_id, values in increments.items():
+                end_sums[entity_id] = reduce(add, values, end_sums.get(entity_id, 0.0))
+            end_sums['date'] = dt.strftime("%Y%m%d")
+            sums[dt] = (start_sums, end_sums)
+
+        for future in [executor.submit(write_days, folder, *files, group, tariffs, {dt: sums[dt] for dt in group}) for files, group in groups.items()]:
+            future.result()
+
+    # Last checkpoint saved again to update last_sums.json
+    journal.save(end_sums['date'], end_sums)
+    return count
@@ -0,0 +1,27 @@
+''' File helpers shared by the caches and journals '''
+
+import json
+import os
+import tempfile
+
+
+def atomic_write_json(filename, data):
+    ''' Write the JSON data to a temporary file then move it over the target, so a crash never leaves a partial file '''
+    atomic_write_text(filename, json.dumps(data))
+
+
+def atomic_write_text(filename, text):
+    ''' Write the text to a temporary file then move it over the target, so a crash never leaves a partial file '''
+
+    folder = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(prefix=".tmp-", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
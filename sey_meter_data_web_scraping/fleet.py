@@ -0,0 +1,32 @@
+''' Run the data collection of several accounts in parallel '''
+
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BROWSER_POOL_SIZE = 1  # Chromium is memory-heavy, only one instance at a time by default
+
+
+def run_fleet(accounts, collect, browser_pool_size=DEFAULT_BROWSER_POOL_SIZE):
+    ''' Call collect(account, browser_pool) for every account in parallel
+
+    The browser pool is a semaphore bounding the number of Chromium instances running at the same time.
+    The failure of an account is reported and does not abort the others. Return the names of the failed accounts.
+    '''
+    browser_pool = threading.BoundedSemaphore(browser_pool_size)
+
+    def run(account):
+        os.makedirs(account["DATA_FOLDER"], exist_ok=True)
+
+        try:
+            collect(account, browser_pool)
+            print(f"Account {account['NAME']}: done")
+            return None
+        except (Exception, SystemExit):
+            print(f"ERROR: Account {account['NAME']} failed")
+            traceback.print_exc()
+            return account["NAME"]
+
+    with ThreadPoolExecutor(max_workers=max(1, len(accounts))) as executor:
+        return [name for name in executor.map(run, accounts) if name is not None]
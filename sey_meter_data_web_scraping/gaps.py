@@ -0,0 +1,45 @@
+''' Detection of the missing readings in the local store '''
+
+from datetime import timedelta
+
+from .series import SAMPLE_INTERVAL, expected_samples
+from .utils import MAX_RANGE_DAYS
+
+MAX_BRIDGE_DAYS = 2  # Complete days between two gaps fetched again rather than spending one more request
+
+
+def find_gaps(store, contract_id, date_from, date_to):
+    ''' Return the (obis, day, missing readings) of the contract from date_from to date_to (included)
+
+    A day without any reading is reported for every OBIS code of the contract, or with the OBIS code None if
+    nothing was ever stored for the contract.
+    '''
+    obis_codes = store.obis_codes(contract_id) or [None]
+    intervals = store.intervals(contract_id)
+    counts = store.counts(contract_id, date_from, date_to)
+
+    gaps = []
+    day = date_from.date()
+    while day <= date_to.date():
+        for obis in obis_codes:
+            missing = expected_samples(day, intervals.get(obis, SAMPLE_INTERVAL)) - counts.get((obis, day), 0)
+            if missing > 0:
+                gaps.append((obis, day, missing))
+        day += timedelta(days = 1)
+
+    return gaps
+
+
+def coalesce_days(days, max_bridge=MAX_BRIDGE_DAYS, max_span=MAX_RANGE_DAYS):
+    ''' Merge the days into the fewest (first day, last day) ranges of up to max_span days
+
+    Two days are in the same range if at most max_bridge complete days separate them.
+    '''
+    spans = []
+    for day in sorted(set(days)):
+        if spans and (day - spans[-1][1]).days <= max_bridge + 1 and (day - spans[-1][0]).days < max_span:
+            spans[-1][1] = day
+        else:
+            spans.append([day, day])
+
+    return [(first, last) for first, last in spans]
@@ -0,0 +1,170 @@
+''' Push the statistics straight to the recorder of Home Assistant through its websocket API '''
+
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+from .fileutils import atomic_write_json
+
+SUPERVISOR_WEBSOCKET_URL = "ws://supervisor/core/websocket"  # Home Assistant seen from an add-on, with the SUPERVISOR_TOKEN
+HA_TIMEOUT = 30  # Timeout in seconds of the websocket calls
+MAX_STATISTICS_PER_MESSAGE = 10000  # About 1 MB per message, far below the limit of Home Assistant
+STATISTICS_OUTBOX_FILENAME = "statistics_outbox.json"  # Statistics not imported yet, retried at the next flush
+STATISTIC_ID_PREFIX = "sensor.sey_"
+
+
+def account_statistic_id(entity_id, account):
+    ''' Return the statistic ID of the entity for an account, e.g. sensor.sey_home_water_consumption for the account "Home" '''
+
+    if not account or not entity_id.startswith(STATISTIC_ID_PREFIX):
+        return entity_id
+
+    slug = re.sub(r"[^a-z0-9]+", "_", account.lower()).strip("_")
+    return f"{STATISTIC_ID_PREFIX}{slug}_{entity_id[len(STATISTIC_ID_PREFIX):]}"
+
+
+class HomeAssistantError(Exception):
+    ''' Raised when Home Assistant refuses the authentication or the statistics '''
+
+
+class HomeAssistantStatistics:
+    ''' Collect the statistics of every entity and day, then import them with one message per entity over one connection
+
+    The statistics whose import failed are kept in the outbox of the folder, and sent again with the next ones.
+    With an account name, the statistic IDs include it so the accounts pushing to the same Home Assistant do not
+    overwrite each other.
+    '''
+
+    def __init__(self, url, token, timeout=HA_TIMEOUT, folder=None, account=None) -> None:
+        self._url = url
+        self._account = account
+        self._token = token
+        self._timeout = timeout
+        self._connection = None
+        self._next_id = 1
+        self._statistics = {}  # entity_id -> (unit, [{"start": ..., "sum": ...}])
+        self._outbox = os.path.join(folder, STATISTICS_OUTBOX_FILENAME) if folder is not None else None
+        self._load_outbox()
+
+    def _load_outbox(self):
+        if self._outbox is None or not os.path.exists(self._outbox):
+            return
+
+        try:
+            with open(self._outbox, "r", encoding="utf-8") as f:
+                self._statistics = {entity_id: (unit, stats) for entity_id, (unit, stats) in json.loads(f.read()).items()}
+        except (OSError, ValueError):
+            print(f"WARNING: Ignoring unreadable statistics outbox: {self._outbox}")
+            return
+
+        print(f"{sum(len(stats) for _, stats in self._statistics.values())} statistics not imported by the previous runs")
+
+    def _save_outbox(self):
+        if self._outbox is None:
+            return
+
+        if self._statistics:
+            atomic_write_json(self._outbox, self._statistics)
+        elif os.path.exists(self._outbox):
+            os.remove(self._outbox)
+
+    def add(self, entity_id, unit, starts, offsets, sums):
+        ''' Add the sums of the samples starting at the epoch seconds starts, in the local time of their UTC offsets '''
+
+        stats = self._statistics.setdefault(account_statistic_id(entity_id, self._account), (unit, []))[1]
+        stats.extend(
+            {"start": datetime.fromtimestamp(start, timezone(timedelta(seconds=offset))).isoformat(), "sum": round(total, 3)}
+            for start, offset, total in zip(starts, offsets, sums)
+        )
+
+    def _connect(self):
+        if self._connection is not None:
+            return
+
+        import websocket
+
+        print(f"Connecting to Home Assistant: {self._url}")
+        connection = websocket.create_connection(self._url, timeout=self._timeout)
+        try:
+            message = json.loads(connection.recv())
+            if message.get("type") == "auth_required":
+                connection.send(json.dumps({"type": "auth", "access_token": self._token}))
+                message = json.loads(connection.recv())
+
+            if message.get("type") != "auth_ok":
+                raise HomeAssistantError(f"Authentication refused: {message.get('message', message.get('type'))}")
+        except BaseException:
+            connection.close()
+            raise
+
+        self._connection = connection
+
+    def flush(self):
+        ''' Import the collected statistics, the messages are sent at once then their results are awaited
+
+        The statistics not imported, refused or lost with the connection, are kept for the next flush.
+        '''
+
+        if not self._statistics:
+            return
+
+        statistics, self._statistics = self._statistics, {}
+        remaining = {}  # entity_id -> number of messages not imported yet
+        errors = []
+        try:
+            self._connect()
+
+            pending = {}
+            for entity_id, (unit, stats) in statistics.items():
+                # The same hour added twice, e.g. a day saved again, is imported once with its latest sum
+                stats = list({stat["start"]: stat for stat in stats}.values())
+                statistics[entity_id] = (unit, stats)
+
+                for i in range(0, len(stats), MAX_STATISTICS_PER_MESSAGE):
+                    pending[self._next_id] = entity_id
+                    remaining[entity_id] = remaining.get(entity_id, 0) + 1
+                    self._connection.send(json.dumps({
+                        "id": self._next_id,
+                        "type": "recorder/import_statistics",
+                        "metadata": {
+                            "has_mean": False,
+                            "has_sum": True,
+                            "name": None,
+                            "source": "recorder",
+                            "statistic_id": entity_id,
+                            "unit_of_measurement": unit,
+                        },
+                        "stats": stats[i:i + MAX_STATISTICS_PER_MESSAGE],
+                    }))
+                    self._next_id += 1
+
+            count = sum(len(stats) for _, stats in statistics.values())
+            print(f"Importing {count} statistics of {len(statistics)} entities in {len(pending)} message(s)")
+
+            while pending:
+                message = json.loads(self._connection.recv())
+                if message.get("type") != "result" or message.get("id") not in pending:
+                    continue
+
+                entity_id = pending.pop(message["id"])
+                if message.get("success"):
+                    remaining[entity_id] -= 1
+                else:
+                    errors.append(f"{entity_id}: {message.get('error', {}).get('message')}")
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            self._statistics = {entity_id: value for entity_id, value in statistics.items() if remaining.get(entity_id, 1) > 0}
+            self._save_outbox()
+
+        if errors:
+            raise HomeAssistantError(f"Statistics refused: {', '.join(errors)}")
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            finally:
+                self._connection = None
@@ -0,0 +1,130 @@
+''' Login into SEY with plain HTTP requests, without any browser '''
+
+import base64
+import hashlib
+import secrets
+import time
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urljoin, urlparse
+
+import requests
+
+from .series import SAMPLE_INTERVAL
+from .utils import BASE_URL, HOURLY_AGGREGATION, HTTP_TIMEOUT, SeyScraper
+
+
+class SeyLoginError(Exception):
+    ''' Raised when the keycloak login cannot be completed '''
+
+
+class _LoginFormParser(HTMLParser):
+    ''' Find the action of the keycloak login form '''
+
+    def __init__(self):
+        super().__init__()
+        self.action = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form" and attrs.get("id") == "kc-form-login":
+            self.action = attrs.get("action")
+
+
+class SeyHttpScraper(SeyScraper):
+    ''' Get the authorization token with the OIDC authorization code flow (with PKCE) of keycloak '''
+
+    def __init__(self, output_folder, token_cache=None, base_url=BASE_URL, issuer=None, client_id=None, redirect_uri=None, save_json=True, compress_json=False, response_cache=None, aggregation=HOURLY_AGGREGATION, sample_interval=SAMPLE_INTERVAL, metrics=None):
+        super().__init__(output_folder, token_cache, base_url, save_json=save_json, compress_json=compress_json, response_cache=response_cache, aggregation=aggregation, sample_interval=sample_interval, metrics=metrics)
+
+        if not issuer or not client_id:
+            raise SeyLoginError("The keycloak issuer and client id are required by the HTTP login engine")
+
+        self._issuer = issuer.rstrip("/")
+        self._client_id = client_id
+        self._redirect_uri = redirect_uri or f"{base_url}/"
+
+    def _login(self):
+        print("Login into SEY (HTTP)")
+
+        if self._token_cache is not None and self._token_cache.refresh_token is not None:
+            try:
+                with self._metrics.span("token_refresh"):
+                    self._request_token({"grant_type": "refresh_token", "refresh_token": self._token_cache.refresh_token})
+                return
+            except SeyLoginError as e:
+                print(f"Cannot refresh the authorization token ({e}), login again")
+
+        with self._metrics.span("keycloak_login"):
+            self._request_token(self._authorization_code())
+
+    def _authorization_code(self):
+        ''' Post the credentials in the keycloak login form and return the token request of the received code '''
+
+        username, password = self._credentials
+
+        code_verifier = secrets.token_urlsafe(64)
+        code_challenge = base64.urlsafe_b64encode(hashlib.sha256(code_verifier.encode("ascii")).digest()).decode("ascii").rstrip("=")
+        state = secrets.token_urlsafe(16)
+
+        response = self._session.get(f"{self._issuer}/protocol/openid-connect/auth", params={
+            "client_id": self._client_id,
+            "redirect_uri": self._redirect_uri,
+            "response_type": "code",
+            "response_mode": "query",
+            "scope": "openid",
+            "state": state,
+            "nonce": secrets.token_urlsafe(16),
+            "code_challenge": code_challenge,
+            "code_challenge_method": "S256",
+        }, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+
+        parser = _LoginFormParser()
+        parser.feed(response.text)
+        if parser.action is None:
+            raise SeyLoginError("Login form not found")
+
+        response = self._session.post(urljoin(response.url, parser.action), data={
+            "username": username,
+            "password": password,
+            "credentialId": "",
+        }, allow_redirects=False, timeout=HTTP_TIMEOUT)
+
+        # Keycloak answers with the login form again when the credentials are refused
+        location = response.headers.get("Location")
+        if response.status_code not in (301, 302, 303) or location is None:
+            raise SeyLoginError(f"Credentials refused (HTTP {response.status_code})")
+
+        query = parse_qs(urlparse(location).query)
+        if query.get("state", [None])[0] != state or "code" not in query:
+            raise SeyLoginError("No authorization code in the redirection")
+
+        return {
+            "grant_type": "authorization_code",
+            "code": query["code"][0],
+            "redirect_uri": self._redirect_uri,
+            "code_verifier": code_verifier,
+        }
+
+    def _request_token(self, data):
+        now = time.time()
+
+        try:
+            response = self._session.post(f"{self._issuer}/protocol/openid-connect/token", data={"client_id": self._client_id, **data}, timeout=HTTP_TIMEOUT)
+        except requests.RequestException as e:
+            raise SeyLoginError(str(e)) from e
+
+        if response.status_code != 200:
+            raise SeyLoginError(f"Token request refused (HTTP {response.status_code})")
+
+        token = response.json()
+        authorization = f"Bearer {token['access_token']}"
+        self._set_header({"Authorization": authorization})
+
+        if self._token_cache is not None:
+            self._token_cache.store(
+                authorization,
+                expires_at=now + token["expires_in"] if "expires_in" in token else None,
+                refresh_token=token.get("refresh_token"),
+                refresh_expires_at=now + token["refresh_expires_in"] if token.get("refresh_expires_in") else None,
+            )
@@ -0,0 +1,92 @@
+''' Journal of the sums checkpointed at each day boundary '''
+
+import json
+import os
+from datetime import datetime, timedelta
+
+from .fileutils import atomic_write_json
+
+JOURNAL_FOLDER = "sums"
+LAST_SUMS_FILENAME = "last_sums.json"
+IMPORTED_FILENAME = "imported.json"  # Sums of last_sums.json when the journal was started from it
+
+
+class SumsJournalError(Exception):
+    ''' Raised when the sums at the start of a day are unknown '''
+
+
+class SumsJournal:
+    ''' One checkpoint file per day (sums/YYYYMMDD.json) with the sums at the end of the day, written atomically
+
+    last_sums.json is kept as a copy of the latest checkpoint.
+    '''
+
+    def __init__(self, folder) -> None:
+        self._folder = os.path.join(folder, JOURNAL_FOLDER)
+        self._last_sums_filename = os.path.join(folder, LAST_SUMS_FILENAME)
+        os.makedirs(self._folder, exist_ok=True)
+
+        if os.path.exists(self._last_sums_filename) and self._is_empty():
+            # Start the journal from the sums of the previous versions
+            sums = self._read(self._last_sums_filename)
+            print(f"Import {self._last_sums_filename} in the sums journal")
+            atomic_write_json(os.path.join(self._folder, IMPORTED_FILENAME), sums)
+            atomic_write_json(self._filename(sums['date']), sums)
+
+    def _is_empty(self):
+        with os.scandir(self._folder) as entries:
+            return not any(entry.name.endswith(".json") for entry in entries)
+
+    def _filename(self, day):
+        return os.path.join(self._folder, f"{day}.json")
+
+    def _read(self, filename):
+        with open(filename, "r", encoding="utf-8") as f:
+            return json.loads(f.read())
+
+    def days(self):
+        ''' Return the checkpointed days (YYYYMMDD) in chronological order '''
+        return sorted(filename[:-5] for filename in os.listdir(self._folder) if filename.endswith(".json") and filename[:-5].isdigit())
+
+    def last_day(self):
+        days = self.days()
+        return days[-1] if days else None
+
+    def load_before(self, day):
+        ''' Return the sums at the end of the latest checkpointed day before day, empty if there is none
+
+        Raise SumsJournalError for a day not after the sums imported from last_sums.json, whose start is unknown.
+        '''
+
+        # Usually the checkpoint of the day before
+        previous = (datetime.strptime(day, "%Y%m%d") - timedelta(days = 1)).strftime("%Y%m%d")
+        if not os.path.exists(self._filename(previous)):
+            previous = next((d for d in reversed(self.days()) if d < day), None)
+
+        if previous is None:
+            imported = os.path.join(self._folder, IMPORTED_FILENAME)
+            if os.path.exists(imported) and day <= self._read(imported)['date']:
+                raise SumsJournalError(f"The sums before {day} are unknown, the journal starts from the last_sums.json of {self._read(imported)['date']}")
+            return {}
+
+        print(f"Loading sums of {previous}")
+        return self._read(self._filename(previous))
+
+    def checkpoint(self, day, sums):
+        ''' Write the checkpoint of day alone, the later checkpoints and last_sums.json are left as is '''
+        atomic_write_json(self._filename(day), sums)
+
+    def save(self, day, sums):
+        ''' Checkpoint the sums at the end of day and invalidate the later checkpoints, return the invalidated days '''
+
+        self.checkpoint(day, sums)
+
+        # last_sums.json is the latest checkpoint, no need to look for later ones when saving the next days
+        last = self._read(self._last_sums_filename).get('date') if os.path.exists(self._last_sums_filename) else None
+        invalidated = [d for d in self.days() if d > day] if last is None or last > day else []
+        for d in invalidated:
+            os.remove(self._filename(d))
+
+        atomic_write_json(self._last_sums_filename, sums)
+
+        return invalidated
@@ -0,0 +1,117 @@
+''' Timing spans and counters of the runs, written as a JSON-lines run log and a Prometheus textfile '''
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .fileutils import atomic_write_text
+
+RUN_LOG_FILENAME = "run_log.jsonl"  # One line per span and one summary line per run, appended at each run
+METRICS_FILENAME = "metrics.prom"  # Metrics of the last run for the textfile collector of the Prometheus node exporter
+METRIC_PREFIX = "sey_meter_data"
+
+
+def _labels(labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}" if labels else ""
+
+
+class Metrics:
+    ''' Record the timing spans of the phases of a run and its counters, disabled without a folder
+
+    A span has a name, a start, a duration, a status and attributes (contract, bytes, samples...) that the timed
+    code can fill in the dict yielded by span().
+    '''
+
+    def __init__(self, folder=None, account=None) -> None:
+        self._folder = folder
+        self._labels = {"account": account} if account else {}
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._started = time.time()
+        self._spans = []
+        self._counters = {}
+
+    @property
+    def enabled(self):
+        return self._folder is not None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        ''' Time the block as a phase of the run, its status is error if it raises '''
+
+        if not self.enabled:
+            yield attributes
+            return
+
+        start = time.time()
+        counter = time.perf_counter()
+        status = "ok"
+        try:
+            yield attributes
+        except BaseException as e:
+            status = "error"
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            span = {"span": name, "start": round(start, 3), "duration": round(time.perf_counter() - counter, 6), "status": status, **attributes}
+            with self._lock:
+                self._spans.append(span)
+
+    def count(self, name, value=1):
+        ''' Add value to a counter of the run, e.g. the number of retries '''
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def flush(self, success=True):
+        ''' Append the spans of the run to the run log, write the metrics file, then start a new run '''
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            started, spans, counters = self._started, self._spans, self._counters
+            self._reset()
+
+        if not spans and not counters:
+            return
+
+        duration = round(time.time() - started, 3)
+        run = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started))
+
+        with open(os.path.join(self._folder, RUN_LOG_FILENAME), "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps({"run": run, **self._labels, **span}) + "\n")
+            f.write(json.dumps({"run": run, **self._labels, "span": "run", "start": round(started, 3), "duration": duration, "status": "ok" if success else "error", "counters": counters}) + "\n")
+
+        phases = {}
+        for span in spans:
+            phase = phases.setdefault(span["span"], [0, 0.0, 0])
+            phase[0] += 1
+            phase[1] += span["duration"]
+            phase[2] += span["status"] != "ok"
+
+        lines = []
+
+        def metric(name, help, values):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.extend(f"{METRIC_PREFIX}_{name}{_labels({**self._labels, **labels})} {value}" for labels, value in values)
+
+        metric("last_run_timestamp_seconds", "Start of the last run", [({}, round(started, 3))])
+        metric("last_run_duration_seconds", "Duration of the last run", [({}, duration)])
+        metric("last_run_success", "1 if the last run succeeded", [({}, int(success))])
+        metric("phase_duration_seconds", "Total duration of each phase in the last run", [({"phase": name}, round(total, 6)) for name, (_, total, _) in phases.items()])
+        metric("phase_count", "Number of spans of each phase in the last run", [({"phase": name}, count) for name, (count, _, _) in phases.items()])
+        metric("phase_errors", "Number of failed spans of each phase in the last run", [({"phase": name}, errors) for name, (_, _, errors) in phases.items()])
+        for name, value in sorted(counters.items()):
+            metric(name, f"Counter {name} of the last run", [({}, value)])
+
+        atomic_write_text(os.path.join(self._folder, METRICS_FILENAME), "\n".join(lines) + "\n")
@@ -0,0 +1,62 @@
+''' Persistent content hashes of the responses of the SEY API, to skip the unchanged ones '''
+
+import json
+import os
+import threading
+
+from .fileutils import atomic_write_json
+
+RESPONSE_CACHE_FILENAME = "response_cache.json"
+
+
+def response_key(contract_id, subject_id, first_day, last_day, aggregation):
+    ''' Identify a meterdatavalues request, e.g. el-contract/subject/20250801-20250831/2 '''
+
+    return f"{contract_id}/{subject_id}/{first_day:%Y%m%d}-{last_day:%Y%m%d}/{aggregation}"
+
+
+class ResponseCache:
+    ''' SHA-256 of the latest response received for each request
+
+    The new hashes are kept in memory until save() is called, once the responses have been stored and exported,
+    so a run interrupted before the export fetches and exports them again.
+    '''
+
+    def __init__(self, folder, filename=RESPONSE_CACHE_FILENAME) -> None:
+        self._filename = os.path.join(folder, filename)
+        self._hashes = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._filename):
+            return
+
+        try:
+            with open(self._filename, "r", encoding="utf-8") as f:
+                self._hashes = json.loads(f.read())
+        except (OSError, ValueError):
+            print(f"WARNING: Ignoring unreadable response cache: {self._filename}")
+            self._hashes = {}
+
+    def unchanged(self, key, digest):
+        ''' True if the response of the request has the same hash as the previous one, else remember the new hash '''
+
+        with self._lock:
+            if self._pending.get(key, self._hashes.get(key)) == digest:
+                return True
+
+            self._pending[key] = digest
+            return False
+
+    def save(self):
+        ''' Write the hashes of the responses received since the last save '''
+
+        with self._lock:
+            if not self._pending:
+                return
+
+            self._hashes.update(self._pending)
+            self._pending = {}
+            atomic_write_json(self._filename, self._hashes)
@@ -0,0 +1,137 @@
+''' Compact array-backed storage of the meter samples '''
+
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from operator import ne
+from zoneinfo import ZoneInfo
+
+EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+SAMPLE_INTERVAL = 3600  # Seconds covered by a sample of the hourly aggregation, its timestamp is the end of the interval
+TIMEZONE = ZoneInfo("Europe/Zurich")  # Time zone of the days of the SEY portal
+
+
+def expected_samples(day, interval=SAMPLE_INTERVAL):
+    ''' Return the number of samples of a local day, e.g. 23 or 25 hourly samples on the days of the switch to summer or winter time '''
+
+    start = datetime(day.year, day.month, day.day, tzinfo=TIMEZONE)
+    end = datetime.combine(day + timedelta(days = 1), datetime.min.time(), TIMEZONE)
+    return int((end.timestamp() - start.timestamp()) // interval)
+
+
+def data_interval(series_list, default=SAMPLE_INTERVAL):
+    ''' Return the seconds between two consecutive samples of the series, default if none holds two samples '''
+
+    spacings = [min(map(int.__sub__, series.start[1:], series.start[:-1])) for series in series_list if len(series) > 1]
+    return min(spacings) if spacings else default
+
+
+def format_labels(local_times):
+    ''' Format local times in seconds since the epoch as dd.mm.YYYY HH:MM '''
+    return [f"{t.tm_mday:02d}.{t.tm_mon:02d}.{t.tm_year} {t.tm_hour:02d}:{t.tm_min:02d}" for t in map(time.gmtime, local_times)]
+
+
+def hour_ends(starts):
+    ''' Return a mask with 1 for the last of the chronological starts of each hour, to downsample the samples shorter than an hour '''
+
+    hours = [start // SAMPLE_INTERVAL for start in starts]
+    return bytes(map(ne, hours, hours[1:] + [None]))
+
+
+class MeterSeries:
+    ''' Samples of one timeserie parsed once
+
+    start: epoch seconds of the start of the measured interval
+    offset: UTC offset in seconds of the sample, the local time is start + offset
+    value: measured value
+    metadata: the other fields of the timeserie in the API (unit, translation...)
+    interval: seconds covered by each sample, given by the aggregation of the request
+    '''
+
+    __slots__ = ("obis", "meteringpoint", "metadata", "interval", "start", "offset", "value", "_labels")
+
+    def __init__(self, obis=None, meteringpoint=None, metadata=None, interval=SAMPLE_INTERVAL) -> None:
+        self.obis = obis
+        self.meteringpoint = meteringpoint
+        self.metadata = metadata if metadata is not None else {}
+        self.interval = interval
+        self.start = array('q')
+        self.offset = array('l')
+        self.value = array('d')
+        self._labels = None
+
+    def __len__(self):
+        return len(self.value)
+
+    def append(self, x, y):
+        ''' Add a sample of the SEY API: x is the ISO timestamp of the end of the interval, y the value '''
+
+        dt = datetime.fromisoformat(x)
+        self.start.append(int(dt.timestamp()) - self.interval)
+        self.offset.append(int(dt.utcoffset().total_seconds()))
+        self.value.append(y)
+        self._labels = None
+
+    @classmethod
+    def from_timeserie(cls, timeserie, interval=SAMPLE_INTERVAL):
+        ''' Parse a timeserie of a meterdatavalues document '''
+
+        series = cls(timeserie.get('obis'), timeserie.get('meteringpoint'), {key: value for key, value in timeserie.items() if key != 'data'}, interval)
+        for sample in timeserie['data']:
+            series.append(sample['x'], sample['y'])
+
+        return series
+
+    def set_interval(self, interval):
+        ''' Change the seconds covered by each sample, the timestamps of the end of the samples are kept '''
+
+        shift = self.interval - interval
+        self.start = array('q', (start + shift for start in self.start))
+        self.interval = interval
+        self._labels = None
+
+    def to_timeserie(self):
+        ''' Build the timeserie of a meterdatavalues document back from the samples '''
+
+        data = [
+            {'x': datetime.fromtimestamp(start + self.interval, timezone(timedelta(seconds=offset))).isoformat(), 'y': value}
+            for start, offset, value in zip(self.start, self.offset, self.value)
+        ]
+        return {**self.metadata, 'data': data}
+
+    def slice(self, first, last):
+        ''' Return the samples from index first to last (excluded) as a new series '''
+
+        series = MeterSeries(self.obis, self.meteringpoint, self.metadata, self.interval)
+        series.start = self.start[first:last]
+        series.offset = self.offset[first:last]
+        series.value = self.value[first:last]
+        return series
+
+    def local_times(self):
+        ''' Return the local start time of every sample in seconds since the epoch, as if local time was UTC '''
+        return array('q', map(int.__add__, self.start, self.offset))
+
+    def labels(self):
+        ''' Return the local start time of every sample formatted as dd.mm.YYYY HH:MM, formatted once and cached '''
+
+        if self._labels is None:
+            self._labels = format_labels(self.local_times())
+
+        return self._labels
+
+
+def split_by_day(series_list, days):
+    ''' Split series spanning several days into {date: [MeterSeries]} with the samples of each local day '''
+
+    result = {day.date(): [] for day in days}
+
+    for series in series_list:
+        local_times = series.local_times()
+        for day in result:
+            day_start = (day.toordinal() - EPOCH_ORDINAL) * 86400
+            # The samples are sorted chronologically
+            result[day].append(series.slice(bisect_left(local_times, day_start), bisect_left(local_times, day_start + 86400)))
+
+    return result
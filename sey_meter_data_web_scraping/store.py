@@ -0,0 +1,175 @@
+''' Local SQLite store of all the fetched readings '''
+
+import json
+import os
+import sqlite3
+from datetime import date
+
+from .series import SAMPLE_INTERVAL, MeterSeries
+
+STORE_FILENAME = "readings.sqlite3"
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS timeseries (
+    contract TEXT NOT NULL,
+    obis TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    metadata TEXT NOT NULL,
+    interval INTEGER NOT NULL DEFAULT 3600,
+    PRIMARY KEY (contract, obis)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS readings (
+    contract TEXT NOT NULL,
+    obis TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (contract, obis, start)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS readings_day ON readings (contract, day);
+'''
+
+
+def local_day(start, offset):
+    ''' Return the local day of a sample as a YYYYMMDD integer '''
+
+    d = date.fromordinal(date(1970, 1, 1).toordinal() + (start + offset) // 86400)
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def day_key(day):
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+class SeyStore:
+    ''' Readings keyed by (contract, OBIS code, start of the sample), with an index on the local day
+
+    Writing the same readings again is idempotent, a changed value replaces the stored one. Readings of a new
+    aggregation replace all the readings of the timeseries, so they are never mixed with the previous one.
+    '''
+
+    def __init__(self, folder, filename=STORE_FILENAME) -> None:
+        self._connection = sqlite3.connect(os.path.join(folder, filename))
+        self._connection.executescript(SCHEMA)
+
+        # Stores created before the configurable aggregation only hold hourly readings
+        if "interval" not in [column for _, column, *_ in self._connection.execute("PRAGMA table_info(timeseries)")]:
+            self._connection.execute(f"ALTER TABLE timeseries ADD COLUMN interval INTEGER NOT NULL DEFAULT {SAMPLE_INTERVAL}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def upsert(self, contract_id, json_data):
+        ''' Store the timeseries of a meterdatavalues document, return the number of new or changed readings '''
+        return self.upsert_series(contract_id, [MeterSeries.from_timeserie(timeserie) for timeserie in json_data['timeseries']])
+
+    def upsert_series(self, contract_id, series_list):
+        ''' Store the parsed timeseries of a contract, return the number of new or changed readings '''
+
+        with self._connection:
+            intervals = self.intervals(contract_id)
+            for position, series in enumerate(series_list):
+                if intervals.get(series.obis, series.interval) != series.interval:
+                    # A series holds the readings of one aggregation, the other ones are fetched again by fill_gaps
+                    print(f"WARNING: The readings of {series.obis} every {intervals[series.obis]} s are replaced by readings every {series.interval} s")
+                    self._connection.execute("DELETE FROM readings WHERE contract = ? AND obis = ?", (contract_id, series.obis))
+                self._connection.execute(
+                    "INSERT INTO timeseries (contract, obis, position, metadata, interval) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (contract, obis) DO UPDATE SET position = excluded.position, metadata = excluded.metadata, interval = excluded.interval",
+                    (contract_id, series.obis, position, json.dumps(series.metadata, ensure_ascii=False), series.interval),
+                )
+
+            changes = self._connection.total_changes
+            for series in series_list:
+                self._upsert_series(contract_id, series)
+
+            return self._connection.total_changes - changes
+
+    def _upsert_series(self, contract_id, series):
+        self._connection.executemany(
+            "INSERT INTO readings (contract, obis, start, offset, day, value) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (contract, obis, start) DO UPDATE SET value = excluded.value, offset = excluded.offset "
+            "WHERE value != excluded.value OR offset != excluded.offset",
+            ((contract_id, series.obis, start, offset, local_day(start, offset), value) for start, offset, value in zip(series.start, series.offset, series.value)),
+        )
+
+    def upsert_days(self, electrical_contract_id, water_contract_id, days):
+        ''' Store the collected (date, electrical series, water series) days
+
+        The series of a contract whose response did not change (None) are read from the store instead.
+        Return the days with the series of both contracts, and the dates with new or changed readings.
+        '''
+        result = []
+        changed = []
+        for dt, data_electricity, data_water in days:
+            changes = 0
+            series_lists = []
+            for contract_id, series_list in ((electrical_contract_id, data_electricity), (water_contract_id, data_water)):
+                if series_list is None:
+                    series_list = self.series(contract_id, dt, dt)
+                else:
+                    changes += self.upsert_series(contract_id, series_list)
+                series_lists.append(series_list)
+
+            result.append((dt, *series_lists))
+            if changes > 0:
+                changed.append(dt)
+
+        return result, changed
+
+    def days(self, contract_id):
+        ''' Return the days with readings of the contract '''
+
+        rows = self._connection.execute("SELECT DISTINCT day FROM readings WHERE contract = ? ORDER BY day", (contract_id,))
+        return [date(day // 10000, day // 100 % 100, day % 100) for day, in rows]
+
+    def obis_codes(self, contract_id):
+        ''' Return the OBIS codes of the timeseries of the contract in the order of the API '''
+
+        rows = self._connection.execute("SELECT obis FROM timeseries WHERE contract = ? ORDER BY position", (contract_id,))
+        return [obis for obis, in rows]
+
+    def intervals(self, contract_id):
+        ''' Return {obis: seconds covered by each reading} of the timeseries of the contract '''
+
+        rows = self._connection.execute("SELECT obis, interval FROM timeseries WHERE contract = ?", (contract_id,))
+        return dict(rows)
+
+    def counts(self, contract_id, date_from, date_to):
+        ''' Return {(obis, day): number of readings} of the contract from date_from to date_to (included) '''
+
+        rows = self._connection.execute(
+            "SELECT obis, day, COUNT(*) FROM readings WHERE contract = ? AND day BETWEEN ? AND ? GROUP BY obis, day",
+            (contract_id, day_key(date_from), day_key(date_to)))
+        return {(obis, date(day // 10000, day // 100 % 100, day % 100)): count for obis, day, count in rows}
+
+    def series(self, contract_id, date_from, date_to):
+        ''' Return the readings of the contract from date_from to date_to (included) as MeterSeries in the order of the API '''
+
+        result = []
+        for obis, metadata, interval in self._connection.execute("SELECT obis, metadata, interval FROM timeseries WHERE contract = ? ORDER BY position", (contract_id,)):
+            metadata = json.loads(metadata)
+            series = MeterSeries(obis, metadata.get('meteringpoint'), metadata, interval)
+            for start, offset, value in self._connection.execute(
+                    "SELECT start, offset, value FROM readings WHERE contract = ? AND obis = ? AND day BETWEEN ? AND ? ORDER BY start",
+                    (contract_id, obis, day_key(date_from), day_key(date_to))):
+                series.start.append(start)
+                series.offset.append(offset)
+                series.value.append(value)
+            result.append(series)
+
+        return result
+
+    def document(self, contract_id, date_from, date_to):
+        ''' Regenerate the meterdatavalues document of the contract from date_from to date_to (included) '''
+
+        return {'timeseries': [series.to_timeserie() for series in self.series(contract_id, date_from, date_to)]}
@@ -0,0 +1,132 @@
+''' Incremental parsing of the meterdatavalues responses '''
+
+import codecs
+import json
+
+from .series import SAMPLE_INTERVAL, MeterSeries
+
+CHUNK_SIZE = 64 * 1024  # Bytes read at once from a response or a file
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class _Reader:
+    ''' Decode JSON values one by one from a stream of byte chunks, keeping only the unparsed text in memory '''
+
+    def __init__(self, chunks) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        ''' Append the next chunk to the unparsed text, return False at the end of the stream '''
+
+        if self._eof:
+            return False
+
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._decoder.decode(b"", final=True)
+        else:
+            text = self._decoder.decode(chunk)
+
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def peek(self):
+        ''' Return the next character that is not a whitespace, without consuming it '''
+
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of the JSON document")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at '{self._buffer[self._pos:self._pos + 20]}'")
+        self._pos += 1
+
+    def next_item(self, end):
+        ''' Consume the separator before the next item of an object or an array, return False at its end '''
+
+        char = self.peek()
+        if char == end:
+            self._pos += 1
+            return False
+        if char == ",":
+            self._pos += 1
+        return True
+
+    def value(self):
+        ''' Decode the next value, waiting for more chunks while it is incomplete '''
+
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+                # A number cut by the end of a chunk is decoded as a shorter number, so the value must be followed by a delimiter
+                if self._eof or (end < len(self._buffer) and self._buffer[end] in _DELIMITERS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+
+            self._fill()
+
+    def key(self):
+        key = self.value()
+        self.expect(":")
+        return key
+
+
+def parse_meterdatavalues(chunks, interval=SAMPLE_INTERVAL):
+    ''' Parse a meterdatavalues document from its byte chunks into one MeterSeries per timeserie of samples covering interval seconds
+
+    The samples are appended to the series as they are read, the whole document is never built.
+    '''
+
+    reader = _Reader(chunks)
+    result = []
+
+    reader.expect("{")
+    while reader.next_item("}"):
+        if reader.key() != "timeseries":
+            reader.value()
+            continue
+
+        reader.expect("[")
+        while reader.next_item("]"):
+            result.append(_parse_timeserie(reader, interval))
+
+    return result
+
+
+def _parse_timeserie(reader, interval):
+    series = MeterSeries(metadata={}, interval=interval)
+
+    reader.expect("{")
+    while reader.next_item("}"):
+        key = reader.key()
+        if key != "data":
+            series.metadata[key] = reader.value()
+            continue
+
+        reader.expect("[")
+        while reader.next_item("]"):
+            sample = reader.value()
+            series.append(sample['x'], sample['y'])
+
+    series.obis = series.metadata.get('obis')
+    series.meteringpoint = series.metadata.get('meteringpoint')
+    return series
+
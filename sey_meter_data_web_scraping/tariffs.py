@@ -0,0 +1,121 @@
+''' Tariff schedule compiled into hour-of-week lookup tables '''
+
+import json
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+HOURS_PER_WEEK = 168
+SUNDAY = 6
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Tariffs 2025 of SEY
+#  Electricity: https://www.yverdon-energies.ch/electricite/#tarifs-reglements warning, this is in ct.
+#  Water: https://www.yverdon-energies.ch/eau/#tarifs-reglements
+DEFAULT_TARIFFS = {
+    "periods": [
+        {
+            "valid_from": "2025-01-01",
+            "high_tariff": [
+                {"weekdays": [0, 1, 2, 3], "hours": [[6, 22]]},
+                {"weekdays": [4, 5, 6], "hours": [[10, 13], [17, 22]]},
+            ],
+            "holidays": [],
+            "prices": {
+                "electricity_production": {"unit": "ct", "vat": 0.0, "high": [12.20, 1.50], "low": [12.20, 1.50]},
+                "electricity_consumption": {
+                    "unit": "ct",
+                    "vat": 0.081,
+                    "high": [16.76, 15.31, 0.59, 0.25, 2.49, 0.6, 0.022, 0.76, 0.7, 0.6],
+                    "low": [14.32, 9.31, 0.59, 0.25, 2.49, 0.6, 0.022, 0.76, 0.7, 0.6],
+                },
+                # (Conditions de vente) + (Taxe d'épuration des eaux usées) * TVA 8.1%
+                "water_consumption": {"unit": "CHF", "vat": 0.081, "high": [2.95, 2.30], "low": [2.95, 2.30]},
+            },
+        },
+    ],
+}
+
+UNIT_DIVISORS = {"CHF": 1.0, "ct": 100.0}
+
+
+def hour_of_week(local_time):
+    ''' Return the slot of a local time in seconds since the epoch: weekday * 24 + hour, Monday 00:00 is 0 '''
+    # 1970-01-01 was a Thursday, so hour 0 since the epoch is the slot 3 * 24
+    return (local_time // 3600 + 72) % HOURS_PER_WEEK
+
+
+def load_tariffs(filename=None):
+    ''' Load the tariff schedule from a JSON file, or the default schedule if no file is given '''
+
+    if not filename:
+        return TariffSchedule(DEFAULT_TARIFFS)
+
+    with open(filename, "r", encoding="utf-8") as f:
+        print(f"Loading tariffs: {filename}")
+        return TariffSchedule(json.loads(f.read()))
+
+
+class TariffPeriod:
+    ''' Tariffs valid from a date, compiled into tables of 168 slots (one per hour of the week) '''
+
+    def __init__(self, config) -> None:
+        self.valid_from = date.fromisoformat(config["valid_from"])
+        self.holidays = frozenset(date.fromisoformat(d).toordinal() for d in config.get("holidays", []))
+
+        self.high = bytearray(HOURS_PER_WEEK)
+        for window in config.get("high_tariff", []):
+            for weekday in window["weekdays"]:
+                for start, end in window["hours"]:
+                    self.high[weekday * 24 + start:weekday * 24 + end] = b"\x01" * (end - start)
+
+        self.prices = {}
+        for product, price in config.get("prices", {}).items():
+            factor = 1 + price.get("vat", 0.0)
+            divisor = UNIT_DIVISORS[price.get("unit", "CHF")]
+            high_price = sum(price["high"]) * factor / divisor
+            low_price = sum(price.get("low", price["high"])) * factor / divisor
+            self.prices[product] = array('d', (high_price if h else low_price for h in self.high))
+
+
+class TariffSchedule:
+    ''' Classify and price samples by table lookups, applying the period valid at the date of each sample
+
+    The first period also applies to the samples before its validity. On holidays, the Sunday tariff applies.
+    '''
+
+    def __init__(self, config) -> None:
+        self.periods = sorted((TariffPeriod(period) for period in config["periods"]), key=lambda period: period.valid_from)
+        self._starts = [(period.valid_from.toordinal() - EPOCH_ORDINAL) * 86400 for period in self.periods]
+
+    def _lookup(self, tables, local_times):
+        ''' Index the table of 168 slots of each period with the slot of each sample (sorted chronologically) '''
+
+        slots = array('H', map(hour_of_week, local_times))
+
+        result = []
+        for i, period in enumerate(self.periods):
+            # The samples of the period are a contiguous segment since they are sorted
+            first = 0 if i == 0 else bisect_left(local_times, self._starts[i])
+            last = len(local_times) if i == len(self.periods) - 1 else bisect_left(local_times, self._starts[i + 1])
+            if first >= last:
+                continue
+
+            segment = slots[first:last]
+            for holiday in period.holidays:
+                # Overlay the Sunday slots on the samples of the holiday
+                day_start = (holiday - EPOCH_ORDINAL) * 86400
+                for j in range(max(first, bisect_left(local_times, day_start)), min(last, bisect_left(local_times, day_start + 86400))):
+                    segment[j - first] = SUNDAY * 24 + local_times[j] // 3600 % 24
+
+            result.extend(map(tables(period).__getitem__, segment))
+
+        return result
+
+    def high_tariff_mask(self, local_times):
+        ''' Return 1 for each sample in the high tariff, 0 otherwise '''
+        return bytearray(self._lookup(lambda period: period.high, local_times))
+
+    def prices(self, product, local_times):
+        ''' Return the price of the product for each sample '''
+        return array('d', self._lookup(lambda period: period.prices[product], local_times))
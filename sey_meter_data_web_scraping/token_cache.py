@@ -0,0 +1,97 @@
+''' Persistent cache of the authorization token used by the SEY API '''
+
+import base64
+import binascii
+import json
+import os
+import time
+
+from .fileutils import atomic_write_json
+
+TOKEN_CACHE_FILENAME = "token_cache.json"
+EXPIRY_MARGIN = 60  # Consider the token expired this many seconds before its real expiry
+DEFAULT_TOKEN_LIFETIME = 300  # Keycloak default, used when the token carries no "exp" claim
+
+
+def token_expiry(authorization):
+    ''' Return the expiry timestamp of a "Bearer <jwt>" authorization, or None if it cannot be decoded '''
+
+    token = authorization.split(" ", 1)[-1]
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (binascii.Error, ValueError):
+        return None
+
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class TokenCache:
+    ''' Store the bearer token (and the refresh token of the HTTP login) on disk with its expiry '''
+
+    def __init__(self, folder, filename=TOKEN_CACHE_FILENAME) -> None:
+        self._filename = os.path.join(folder, filename)
+        self._entry = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._filename):
+            return
+
+        try:
+            with open(self._filename, "r", encoding="utf-8") as f:
+                self._entry = json.loads(f.read())
+        except (OSError, ValueError):
+            print(f"WARNING: Ignoring unreadable token cache: {self._filename}")
+            self._entry = {}
+
+    def _is_valid(self, key_expires_at):
+        expires_at = self._entry.get(key_expires_at)
+        return expires_at is not None and time.time() < expires_at - EXPIRY_MARGIN
+
+    def header(self):
+        ''' Return the cached authorization header, or None if missing or expired '''
+
+        if "authorization" not in self._entry or not self._is_valid("expires_at"):
+            return None
+
+        return {"Authorization": self._entry["authorization"]}
+
+    @property
+    def refresh_token(self):
+        ''' Return the cached refresh token, or None if missing or expired '''
+
+        if "refresh_token" not in self._entry:
+            return None
+
+        if "refresh_expires_at" in self._entry and not self._is_valid("refresh_expires_at"):
+            return None
+
+        return self._entry["refresh_token"]
+
+    def store(self, authorization, expires_at=None, refresh_token=None, refresh_expires_at=None):
+        ''' Save a new authorization, its expiry defaults to the "exp" claim of the token '''
+
+        if expires_at is None:
+            expires_at = token_expiry(authorization) or time.time() + DEFAULT_TOKEN_LIFETIME
+
+        self._entry = {"authorization": authorization, "expires_at": expires_at}
+
+        if refresh_token is not None:
+            self._entry["refresh_token"] = refresh_token
+            if refresh_expires_at is not None:
+                self._entry["refresh_expires_at"] = refresh_expires_at
+
+        atomic_write_json(self._filename, self._entry)
+
+    def invalidate(self):
+        ''' Forget the cached authorization, e.g. after the API rejected it '''
+
+        self._entry = {}
+        if os.path.exists(self._filename):
+            os.remove(self._filename)
@@ -1,23 +1,401 @@
-﻿import json
+﻿import gzip
+import hashlib
+import json
 import os
+import tempfile
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
+from itertools import accumulate, compress
+from operator import mul
 
-import requests
+from .journal import SumsJournal
+from .metrics import Metrics
+from .response_cache import response_key
+from .series import SAMPLE_INTERVAL, MeterSeries, format_labels, hour_ends, split_by_day
+from .stream import CHUNK_SIZE, parse_meterdatavalues
+from .tariffs import TariffSchedule, load_tariffs
 
-from selenium import webdriver
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
-from selenium.webdriver.common.by import By
+WAIT_TIMEOUT = 20  # Default timeout in seconds for all WebDriverWait calls
+HTTP_TIMEOUT = 10  # Timeout in seconds for the calls to the SEY API
+HTTP_RETRIES = 3  # Number of retries of a call to the SEY API after a transient failure
+HTTP_BACKOFF = 1.0  # Delay in seconds before the first retry, doubled at each retry
+HTTP_MAX_BACKOFF = 10.0  # Upper bound of the delay between two retries
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+HTTP_MAX_WORKERS = 4  # Number of concurrent calls to the SEY API
+RELOGIN_MIN_INTERVAL = 60  # Seconds after a login before its own token, if rejected, can trigger another login
 
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+BASE_URL = "https://my.yverdon-energies.ch"
+MAX_RANGE_DAYS = 31  # Widest window of days requested at once to the SEY API
+HOURLY_AGGREGATION = 2  # aggregation parameter of the SEY API for one sample per hour, the codes of the finer aggregations are not documented
 
-WAIT_TIMEOUT = 20  # Default timeout in seconds for all WebDriverWait calls
+ELECTRICAL_JSON_FILENAME = "electrical_data_{:%Y%m%d}.json"
+WATER_JSON_FILENAME = "water_json_data_{:%Y%m%d}.json"
+
+BROWSER_PROFILE_FOLDER = "chrome-profile"  # Persistent profile of the lean browser mode, in the data folder
+# Resources not needed to login, blocked in the lean browser mode. The stylesheets are kept: the waits check the visibility of the elements
+BLOCKED_URLS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm"]
+
+ARTIFACTS_OFF = "off"  # No screenshot at all
+ARTIFACTS_ON_FAILURE = "on-failure"  # Screenshots kept in memory, written only when the browser login fails
+ARTIFACTS_ALWAYS = "always"  # Screenshots written at every step
+ARTIFACT_BUFFER_SIZE = 5  # Number of the most recent screenshots kept in memory
+ARTIFACTS_FOLDER = "artifacts"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+
+def json_filename(template, first_day, last_day, compress=False):
+    ''' Name the raw response of the days, e.g. electrical_data_20250801.json or electrical_data_20250801_20250831.json.gz '''
+
+    if first_day == last_day:
+        filename = template.format(first_day)
+    else:
+        root, extension = os.path.splitext(template)
+        filename = f"{root}_{{:%Y%m%d}}{extension}".format(first_day, last_day)
+
+    return filename + ".gz" if compress else filename
+
+class SeyScraper:
+    ''' Common part of the scrapers: call the SEY API with the authorization token '''
+
+    def __init__(self, output_folder, token_cache=None, base_url=BASE_URL, max_workers=HTTP_MAX_WORKERS, save_json=True, compress_json=False, response_cache=None, aggregation=HOURLY_AGGREGATION, sample_interval=SAMPLE_INTERVAL, metrics=None):
+        # Imported by the first scraper, the exports do not need it
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._user_agent = USER_AGENT
+        self._output_folder = output_folder
+        self._save_json_enabled = save_json
+        self._compress_json = compress_json
+        self._token_cache = token_cache
+        self._response_cache = response_cache
+        self._aggregation = aggregation
+        self._sample_interval = sample_interval  # Seconds covered by a sample of the aggregation
+        self._metrics = metrics if metrics is not None else Metrics()
+        self._base_url = base_url
+        self._max_workers = max_workers
+        self._header = None
+        self._credentials = None
+        self._login_header = None  # Header obtained by the last login, and the time.monotonic() of that login
+        self._login_time = None
+        self._login_lock = threading.Lock()
+
+        # One keep-alive session for all the calls to the portal, with a connection per worker
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = self._user_agent
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        assert os.path.exists(self._output_folder)
+
+    def login(self, username, password):
+        self._credentials = (username, password)
+
+        if self._token_cache is not None:
+            header = self._token_cache.header()
+            if header is not None:
+                print("Reuse the cached authorization token")
+                self._set_header(header)
+                self._metrics.count("cached_token_reuses")
+                return
+
+        self._fresh_login()
+
+    def _fresh_login(self):
+        with self._metrics.span("login"):
+            self._login()
+        self._login_header = self._header
+        self._login_time = time.monotonic()
+
+    def _login(self):
+        ''' Get a new authorization token, implemented by each login engine '''
+        raise NotImplementedError
+
+    def _set_header(self, header):
+        self._header = dict(header)
+        self._header["User-Agent"] = self._user_agent
+
+    def _request(self, url, header):
+        ''' GET the url, retry with a bounded exponential backoff on transient failures '''
+
+        import requests
+
+        for attempt in range(HTTP_RETRIES + 1):
+            try:
+                # The body is streamed, it is read by the caller
+                response = self._session.get(url, headers=header, timeout=HTTP_TIMEOUT, stream=True)
+                if response.status_code not in HTTP_RETRY_STATUS_CODES or attempt == HTTP_RETRIES:
+                    return response
+                error = f"HTTP {response.status_code}"
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == HTTP_RETRIES:
+                    raise
+                error = e
+
+            delay = min(HTTP_BACKOFF * 2 ** attempt, HTTP_MAX_BACKOFF)
+            print(f"WARNING: Call to the SEY API failed ({error}), retry in {delay:.1f} s")
+            self._metrics.count("http_retries")
+            time.sleep(delay)
+
+    def _get(self, url):
+        ''' Call the SEY API, login again if the token is rejected
+
+        The token of a login rejected right after it is not renewed again, the credentials are not the issue.
+        A token rejected later has expired, e.g. between two polls of the resident mode, and is renewed.
+        '''
+
+        header = self._header
+        response = self._request(url, header)
+
+        if response.status_code == 401 and self._credentials is not None:
+            # Concurrent calls may be rejected together, only the first one logs in again
+            with self._login_lock:
+                if self._header is header and (header is not self._login_header or time.monotonic() - self._login_time >= RELOGIN_MIN_INTERVAL):
+                    print("The authorization token has been rejected, login again")
+                    if self._token_cache is not None:
+                        self._token_cache.invalidate()
+                    self._fresh_login()
+
+            if self._header is not header:
+                response.close()
+                response = self._request(url, self._header)
+
+        response.raise_for_status()
+
+        return response
+
+    def _meterdatavalues_url(self, contract_id, subject_id, start_dt, end_dt):
+        return f"{self._base_url}/ebpapi/ebp/meterdatavalues/{contract_id}?subject_id={subject_id}&role=1&date_from={start_dt.isoformat()}&date_to={end_dt.isoformat()}&aggregation={self._aggregation}&compareActive=false"
+
+    def _fetch(self, contract_id, subject_id, first_day, last_day, json_template=None):
+        ''' Get the data of a contract from the first to the last day (included) as a list of MeterSeries
+
+        The response is parsed while it is received, and written as is to a file named from json_template.
+        With the response cache, the response is hashed first and None is returned if it did not change since the
+        previous run: it is neither parsed nor written again.
+        '''
+
+        start_dt = datetime.combine(first_day, datetime.min.time())
+        end_dt = datetime.combine(last_day + timedelta(days = 1), datetime.min.time()) - timedelta(minutes = 1)
+
+        with self._metrics.span("api_call", contract=contract_id, days=(last_day - first_day).days + 1, bytes=0) as span:
+            series_list = self._fetch_response(self._meterdatavalues_url(contract_id, subject_id, start_dt, end_dt), contract_id, subject_id, first_day, last_day, json_template, span)
+
+            span["unchanged"] = series_list is None
+            if series_list is not None:
+                span["samples"] = sum(map(len, series_list))
+                self._metrics.count("samples", span["samples"])
+            self._metrics.count("response_bytes", span["bytes"])
+
+        return series_list
+
+    def _fetch_response(self, url, contract_id, subject_id, first_day, last_day, json_template, span):
+        ''' Get the response of the url as in _fetch, filling the span with its status, latency and size '''
+
+        with self._get(url) as meterdatavalues:
+            span["status_code"] = meterdatavalues.status_code
+            span["latency"] = round(meterdatavalues.elapsed.total_seconds(), 6)
+
+            def measure(chunk):
+                span["bytes"] += len(chunk)
+                return chunk
+
+            chunks = map(measure, meterdatavalues.iter_content(CHUNK_SIZE))
+            filename = json_filename(json_template, first_day, last_day, self._compress_json) if json_template is not None and self._save_json_enabled else None
+
+            if self._response_cache is not None:
+                return self._capture_changed(response_key(contract_id, subject_id, first_day, last_day, self._aggregation), filename, chunks)
+
+            if filename is None:
+                return parse_meterdatavalues(chunks, self._sample_interval)
+
+            return self._capture(filename, chunks)
+
+    def _capture(self, filename, chunks):
+        ''' Write the chunks of a response to a file while parsing them, the file appears once complete '''
+
+        full_filename = os.path.join(self._output_folder, filename)
+        part_filename = full_filename + ".part"
+
+        try:
+            with (gzip.open if self._compress_json else open)(part_filename, "wb") as f:
+                def write(chunk):
+                    f.write(chunk)
+                    return chunk
+
+                series_list = parse_meterdatavalues(map(write, chunks), self._sample_interval)
+
+            os.replace(part_filename, full_filename)
+        except BaseException:
+            if os.path.exists(part_filename):
+                os.remove(part_filename)
+            raise
+
+        print(f"Save json: {filename}")
+        return series_list
+
+    def _capture_changed(self, key, filename, chunks):
+        ''' Write the chunks of a response to a file while hashing them, then parse the file only if the response changed
+
+        Without filename, the response goes to a temporary file. Return None if the response did not change.
+        '''
+
+        digest = hashlib.sha256()
+
+        def spool(f):
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+
+            if self._response_cache.unchanged(key, digest.hexdigest()):
+                print(f"Unchanged response: {key}")
+                return False
+            return True
+
+        if filename is None:
+            with tempfile.TemporaryFile(dir=self._output_folder) as f:
+                if not spool(f):
+                    return None
+                f.seek(0)
+                return parse_meterdatavalues(iter(lambda: f.read(CHUNK_SIZE), b""), self._sample_interval)
+
+        full_filename = os.path.join(self._output_folder, filename)
+        part_filename = full_filename + ".part"
+        opener = gzip.open if self._compress_json else open
+
+        try:
+            with opener(part_filename, "wb") as f:
+                changed = spool(f)
+
+            series_list = None
+            if changed:
+                with opener(part_filename, "rb") as f:
+                    series_list = parse_meterdatavalues(iter(lambda: f.read(CHUNK_SIZE), b""), self._sample_interval)
+
+            if changed or not os.path.exists(full_filename):
+                os.replace(part_filename, full_filename)
+                print(f"Save json: {filename}")
+            else:
+                os.remove(part_filename)
+        except BaseException:
+            if os.path.exists(part_filename):
+                os.remove(part_filename)
+            raise
+
+        return series_list
+
+    def _fetch_all(self, fetches):
+        ''' Run the (contract_id, subject_id, first_day, last_day, json_template) fetches concurrently, return the series in the same order '''
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self._max_workers, len(fetches)))) as executor:
+            return list(executor.map(lambda fetch: self._fetch(*fetch), fetches))
+
+    def collect(self, electrical_contract_id, water_contract_id, subject_id, date):
+        print("Collect the data from the SEY")
+
+        # electrical data in kWh, water data in m3, 1 sample / 1 hour by default
+        # water seems to work only with data from yesterday, not older. Why ?
+        # None instead of the series of a contract whose response did not change
+        electrical_series, water_series = self._fetch_all([
+            (electrical_contract_id, subject_id, date, date, ELECTRICAL_JSON_FILENAME),
+            (water_contract_id, subject_id, date, date, WATER_JSON_FILENAME),
+        ])
+
+        return electrical_series, water_series
+
+    def collect_contracts(self, contract_ids, subject_id, date_from, date_to, chunk_days=MAX_RANGE_DAYS, json_templates=None):
+        ''' Collect every day from date_from to date_to (included) of any number of contracts
+
+        The requests of every contract and chunk of up to chunk_days days run concurrently, the responses are
+        saved with the filename templates of json_templates ({contract_id: template}).
+        Return {contract_id: {date: [MeterSeries]}} with the series of each day.
+        '''
+        days = [date_from + timedelta(days = i) for i in range((date_to - date_from).days + 1)]
+        chunks = [days[i:i + chunk_days] for i in range(0, len(days), chunk_days)]
+
+        result = self.collect_spans([(contract_id, chunk[0], chunk[-1]) for contract_id in contract_ids for chunk in chunks], subject_id, json_templates)
+        for contract_id in contract_ids:
+            result.setdefault(contract_id, {})
+
+        return result
+
+    def collect_spans(self, spans, subject_id, json_templates=None):
+        ''' Collect the (contract_id, first day, last day) spans concurrently, one request per span
+
+        Return {contract_id: {date: [MeterSeries]}} with the series of each day, without the days of the unchanged responses.
+        '''
+        json_templates = json_templates or {}
+
+        series_lists = self._fetch_all([(contract_id, subject_id, first_day, last_day, json_templates.get(contract_id)) for contract_id, first_day, last_day in spans])
+
+        result = {}
+        for (contract_id, first_day, last_day), series_list in zip(spans, series_lists):
+            if series_list is None:
+                result.setdefault(contract_id, {})
+                continue
+
+            days = [first_day + timedelta(days = i) for i in range((last_day - first_day).days + 1)]
+            result.setdefault(contract_id, {}).update(split_by_day(series_list, days))
 
-class SeyWebScraper:
+        return result
+
+    def collect_range(self, electrical_contract_id, water_contract_id, subject_id, date_from, date_to, chunk_days=MAX_RANGE_DAYS):
+        ''' Collect every day from date_from to date_to (included) with requests spanning up to chunk_days days
+
+        Return a list of (date, electrical series, water series) in chronological order, with the same per-day
+        series as collect, None for the series of a contract whose response did not change.
+        '''
+        print(f"Collect the data from the SEY from {date_from.strftime('%Y-%m-%d')} to {date_to.strftime('%Y-%m-%d')}")
+
+        contracts = self.collect_contracts([electrical_contract_id, water_contract_id], subject_id, date_from, date_to, chunk_days, {
+            electrical_contract_id: ELECTRICAL_JSON_FILENAME,
+            water_contract_id: WATER_JSON_FILENAME,
+        })
+
+        result = []
+        for day in sorted(contracts[electrical_contract_id].keys() | contracts[water_contract_id].keys()):
+            dt = datetime.combine(day, datetime.min.time())
+            result.append((dt, contracts[electrical_contract_id].get(day), contracts[water_contract_id].get(day)))
+
+        return result
+
+    def logout(self):
+        pass
+
+    def release_browser(self):
+        ''' Stop the browser used to login, if any, the token keeps working without it '''
+        pass
+
+    def close(self):
+        self._session.close()
+
+        print("Done! See you tomorrow!")
+
+class SeyWebScraper(SeyScraper):
     ''' Class to Web Scrap from SEY '''
 
-    def __init__(self, output_folder):
+    def __init__(self, output_folder, token_cache=None, base_url=BASE_URL, browser_pool=None, save_json=True, compress_json=False, lean_browser=False, artifacts=ARTIFACTS_ON_FAILURE, response_cache=None, aggregation=HOURLY_AGGREGATION, sample_interval=SAMPLE_INTERVAL, metrics=None):
+        super().__init__(output_folder, token_cache, base_url, save_json=save_json, compress_json=compress_json, response_cache=response_cache, aggregation=aggregation, sample_interval=sample_interval, metrics=metrics)
+
+        # The browser is only started when no valid cached token is available
+        self._driver = None
+        self._lean_browser = lean_browser
+        self._artifacts = artifacts
+        # (seconds since the start, filename, PNG) of the most recent screenshots
+        self._screenshots = deque(maxlen=ARTIFACT_BUFFER_SIZE)
+        self._start_time = time.perf_counter()
+        # Semaphore shared by the scrapers of several accounts to bound the number of running browsers
+        self._browser_pool = browser_pool
+
+    def _start_driver(self):
+        # Selenium is the slowest import of the package, only needed when the browser is started
+        from selenium import webdriver
 
         chrome_options = webdriver.ChromeOptions()
 
@@ -27,35 +405,83 @@ class SeyWebScraper:
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument("--window-size=1920,1080")
 
-        self._user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         chrome_options.add_argument(f'--user-agent={self._user_agent}')
 
-        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        if self._lean_browser:
+            # Keep the HTTP cache and the keycloak cookies between the runs, do not wait for the subresources
+            chrome_options.add_argument(f'--user-data-dir={os.path.abspath(os.path.join(self._output_folder, BROWSER_PROFILE_FOLDER))}')
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.page_load_strategy = 'eager'
 
-        self._driver = webdriver.Chrome(options=chrome_options)
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        # Only the network events are needed to find the authorization token
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+        if self._browser_pool is not None:
+            self._browser_pool.acquire()
+
+        try:
+            self._driver = webdriver.Chrome(options=chrome_options)
+        except BaseException:
+            if self._browser_pool is not None:
+                self._browser_pool.release()
+            raise
+
+        if self._lean_browser:
+            self._driver.execute_cdp_cmd("Network.enable", {})
+            self._driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
         # No implicit wait: all element lookups use explicit WebDriverWait below.
         # Mixing implicit and explicit waits makes Selenium's polling/timeout
         # behavior unpredictable.
-        self._output_folder = output_folder
 
-        assert os.path.exists(self._output_folder)
+    def _screenshot(self, filename, elem=None):
+        ''' Screenshot the element, or the page, according to the artifact level '''
+
+        if self._artifacts == ARTIFACTS_OFF:
+            return
 
-    def _screenshot_element(self, elem, filename):
-        with open(os.path.join(self._output_folder, filename), "wb") as f:
-            f.write(elem.screenshot_as_png)
+        png = elem.screenshot_as_png if elem is not None else self._driver.get_screenshot_as_png()
+        self._screenshots.append((time.perf_counter() - self._start_time, filename, png))
+
+        if self._artifacts == ARTIFACTS_ALWAYS:
+            with open(os.path.join(self._output_folder, filename), "wb") as f:
+                f.write(png)
 
     def _on_wait_failure(self, selector, attempt):
+        ''' Write the latest screenshots, the page and the timing of the steps in a folder of the failure '''
+
+        if self._artifacts == ARTIFACTS_OFF:
+            return
+
         error_filename = f"error_attempt{attempt}_{''.join(c if c.isalnum() else '_' for c in selector)}.png"
-        self._driver.save_screenshot(os.path.join(self._output_folder, error_filename))
+        self._screenshot(error_filename)
+
+        folder = os.path.join(self._output_folder, ARTIFACTS_FOLDER, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(folder, exist_ok=True)
+
+        with open(os.path.join(folder, "timing.txt"), "w", encoding="utf-8") as f:
+            for i, (elapsed, filename, png) in enumerate(self._screenshots):
+                with open(os.path.join(folder, f"{i:02d}_{filename}"), "wb") as image:
+                    image.write(png)
+                f.write(f"{elapsed:8.3f} s\t{filename}\n")
+
+        with open(os.path.join(folder, "page_source.html"), "w", encoding="utf-8") as f:
+            f.write(self._driver.page_source)
+
+        print(f"ERROR: Waiting for {selector} failed, see {folder}")
 
     def _safe_click(self, by, selector, filename=None, timeout=WAIT_TIMEOUT, retries=3):
+        from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
         for attempt in range(1, retries + 1):
             try:
                 element = WebDriverWait(self._driver, timeout).until(
                     EC.element_to_be_clickable((by, selector))
                 )
                 if filename:
-                    self._screenshot_element(element, filename)
+                    self._screenshot(filename, element)
                 element.click()
                 return
             except (StaleElementReferenceException, TimeoutException):
@@ -64,13 +490,17 @@ class SeyWebScraper:
                     raise
 
     def _safe_send_keys(self, by, selector, keys, filename=None, timeout=WAIT_TIMEOUT, retries=3):
+        from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
         for attempt in range(1, retries + 1):
             try:
                 element = WebDriverWait(self._driver, timeout).until(
                     EC.presence_of_element_located((by, selector))
                 )
                 if filename:
-                    self._screenshot_element(element, filename)
+                    self._screenshot(filename, element)
                 element.clear()
                 element.send_keys(keys)
                 return
@@ -92,85 +522,117 @@ class SeyWebScraper:
                     yield x
 
     def _get_authorization_token_id(self, logs):
+        ''' Return the Authorization header of the first call to the SEY API found in the performance log '''
 
+        fallback = None
         for entry in logs:
-            log = json.loads(entry["message"])["message"]
-            l = list(self._findkeys(log, "Authorization"))
-            if len(l) > 0:
-                return { "Authorization" : str(l[0]) }
+            message = entry["message"]
+            # Most of the events do not carry any token, skip them without parsing
+            if '"Authorization"' not in message:
+                continue
 
-    def login(self, username, password):
-        print("Login into SEY")
+            log = json.loads(message)["message"]
+            if log.get("method") == "Network.requestWillBeSent" and "/ebpapi/" in log["params"]["request"]["url"]:
+                headers = log["params"]["request"]["headers"]
+                if "Authorization" in headers:
+                    return { "Authorization" : str(headers["Authorization"]) }
 
-        self._driver.get("https://my.yverdon-energies.ch/login")
+            # Any other event with a token is only used if no call to the API is found
+            if fallback is None:
+                fallback = next(self._findkeys(log, "Authorization"), None)
 
-        self._safe_click(By.XPATH, "//span[text()='Se connecter ici']/ancestor::button", "login.png")
+        if fallback is not None:
+            return { "Authorization" : str(fallback) }
 
-        self._safe_send_keys(By.ID, "username", username, "username.png")
-        self._safe_send_keys(By.ID, "password", password, "password.png")
+    def _login(self):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
 
-        self._driver.save_screenshot(os.path.join(self._output_folder, "screenshot0.png"))
+        print("Login into SEY")
 
-        self._safe_click(By.ID, "kc-login")
+        start = time.perf_counter()
 
-    def collect(self, electrical_contract_id, water_contract_id, subject_id, date):
-        print("Collect the data from the SEY")
+        if self._driver is None:
+            with self._metrics.span("browser_start", lean=self._lean_browser):
+                self._start_driver()
 
-        # Wait until this element is visible so we are sure the keycloak session is open
-        wait = WebDriverWait(self._driver, WAIT_TIMEOUT)
-        wait.until(
-            EC.visibility_of_element_located((By.XPATH, "//div[normalize-space(text())='Contrats']"))
-        )
-        
-        self._driver.save_screenshot(os.path.join(self._output_folder, "screenshot1.png"))
+        username, password = self._credentials
+        contracts = (By.XPATH, "//div[normalize-space(text())='Contrats']")
 
-        # Get the authorization from the Chrome log (this is all the magic comes from!)
-        logs = self._driver.get_log("performance")
+        with self._metrics.span("keycloak_redirect"):
+            self._driver.get(f"{self._base_url}/login")
 
-        header = self._get_authorization_token_id(logs)
-        header["User-Agent"] = self._user_agent
+            self._safe_click(By.XPATH, "//span[text()='Se connecter ici']/ancestor::button", "login.png")
 
-        start_dt = datetime.combine(date, datetime.min.time())
-        end_dt = datetime.combine(date + timedelta(days = 1), datetime.min.time()) - timedelta(minutes = 1)
+            # The keycloak session kept in the persistent profile skips the login form
+            wait = WebDriverWait(self._driver, WAIT_TIMEOUT)
+            wait.until(EC.any_of(EC.presence_of_element_located((By.ID, "username")), EC.visibility_of_element_located(contracts)))
 
-        meterdatavalues = requests.get(f"https://my.yverdon-energies.ch/ebpapi/ebp/meterdatavalues/{electrical_contract_id}?subject_id={subject_id}&role=1&date_from={start_dt.isoformat()}&date_to={end_dt.isoformat()}&aggregation=2&compareActive=false", headers=header, timeout=10)
+        if self._driver.find_elements(By.ID, "username"):
+            with self._metrics.span("login_form"):
+                self._safe_send_keys(By.ID, "username", username, "username.png")
+                self._safe_send_keys(By.ID, "password", password, "password.png")
 
-        # data in kWh, 1 sample / 1 hour
-        electrical_json_data = json.loads(meterdatavalues.content.decode("utf-8"))
-        
-        self._save_json(f"electrical_data_{date.strftime('%Y%m%d')}.json", electrical_json_data)
+                self._screenshot("screenshot0.png")
 
-        # seems to work only with data from yesterday, not older. Why ?
-        meterdatavalues = requests.get(f"https://my.yverdon-energies.ch/ebpapi/ebp/meterdatavalues/{water_contract_id}?subject_id={subject_id}&role=1&date_from={start_dt.isoformat()}&date_to={end_dt.isoformat()}&aggregation=2&compareActive=false", headers=header, timeout=10)
+                self._safe_click(By.ID, "kc-login")
+
+        # Wait until this element is visible so we are sure the keycloak session is open
+        with self._metrics.span("contracts_wait"):
+            wait.until(
+                EC.visibility_of_element_located(contracts)
+            )
 
-        # data in m3, 1 sample / 1 hour
-        water_json_data = json.loads(meterdatavalues.content.decode("utf-8"))
+        self._screenshot("screenshot1.png")
 
-        self._save_json(f"water_json_data_{date.strftime('%Y%m%d')}.json", water_json_data)
+        # Get the authorization from the Chrome log (this is all the magic comes from!)
+        with self._metrics.span("token_extraction") as span:
+            logs = self._driver.get_log("performance")
+            span["events"] = len(logs)
 
-        return electrical_json_data, water_json_data
-    
-    def _save_json(self, filename, data):
-        ''' Save the JSON data to a file '''
+            header = self._get_authorization_token_id(logs)
+        self._set_header(header)
 
-        with open(os.path.join(self._output_folder, filename), "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"Authorization token obtained {time.perf_counter() - start:.1f} s after the browser launch")
 
-        print(f"Save json: {filename}")
+        if self._token_cache is not None:
+            # No refresh token is captured from the browser: once the token expires, the browser is started again
+            self._token_cache.store(header["Authorization"])
 
     def logout(self):
+        if self._driver is None:
+            return
+
+        if self._token_cache is not None:
+            # Logging out would revoke the session of the cached token
+            print("Keep the SEY session open for the cached authorization token")
+            return
+
+        from selenium.webdriver.common.by import By
+
         print("Logout from the SEY")
 
         self._safe_click(By.XPATH, "//mat-icon[text()='person']/ancestor::button", "user.png")
         self._safe_click(By.XPATH, "//mat-icon[text()='logout']/ancestor::button", "logout.png")
 
-        self._driver.save_screenshot(os.path.join(self._output_folder, "screenshot2.png"))
+        self._screenshot("screenshot2.png")
+
+    def release_browser(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            finally:
+                self._driver = None
+                if self._browser_pool is not None:
+                    self._browser_pool.release()
 
     def close(self):
         ''' Close the driver '''
-        self._driver.quit()
+        self.release_browser()
+
+        super().close()
 
-        print("Done! See you tomorrow!")
 
 class Mode(Enum):
     DATA_NO_BI_TARIFICATION_MODE = 0
@@ -180,135 +642,183 @@ class Mode(Enum):
     COST_BI_TARIFICATION_HIGH_TARIFF_MODE = 4
     COST_BI_TARIFICATION_LOW_TARIFF_MODE = 5
 
+COST_MODES = (Mode.COST_NO_BI_TARIFICATION_MODE, Mode.COST_BI_TARIFICATION_HIGH_TARIFF_MODE, Mode.COST_BI_TARIFICATION_LOW_TARIFF_MODE)
+
+INVERT_MASK = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+# Outputs of each timeserie: (filename, entity_id, unit, mode, product priced in the tariff schedule)
+ELECTRICITY_PRODUCTION_OUTPUTS = (
+    ("energy-production-data-high-tariff.tsv", "sensor.sey_energy_returned_to_grid_high_tariff", "kWh", Mode.DATA_BI_TARIFICATION_HIGH_TARIFF_MODE, None),
+    ("energy-production-data-low-tariff.tsv", "sensor.sey_energy_returned_to_grid_low_tariff", "kWh", Mode.DATA_BI_TARIFICATION_LOW_TARIFF_MODE, None),
+    ("energy-production-cost-high-tariff.tsv", "sensor.sey_cost_energy_returned_to_grid_high_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_HIGH_TARIFF_MODE, "electricity_production"),
+    ("energy-production-cost-low-tariff.tsv", "sensor.sey_cost_energy_returned_to_grid_low_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_LOW_TARIFF_MODE, "electricity_production"),
+)
+
+ELECTRICITY_CONSUMPTION_OUTPUTS = (
+    ("energy-consumption-data-high-tariff.tsv", "sensor.sey_energy_consumption_high_tariff", "kWh", Mode.DATA_BI_TARIFICATION_HIGH_TARIFF_MODE, None),
+    ("energy-consumption-data-low-tariff.tsv", "sensor.sey_energy_consumption_low_tariff", "kWh", Mode.DATA_BI_TARIFICATION_LOW_TARIFF_MODE, None),
+    ("energy-consumption-cost-high-tariff.tsv", "sensor.sey_cost_energy_consumption_high_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_HIGH_TARIFF_MODE, "electricity_consumption"),
+    ("energy-consumption-cost-low-tariff.tsv", "sensor.sey_cost_energy_consumption_low_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_LOW_TARIFF_MODE, "electricity_consumption"),
+)
+
+WATER_CONSUMPTION_OUTPUTS = (
+    ("water-consumption-data.tsv", "sensor.sey_water_consumption", "m³", Mode.DATA_NO_BI_TARIFICATION_MODE, None),
+    ("water-consumption-cost.tsv", "sensor.sey_water_cost", "CHF/m³", Mode.COST_NO_BI_TARIFICATION_MODE, "water_consumption"),
+)
+
 class SeyDataSaver:
-    def __init__(self, folder, dt) -> None:
+    def __init__(self, folder, dt, tariffs : TariffSchedule = None, statistics=None, metrics=None, sums=None) -> None:
         self._sums = {}
+        self._tariffs = tariffs if tariffs is not None else load_tariffs()
+        # Optional HomeAssistantStatistics also receiving every output
+        self._statistics = statistics
+        self._metrics = metrics if metrics is not None else Metrics()
         self._folder = folder
         self._date = dt.strftime("%Y%m%d")
-        self._last_sums_filename = os.path.join(self._folder, "last_sums.json")
-        self._load_sums()
+        self._journal = SumsJournal(self._folder)
+        # Start from the checkpoint of the previous day, so a day can be saved again, unless the sums are given
+        self._sums = dict(sums) if sums is not None else self._journal.load_before(self._date)
 
-    def _is_high_tariff_datetime(self, dt : datetime) -> bool:
-        if dt.weekday() in range(0, 4):
-            return dt.hour >= 6 and dt.hour < 22
-        else: # weekend
-            return (dt.hour >= 10 and dt.hour < 13) or (dt.hour >= 17 and dt.hour < 22)
+    def _outputs(self, series : MeterSeries, outputs):
+        ''' Yield the (filename, entity_id, unit, selection, values) of every output of the series, the values being
+        priced for the costs and the selection the tariff mask of the samples, None for all of them
+        '''
 
-    def _extract_data(self, data, entity_id, unit, mode : Mode, tariff: float = None):
-        # print the headers
-        yield "statistic_id\tunit\tstart\tsum"
-
-        sum = self._sums.get(entity_id, 0.0)
-
-        for d in data:
-            dt = d['x']
-            state = d['y']
-
-            dt = datetime.fromisoformat(dt) - timedelta(hours=1)
+        local_times = series.local_times()
+        high = None
+        low = None
 
+        for filename, entity_id, unit, mode, product in outputs:
             match mode:
-                case Mode.DATA_NO_BI_TARIFICATION_MODE:
-                    pass
-                case Mode.COST_NO_BI_TARIFICATION_MODE:
-                    assert tariff is not None, "Not tariff provided to calculate the cost"
-                    state *= tariff
-                case Mode.DATA_BI_TARIFICATION_HIGH_TARIFF_MODE:
-                    if not self._is_high_tariff_datetime(dt):
-                        continue
-                case Mode.COST_BI_TARIFICATION_HIGH_TARIFF_MODE:
-                    if self._is_high_tariff_datetime(dt):
-                        assert tariff is not None, "Not tariff provided to calculate the cost"
-                        state *= tariff
-                    else:
-                        continue
-                case Mode.DATA_BI_TARIFICATION_LOW_TARIFF_MODE:
-                    if self._is_high_tariff_datetime(dt):
-                        continue
-                case Mode.COST_BI_TARIFICATION_LOW_TARIFF_MODE:
-                    if not self._is_high_tariff_datetime(dt):
-                        assert tariff is not None, "Not tariff provided to calculate the cost"
-                        state *= tariff
-                    else:
-                        continue
+                case Mode.DATA_NO_BI_TARIFICATION_MODE | Mode.COST_NO_BI_TARIFICATION_MODE:
+                    selection = None
+                case Mode.DATA_BI_TARIFICATION_HIGH_TARIFF_MODE | Mode.COST_BI_TARIFICATION_HIGH_TARIFF_MODE:
+                    if high is None:
+                        high = self._tariffs.high_tariff_mask(local_times)
+                    selection = high
+                case Mode.DATA_BI_TARIFICATION_LOW_TARIFF_MODE | Mode.COST_BI_TARIFICATION_LOW_TARIFF_MODE:
+                    if low is None:
+                        if high is None:
+                            high = self._tariffs.high_tariff_mask(local_times)
+                        low = high.translate(INVERT_MASK)
+                    selection = low
                 case _:
                     assert(False)
 
-            dt = dt.strftime("%d.%m.%Y %H:%M")
+            values = series.value if selection is None else compress(series.value, selection)
+
+            if mode in COST_MODES:
+                assert product is not None, "Not tariff provided to calculate the cost"
+                prices = self._tariffs.prices(product, local_times)
+                values = map(mul, values, prices if selection is None else compress(prices, selection))
+
+            yield filename, entity_id, unit, selection, values
 
-            yield f"{entity_id}\t{unit}\t{dt}\t{(state + sum):.3f}"
+    def _save_series(self, series : MeterSeries, outputs):
+        ''' Write every output of the series from the samples parsed once, with masks and running sums
 
-            sum += state
+        The samples shorter than an hour are written at their native resolution in their own files, e.g.
+        energy-consumption-data-high-tariff-15min.tsv, and downsampled to hourly sums for Home Assistant.
+        '''
 
-        self._last_sum = sum
+        labels = series.labels()
 
-    def _save_data(self, filename, generator):
-        with open(filename, "w", encoding="utf-8") as f:
-            print(f"Saving file: {filename}")
-            for line in generator:
-                #print(line)
-                f.write(line + "\n")
+        for filename, entity_id, unit, selection, values in self._outputs(series, outputs):
+            starts = labels if selection is None else compress(labels, selection)
+
+            sums = list(accumulate(values, initial=self._sums.get(entity_id, 0.0)))
+            self._sums[entity_id] = sums[-1]
+
+            sample_starts = series.start if selection is None else compress(series.start, selection)
+            offsets = series.offset if selection is None else compress(series.offset, selection)
+
+            if series.interval < SAMPLE_INTERVAL:
+                root, extension = os.path.splitext(filename)
+                self._write_sums(f"{root}-{series.interval // 60}min{extension}", entity_id, unit, starts, sums[1:])
+
+                # The sum of an hour is the sum after its last sample
+                sample_starts = list(sample_starts)
+                ends = hour_ends(sample_starts)
+                sample_starts = [start - start % SAMPLE_INTERVAL for start in compress(sample_starts, ends)]
+                offsets = list(compress(offsets, ends))
+                starts = format_labels(map(int.__add__, sample_starts, offsets))
+                sums = sums[:1] + list(compress(sums[1:], ends))
+
+            self._write_sums(filename, entity_id, unit, starts, sums[1:])
+
+            if self._statistics is not None:
+                self._statistics.add(entity_id, unit, sample_starts, offsets, sums[1:])
+
+    def _write_sums(self, filename, entity_id, unit, starts, sums):
+        full_filename = os.path.join(self._folder, f"{self._date}-{filename}")
+        with open(full_filename, "w", encoding="utf-8") as f:
+            print(f"Saving file: {full_filename}")
+            f.write("statistic_id\tunit\tstart\tsum\n")
+            f.writelines(f"{entity_id}\t{unit}\t{start}\t{total:.3f}\n" for start, total in zip(starts, sums))
 
     def save(self, data_electricity, data_water):
 
-        data_electricity = data_electricity['timeseries']
+        self.save_series(
+            [MeterSeries.from_timeserie(timeserie) for timeserie in data_electricity['timeseries']],
+            [MeterSeries.from_timeserie(timeserie) for timeserie in data_water['timeseries']],
+        )
+
+    def save_series(self, data_electricity, data_water):
+        ''' Save the parsed series of electricity and water '''
+
+        with self._metrics.span("export", day=self._date, samples=sum(map(len, data_electricity + data_water))):
+            self._save_all_series(data_electricity, data_water)
+
+    def increments(self, data_electricity, data_water):
+        ''' Return {entity_id: values added to its sum} of the day, in the order save_series adds them, without writing any file '''
+
+        series_outputs = ((data_electricity[:1], ELECTRICITY_PRODUCTION_OUTPUTS), (data_electricity[1:2], ELECTRICITY_CONSUMPTION_OUTPUTS), (data_water[:1], WATER_CONSUMPTION_OUTPUTS))
+        return {
+            entity_id: array('d', values)
+            for series_list, outputs in series_outputs for series in series_list
+            for _, entity_id, _, _, values in self._outputs(series, outputs)
+        }
+
+    def _save_all_series(self, data_electricity, data_water):
 
         if len(data_electricity) < 1:
             print("ERROR: No data for production of electricity found")
 
         else:
             print("Saving data of production of electricity")
-            #  Tariff 2025 according to https://www.yverdon-energies.ch/electricite/#tarifs-reglements warning, this is in ct.
-            self._save("energy-production-data-high-tariff.tsv", data_electricity[0]['data'], "sensor.sey_energy_returned_to_grid_high_tariff", "kWh", Mode.DATA_BI_TARIFICATION_HIGH_TARIFF_MODE)
-            self._save("energy-production-data-low-tariff.tsv", data_electricity[0]['data'], "sensor.sey_energy_returned_to_grid_low_tariff", "kWh", Mode.DATA_BI_TARIFICATION_LOW_TARIFF_MODE)
-            tariff = (12.20 + 1.50)
-            self._save("energy-production-cost-high-tariff.tsv", data_electricity[0]['data'], "sensor.sey_cost_energy_returned_to_grid_high_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_HIGH_TARIFF_MODE, tariff / 100.0)
-            tariff = (12.20 + 1.50)
-            self._save("energy-production-cost-low-tariff.tsv", data_electricity[0]['data'], "sensor.sey_cost_energy_returned_to_grid_low_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_LOW_TARIFF_MODE, tariff / 100.0)
+            self._save_series(data_electricity[0], ELECTRICITY_PRODUCTION_OUTPUTS)
 
         if len(data_electricity) < 2:
             print("ERROR: No data for consumption of electricity found")
 
         else:
             print("Saving data of consumption of electricity")
-            self._save("energy-consumption-data-high-tariff.tsv", data_electricity[1]['data'], "sensor.sey_energy_consumption_high_tariff", "kWh", Mode.DATA_BI_TARIFICATION_HIGH_TARIFF_MODE)
-            self._save("energy-consumption-data-low-tariff.tsv", data_electricity[1]['data'], "sensor.sey_energy_consumption_low_tariff", "kWh", Mode.DATA_BI_TARIFICATION_LOW_TARIFF_MODE)
-            tariff = (16.76 + 15.31 + 0.59 + 0.25 + 2.49 + 0.6 + 0.022 + 0.76 + 0.7 + 0.6) * 1.081
-            self._save("energy-consumption-cost-high-tariff.tsv", data_electricity[1]['data'], "sensor.sey_cost_energy_consumption_high_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_HIGH_TARIFF_MODE, tariff / 100.0)
-            tariff = (14.32 + 9.31 + 0.59 + 0.25 + 2.49 + 0.6 + 0.022 + 0.76 + 0.7 + 0.6) * 1.081
-            self._save("energy-consumption-cost-low-tariff.tsv", data_electricity[1]['data'], "sensor.sey_cost_energy_consumption_low_tariff", "CHF/kWh", Mode.COST_BI_TARIFICATION_LOW_TARIFF_MODE, tariff / 100.0)
-
-        data_water = data_water['timeseries']
+            self._save_series(data_electricity[1], ELECTRICITY_CONSUMPTION_OUTPUTS)
 
         if len(data_water) < 1:
             print("ERROR: No data for consumption of water found")
 
         else:
-            # Tariff 2025 for water: https://www.yverdon-energies.ch/eau/#tarifs-reglements
             print("Saving data of water consumption")
-            self._save("water-consumption-data.tsv", data_water[0]['data'], "sensor.sey_water_consumption", "m³", Mode.DATA_NO_BI_TARIFICATION_MODE)
-            tariff = (2.95 + 2.30) * 1.081 # (Conditions de vente) + (Taxe d'épuration des eaux usées) * TVA 8.1%
-            self._save("water-consumption-cost.tsv", data_water[0]['data'], "sensor.sey_water_cost", "CHF/m³", Mode.COST_NO_BI_TARIFICATION_MODE, tariff)
+            self._save_series(data_water[0], WATER_CONSUMPTION_OUTPUTS)
 
-    def _save(self, filename, data, entity_id, unit, mode : Mode, tariff: float = None):
-        full_filename = os.path.join(self._folder, f"{self._date}-{filename}")
+    @staticmethod
+    def last_date(folder):
+        ''' Return the date of the last saved sums, or None if nothing was saved yet '''
 
-        self._save_data(full_filename, self._extract_data(data, entity_id, unit, mode, tariff))
-        self._sums[entity_id] = self._last_sum
+        last_day = SumsJournal(folder).last_day()
+        return datetime.strptime(last_day, "%Y%m%d") if last_day is not None else None
 
-    def _load_sums(self):
-        if not os.path.exists(self._last_sums_filename):
-            print(f"File does not exist: {self._last_sums_filename}. Let's assume this is the first execution")
-            return
+    def save_sums(self):
+        ''' Checkpoint the sums of the day, return the later days whose sums are now invalid and must be saved again '''
 
-        with open(self._last_sums_filename, "r", encoding="utf-8") as f:
-            print(f"Loading file: {self._last_sums_filename}")
-            self._sums = json.loads(f.read())
-            if self._date == self._sums['date']:
-                print("ERROR: The stored sum from previous run contains already the current date. Script may have been executed twice !")
-                quit(1)
+        print(f"Saving sums of {self._date}")
+        self._sums['date'] = self._date
+        with self._metrics.span("save_sums", day=self._date) as span:
+            invalidated = self._journal.save(self._date, self._sums)
+            span["invalidated"] = len(invalidated)
 
-    def save_sums(self):
-        with open(self._last_sums_filename, "w", encoding="utf-8") as f:
-            print(f"Saving file: {self._last_sums_filename}")
-            self._sums['date'] = self._date
-            f.write(json.dumps(self._sums))
\ No newline at end of file
+        if invalidated:
+            print(f"WARNING: Sums of {', '.join(invalidated)} invalidated, these days must be saved again")
+
+        return invalidated
@@ -0,0 +1,121 @@
+''' Local stand-in for the websocket API of Home Assistant used by the tests '''
+
+import base64
+import hashlib
+import json
+import socketserver
+import struct
+import threading
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class FakeHomeAssistant:
+    ''' Accept the websocket connections on localhost, authenticate them with the token and record the imported statistics '''
+
+    def __init__(self, token="secret", refused=None) -> None:
+        self.token = token
+        self.refused = set(refused or ())  # Statistic IDs whose import is refused
+        self.connections = 0
+        self.messages = []  # Every recorder/import_statistics message received
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server._handle(self)
+
+        self._tcp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._tcp.daemon_threads = True
+        self._thread = threading.Thread(target=self._tcp.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._tcp.server_address
+        return f"ws://{host}:{port}/api/websocket"
+
+    def statistics(self, statistic_id):
+        ''' Return every statistic imported for the statistic ID, in the order received '''
+
+        return [stat for message in self.messages if message["metadata"]["statistic_id"] == statistic_id for stat in message["stats"]]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _handle(self, handler):
+        headers = {}
+        handler.rfile.readline()
+        while (line := handler.rfile.readline().decode("latin-1").strip()):
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+        handler.wfile.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n".encode("ascii"))
+
+        with self._lock:
+            self.connections += 1
+
+        self._send(handler, {"type": "auth_required", "ha_version": "2025.10.0"})
+
+        message = self._recv(handler)
+        if message is None or message.get("type") != "auth" or message.get("access_token") != self.token:
+            self._send(handler, {"type": "auth_invalid", "message": "Invalid access token or password"})
+            return
+        self._send(handler, {"type": "auth_ok", "ha_version": "2025.10.0"})
+
+        while (message := self._recv(handler)) is not None:
+            if message.get("type") != "recorder/import_statistics":
+                self._send(handler, {"id": message.get("id"), "type": "result", "success": False, "error": {"code": "unknown_command", "message": "Unknown command."}})
+                continue
+
+            with self._lock:
+                self.messages.append(message)
+
+            if message["metadata"]["statistic_id"] in self.refused:
+                self._send(handler, {"id": message["id"], "type": "result", "success": False, "error": {"code": "invalid_format", "message": "Invalid statistic_id"}})
+            else:
+                self._send(handler, {"id": message["id"], "type": "result", "success": True, "result": None})
+
+    def _recv(self, handler):
+        ''' Read the next text frame sent by the client, None when the connection is closed '''
+
+        header = handler.rfile.read(2)
+        if len(header) < 2:
+            return None
+
+        opcode = header[0] & 0x0F
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", handler.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", handler.rfile.read(8))[0]
+
+        # The frames of the clients are always masked
+        mask = handler.rfile.read(4)
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(handler.rfile.read(length)))
+
+        if opcode == 0x8:
+            return None
+        return json.loads(payload)
+
+    def _send(self, handler, message):
+        payload = json.dumps(message).encode("utf-8")
+        if len(payload) < 126:
+            header = struct.pack(">BB", 0x81, len(payload))
+        elif len(payload) < 65536:
+            header = struct.pack(">BBH", 0x81, 126, len(payload))
+        else:
+            header = struct.pack(">BBQ", 0x81, 127, len(payload))
+        handler.wfile.write(header + payload)
@@ -0,0 +1,274 @@
+''' Local stand-in for the SEY portal used by the tests '''
+
+import base64
+import hashlib
+import html
+import json
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+from zoneinfo import ZoneInfo
+
+TIMEZONE = ZoneInfo("Europe/Zurich")
+
+ELECTRICAL_CONTRACT_ID = "el-contract"
+WATER_CONTRACT_ID = "water-contract"
+SUBJECT_ID = "subject"
+
+REALM_PATH = "/realms/sey"
+CLIENT_ID = "sey-portal"
+
+# Seconds covered by a sample of each aggregation, the code of the 15 minutes load profile of the real portal is unknown
+AGGREGATION_INTERVALS = {2: 3600, 1: 900}
+
+DEFAULT_CONTRACTS = {
+    ELECTRICAL_CONTRACT_ID: ["1-1:1.29.0*255", "1-1:2.29.0*255"],
+    WATER_CONTRACT_ID: ["8-1:1.29.0*255"],
+}
+
+
+def sample_value(obis, dt):
+    ''' Deterministic value of the fake meter for the hour ending at dt '''
+
+    return round(((int(dt.timestamp()) // 3600) % 7) * 0.125 + int(obis[2]) * 0.5, 3)
+
+
+def generate_timeseries(obis_codes, date_from, date_to, revisions=None, interval=3600):
+    ''' Build a meterdatavalues document with one sample per interval seconds between the two local datetimes
+
+    revisions is {local date: value added to its samples} to mimic the corrections of the utility.
+    '''
+    revisions = revisions or {}
+
+    start = date_from.replace(tzinfo=TIMEZONE).astimezone(timezone.utc)
+    end = date_to.replace(tzinfo=TIMEZONE).astimezone(timezone.utc)
+
+    timeseries = []
+    for obis in obis_codes:
+        data = []
+        t = start
+        while t < end:
+            x = (t + timedelta(seconds=interval)).astimezone(TIMEZONE)
+            value = sample_value(obis, x)
+            if t.astimezone(TIMEZONE).date() in revisions:
+                value = round(value + revisions[t.astimezone(TIMEZONE).date()], 3)
+            data.append({"x": x.isoformat(), "y": value})
+            t += timedelta(seconds=interval)
+        timeseries.append({"_id": obis, "obis": obis, "meteringpoint": "CH0000000000000000000000000000000", "unit": "kWh", "data": data})
+
+    return {"timeseries": timeseries}
+
+
+def generate_performance_log(token, events=5000, base_url="https://my.yverdon-energies.ch"):
+    ''' Return a Chrome performance log of a login into the portal, anonymized: the token is the only secret
+
+    Most of the events are the loading of the assets of the single page application. The keycloak token request
+    and the calls to the API carrying the token come last.
+    '''
+
+    def entry(method, params):
+        return {"level": "INFO", "timestamp": 1755500000000, "message": json.dumps({"message": {"method": method, "params": params}, "webview": "ABCDEF"})}
+
+    def request(request_id, url, headers):
+        return entry("Network.requestWillBeSent", {
+            "requestId": request_id,
+            "documentURL": f"{base_url}/login",
+            "request": {"url": url, "method": "GET", "headers": headers, "initialPriority": "High", "referrerPolicy": "strict-origin-when-cross-origin"},
+            "timestamp": 1000.0,
+            "wallTime": 1755500000.0,
+            "initiator": {"type": "script"},
+            "type": "XHR",
+        })
+
+    log = []
+    for i in range(events):
+        request_id = f"1000.{i // 4}"
+        match i % 4:
+            case 0:
+                log.append(request(request_id, f"{base_url}/assets/chunk-{i}.js", {"Accept": "*/*", "User-Agent": "Mozilla/5.0"}))
+            case 1:
+                log.append(entry("Network.responseReceived", {"requestId": request_id, "response": {"url": f"{base_url}/assets/chunk-{i}.js", "status": 200, "headers": {"content-type": "text/javascript"}}}))
+            case 2:
+                log.append(entry("Network.dataReceived", {"requestId": request_id, "dataLength": 65536, "encodedDataLength": 16384}))
+            case 3:
+                log.append(entry("Network.loadingFinished", {"requestId": request_id, "encodedDataLength": 16384}))
+
+    log.append(request("2000.1", f"{base_url}{REALM_PATH}/protocol/openid-connect/token", {"Content-Type": "application/x-www-form-urlencoded"}))
+    log.append(entry("Network.requestWillBeSentExtraInfo", {"requestId": "2000.2", "headers": {"Accept": "application/json"}}))
+    log.append(request("2000.3", f"{base_url}/ebpapi/ebp/contracts?subject_id={SUBJECT_ID}", {"Accept": "application/json", "Authorization": token}))
+    log.append(request("2000.4", f"{base_url}/ebpapi/ebp/meterdatavalues/{ELECTRICAL_CONTRACT_ID}", {"Accept": "application/json", "Authorization": token}))
+
+    return log
+
+
+class FakeSeyServer:
+    ''' Serve the ebpapi endpoints on localhost, only for requests with the expected authorization, and a minimal keycloak realm issuing it '''
+
+    def __init__(self, token="Bearer valid", contracts=None, latency=0.0, users=None) -> None:
+        self.token = token
+        self.users = users if users is not None else {"user": "password"}
+        self.token_requests = []
+        self._login_sessions = {}  # session code -> authorization request
+        self._codes = {}  # authorization code -> authorization request
+        self._refresh_tokens = set()
+        self.contracts = contracts if contracts is not None else DEFAULT_CONTRACTS
+        self.latency = latency
+        self.failures = 0  # Number of next ebpapi requests answered with HTTP 503
+        self.available_until = None  # Local datetime of the latest published sample, None if every sample is published
+        self.outages = []  # (first, last) local datetimes of the samples never published
+        self.revisions = {}  # Local date -> value added to each of its samples
+        self.requests = []
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server._handle_get(self)
+
+            def do_POST(self):
+                server._handle_post(self)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def issuer(self):
+        return self.url + REALM_PATH
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _reply(self, handler, status, body=b"", content_type="application/json", headers=None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle_get(self, handler):
+        url = urlparse(handler.path)
+
+        with self._lock:
+            self.requests.append(handler.path)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if url.path == REALM_PATH + "/protocol/openid-connect/auth":
+            self._login_form(handler, parse_qs(url.query))
+            return
+
+        prefix = "/ebpapi/ebp/meterdatavalues/"
+        if not url.path.startswith(prefix):
+            self._reply(handler, 404)
+            return
+
+        with self._lock:
+            failure = self.failures > 0
+            self.failures -= failure
+
+        if failure:
+            self._reply(handler, 503)
+            return
+
+        if handler.headers.get("Authorization") != self.token:
+            self._reply(handler, 401)
+            return
+
+        contract_id = url.path[len(prefix):]
+        query = parse_qs(url.query)
+        date_from = datetime.fromisoformat(query["date_from"][0])
+        date_to = datetime.fromisoformat(query["date_to"][0])
+        if self.available_until is not None:
+            date_to = min(date_to, self.available_until)
+
+        document = generate_timeseries(self.contracts.get(contract_id, []), date_from, date_to, self.revisions, AGGREGATION_INTERVALS[int(query["aggregation"][0])])
+        for timeserie in document["timeseries"]:
+            timeserie["data"] = [sample for sample in timeserie["data"] if not any(first <= datetime.fromisoformat(sample["x"]).replace(tzinfo=None) <= last for first, last in self.outages)]
+
+        body = json.dumps(document).encode("utf-8")
+        self._reply(handler, 200, body)
+
+    def _login_form(self, handler, query):
+        session_code = secrets.token_urlsafe(8)
+        self._login_sessions[session_code] = {key: values[0] for key, values in query.items()}
+
+        action = html.escape(f"{REALM_PATH}/login-actions/authenticate?session_code={session_code}&execution=x&client_id={CLIENT_ID}")
+        body = f'<html><body><form id="kc-form-login" action="{action}" method="post"><input id="username" name="username"/><input id="password" name="password" type="password"/><input id="kc-login" type="submit"/></form></body></html>'
+        self._reply(handler, 200, body.encode("utf-8"), "text/html", {"Set-Cookie": f"AUTH_SESSION_ID={session_code}; Path=/"})
+
+    def _handle_post(self, handler):
+        url = urlparse(handler.path)
+        length = int(handler.headers.get("Content-Length", 0))
+        form = {key: values[0] for key, values in parse_qs(handler.rfile.read(length).decode("utf-8")).items()}
+
+        if url.path == REALM_PATH + "/login-actions/authenticate":
+            session_code = parse_qs(url.query).get("session_code", [None])[0]
+            request = self._login_sessions.pop(session_code, None)
+
+            if request is None or f"AUTH_SESSION_ID={session_code}" not in handler.headers.get("Cookie", ""):
+                self._reply(handler, 400)
+            elif self.users.get(form.get("username")) != form.get("password"):
+                self._reply(handler, 200, b"<html>Invalid username or password.</html>", "text/html")
+            else:
+                code = secrets.token_urlsafe(8)
+                self._codes[code] = request
+                location = f"{request['redirect_uri']}?{urlencode({'state': request['state'], 'code': code})}"
+                self._reply(handler, 302, headers={"Location": location})
+
+        elif url.path == REALM_PATH + "/protocol/openid-connect/token":
+            self.token_requests.append(form)
+            if self._check_grant(form):
+                access_token = secrets.token_urlsafe(16)
+                refresh_token = secrets.token_urlsafe(16)
+                self._refresh_tokens.add(refresh_token)
+                self.token = f"Bearer {access_token}"
+                body = {"access_token": access_token, "expires_in": 300, "refresh_token": refresh_token, "refresh_expires_in": 1800, "token_type": "Bearer"}
+                self._reply(handler, 200, json.dumps(body).encode("utf-8"))
+            else:
+                self._reply(handler, 400, json.dumps({"error": "invalid_grant"}).encode("utf-8"))
+
+        else:
+            self._reply(handler, 404)
+
+    def _check_grant(self, form):
+        if form.get("client_id") != CLIENT_ID:
+            return False
+
+        if form.get("grant_type") == "refresh_token":
+            return form.get("refresh_token") in self._refresh_tokens
+
+        request = self._codes.pop(form.get("code"), None)
+        if request is None or form.get("redirect_uri") != request["redirect_uri"]:
+            return False
+
+        challenge = base64.urlsafe_b64encode(hashlib.sha256(form.get("code_verifier", "").encode("ascii")).digest()).decode("ascii").rstrip("=")
+        return challenge == request.get("code_challenge")
@@ -0,0 +1,71 @@
+''' Test the samples shorter than an hour '''
+
+import os
+import shutil
+import unittest
+from datetime import datetime
+
+from sey_meter_data_web_scraping.daemon import is_complete
+from sey_meter_data_web_scraping.gaps import find_gaps
+from sey_meter_data_web_scraping.store import SeyStore
+from sey_meter_data_web_scraping.utils import SeyDataSaver, SeyScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+DAY = datetime(2025, 10, 26)  # 25 hours long
+
+
+class AggregationTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def _read(self, filename):
+        with open(os.path.join(OUTPUT_FOLDER, f"20251026-{filename}"), "r", encoding="utf-8") as f:
+            return [line.split("\t") for line in f.read().splitlines()[1:]]
+
+    def test_quarter_hours(self):
+        with FakeSeyServer() as server:
+            scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, save_json=False, aggregation=1, sample_interval=900)
+            scrapper._set_header({"Authorization": server.token})
+            try:
+                data_electricity, data_water = scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, DAY)
+            finally:
+                scrapper.close()
+
+        self.assertIn("aggregation=1", server.requests[0])
+        self.assertEqual([len(series) for series in data_electricity + data_water], [100, 100, 100])
+        self.assertTrue(is_complete(data_electricity + data_water, DAY.date()))
+
+        saver = SeyDataSaver(OUTPUT_FOLDER, DAY)
+        saver.save_series(data_electricity, data_water)
+        saver.save_sums()
+
+        # Native resolution and hourly sums, equal at the end of each hour
+        native = self._read("water-consumption-data-15min.tsv")
+        hourly = self._read("water-consumption-data.tsv")
+        self.assertEqual((len(native), len(hourly)), (100, 25))
+        self.assertEqual([row[2] for row in native[:2]], ["26.10.2025 00:00", "26.10.2025 00:15"])
+        self.assertEqual([row[2] for row in hourly[:2]], ["26.10.2025 00:00", "26.10.2025 01:00"])
+        self.assertEqual([row[3] for row in hourly], [row[3] for row in native[3::4]])
+
+        # Split by tariff before the downsampling
+        for tariff in ("high", "low"):
+            native = self._read(f"energy-consumption-data-{tariff}-tariff-15min.tsv")
+            hourly = self._read(f"energy-consumption-data-{tariff}-tariff.tsv")
+            self.assertEqual(len(native), 4 * len(hourly))
+            self.assertEqual(hourly[-1][3], native[-1][3])
+
+        with SeyStore(OUTPUT_FOLDER) as store:
+            store.upsert_series(WATER_CONTRACT_ID, data_water)
+            self.assertEqual(store.series(WATER_CONTRACT_ID, DAY, DAY)[0].interval, 900)
+            self.assertEqual(find_gaps(store, WATER_CONTRACT_ID, DAY, DAY), [])
+            self.assertEqual(store.document(WATER_CONTRACT_ID, DAY, DAY)["timeseries"][0]["data"][0]["x"], "2025-10-26T00:15:00+02:00")
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+''' Test the multi-day backfill '''
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime
+
+from sey_meter_data_web_scraping.utils import SeyDataSaver, SeyWebScraper
+from sey_meter_data_web_scraping.__main__ import parse_args
+from . import OUTPUT_FOLDER
+from .fake_sey import ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+
+class BackfillTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def test_collect_range_in_chunks(self):
+        with FakeSeyServer() as server:
+            scrapper = SeyWebScraper(OUTPUT_FOLDER, base_url=server.url)
+            scrapper._set_header({"Authorization": server.token})
+
+            # 8 days over the switch to winter time
+            days = scrapper.collect_range(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 10, 22), datetime(2025, 10, 29), chunk_days=3)
+            scrapper.close()
+
+        self.assertEqual(len(server.requests), 6)
+        self.assertEqual([dt.day for dt, _, _ in days], list(range(22, 30)))
+        self.assertEqual([len(e[0]) for _, e, _ in days], [24, 24, 24, 24, 25, 24, 24, 24])
+        self.assertTrue(os.path.exists(os.path.join(OUTPUT_FOLDER, "water_json_data_20251028_20251029.json")))
+
+        for dt, data_electricity, data_water in days:
+            saver = SeyDataSaver(OUTPUT_FOLDER, dt)
+            saver.save_series(data_electricity, data_water)
+            saver.save_sums()
+
+        with open(os.path.join(OUTPUT_FOLDER, "last_sums.json"), "r", encoding="utf-8") as f:
+            sums = json.loads(f.read())
+
+        total = sum(sum(w[0].value) for _, _, w in days)
+        self.assertEqual(sums["date"], "20251029")
+        self.assertAlmostEqual(sums["sensor.sey_water_consumption"], total)
+        self.assertEqual(SeyDataSaver.last_date(OUTPUT_FOLDER), datetime(2025, 10, 29))
+
+    def test_parse_args(self):
+        args = parse_args(["--from", "20250801", "--to", "20250831"])
+        self.assertEqual((args.date_from, args.date_to), (datetime(2025, 8, 1), datetime(2025, 8, 31)))
+
+        self.assertEqual(parse_args(["20250818"]).date, datetime(2025, 8, 18))
+
+        with self.assertRaises(SystemExit):
+            parse_args(["20250818", "--from", "20250801"])
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
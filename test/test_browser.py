@@ -0,0 +1,99 @@
+''' Test the options of the browser '''
+
+import os
+import shutil
+import unittest
+from unittest.mock import patch
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.by import By
+
+from sey_meter_data_web_scraping.utils import ARTIFACTS_ALWAYS, ARTIFACTS_FOLDER, ARTIFACTS_OFF, BLOCKED_URLS, BROWSER_PROFILE_FOLDER, SeyWebScraper
+from . import OUTPUT_FOLDER
+
+
+class FakeElement:
+    screenshot_as_png = b"element"
+
+
+class FakeDriver:
+    ''' Page where only the username field exists '''
+
+    page_source = "<html></html>"
+
+    def find_element(self, by, selector):
+        if selector == "username":
+            return FakeElement()
+        raise NoSuchElementException(selector)
+
+    def get_screenshot_as_png(self):
+        return b"page"
+
+
+class BrowserTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def _start(self, lean_browser):
+        scrapper = SeyWebScraper(OUTPUT_FOLDER, lean_browser=lean_browser)
+        with patch("selenium.webdriver.Chrome") as chrome:
+            scrapper._start_driver()
+            scrapper.close()
+
+        return chrome.call_args.kwargs["options"], chrome.return_value
+
+    def test_lean_browser(self):
+        options, driver = self._start(True)
+
+        self.assertEqual(options.page_load_strategy, "eager")
+        self.assertIn(f"--user-data-dir={os.path.abspath(os.path.join(OUTPUT_FOLDER, BROWSER_PROFILE_FOLDER))}", options.arguments)
+        driver.execute_cdp_cmd.assert_any_call("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
+    def test_default_browser(self):
+        options, driver = self._start(False)
+
+        self.assertEqual(options.page_load_strategy, "normal")
+        self.assertFalse(any(argument.startswith("--user-data-dir") for argument in options.arguments))
+        driver.execute_cdp_cmd.assert_not_called()
+
+    def _login_fails(self, artifacts):
+        scrapper = SeyWebScraper(OUTPUT_FOLDER, artifacts=artifacts)
+        scrapper._driver = FakeDriver()
+
+        scrapper._screenshot("screenshot0.png")
+        with patch.object(FakeElement, "clear", create=True), patch.object(FakeElement, "send_keys", create=True):
+            scrapper._safe_send_keys(By.ID, "username", "user", "username.png")
+
+        with self.assertRaises(TimeoutException):
+            scrapper._safe_click(By.ID, "kc-login", timeout=0.01, retries=2)
+
+        artifacts_folder = os.path.join(OUTPUT_FOLDER, ARTIFACTS_FOLDER)
+        return [os.path.join(ARTIFACTS_FOLDER, folder, filename) for folder in sorted(os.listdir(artifacts_folder)) for filename in sorted(os.listdir(os.path.join(artifacts_folder, folder)))] if os.path.exists(artifacts_folder) else []
+
+    def test_artifacts_on_failure(self):
+        files = self._login_fails("on-failure")
+
+        self.assertEqual([os.path.basename(f) for f in files], ["00_screenshot0.png", "01_username.png", "02_error_attempt2_kc_login.png", "page_source.html", "timing.txt"])
+        self.assertEqual(sorted(os.listdir(OUTPUT_FOLDER)), [ARTIFACTS_FOLDER])
+
+        with open(os.path.join(OUTPUT_FOLDER, files[-1]), "r", encoding="utf-8") as f:
+            self.assertEqual([line.split("\t")[1] for line in f.read().splitlines()], ["screenshot0.png", "username.png", "error_attempt2_kc_login.png"])
+
+    def test_artifacts_always(self):
+        files = self._login_fails(ARTIFACTS_ALWAYS)
+
+        self.assertEqual(len(files), 5)
+        self.assertEqual(sorted(os.listdir(OUTPUT_FOLDER)), [ARTIFACTS_FOLDER, "error_attempt2_kc_login.png", "screenshot0.png", "username.png"])
+
+    def test_artifacts_off(self):
+        self.assertEqual(self._login_fails(ARTIFACTS_OFF), [])
+        self.assertEqual(os.listdir(OUTPUT_FOLDER), [])
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
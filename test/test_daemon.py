@@ -0,0 +1,139 @@
+''' Test the resident mode '''
+
+import os
+import shutil
+import time
+import unittest
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock, patch
+
+import requests
+
+from sey_meter_data_web_scraping.daemon import INCOMPLETE_DAY_MAX_AGE, MIDNIGHT_DELAY, POLL_MIN_INTERVAL, SeyDaemon
+from sey_meter_data_web_scraping.http_scraper import SeyHttpScraper
+from sey_meter_data_web_scraping.series import expected_samples
+from sey_meter_data_web_scraping.utils import SeyDataSaver, SeyScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import CLIENT_ID, ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+
+class DaemonTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def test_expected_samples(self):
+        self.assertEqual([expected_samples(date(2025, 3, 30)), expected_samples(date(2025, 10, 26)), expected_samples(date(2025, 10, 27))], [23, 25, 24])
+
+    def test_save_days_when_complete(self):
+        with FakeSeyServer() as server:
+            # The 27th is published until noon only
+            server.available_until = datetime(2025, 10, 27, 12)
+
+            def login():
+                scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url)
+                scrapper._set_header({"Authorization": server.token})
+                return scrapper
+
+            waits = []
+
+            def sleep(seconds):
+                waits.append(seconds)
+                if len(waits) == 3:
+                    server.available_until = None
+
+            login = Mock(side_effect=login)
+            daemon = SeyDaemon(login, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, OUTPUT_FOLDER,
+                               first_day=datetime(2025, 10, 25), now=lambda: datetime(2025, 10, 28, 9), sleep=sleep)
+            try:
+                daemon.run(cycles=4)
+            finally:
+                daemon.close()
+
+        # Saved up to the 26th, backoff while the 27th is incomplete, then wait for the next day
+        self.assertEqual(waits, [POLL_MIN_INTERVAL, POLL_MIN_INTERVAL, 2 * POLL_MIN_INTERVAL, 15 * 3600 + MIDNIGHT_DELAY])
+        self.assertEqual(SeyDataSaver.last_date(OUTPUT_FOLDER), datetime(2025, 10, 27))
+        self.assertEqual(login.call_count, 1)
+
+        with open(os.path.join(OUTPUT_FOLDER, "20251026-water-consumption-data.tsv"), "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 1 + 25)
+
+    def test_day_never_complete(self):
+        with FakeSeyServer() as server:
+            # The reading of noon on the 26th is never published
+            server.outages = [(datetime(2025, 10, 26, 12), datetime(2025, 10, 26, 12))]
+
+            def login():
+                scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url)
+                scrapper._set_header({"Authorization": server.token})
+                return scrapper
+
+            now = datetime(2025, 10, 28, 9)
+            daemon = SeyDaemon(login, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, OUTPUT_FOLDER,
+                               first_day=datetime(2025, 10, 25), now=lambda: now, sleep=lambda seconds: None)
+            try:
+                self.assertEqual(daemon.poll(), 1)
+
+                # Saved as it is once too old, the following days are not blocked
+                now += timedelta(days = INCOMPLETE_DAY_MAX_AGE)
+                self.assertEqual(daemon.poll(), 5)
+            finally:
+                daemon.close()
+
+        self.assertEqual(SeyDataSaver.last_date(OUTPUT_FOLDER), datetime(2025, 10, 30))
+        with open(os.path.join(OUTPUT_FOLDER, "20251026-water-consumption-data.tsv"), "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 1 + 24)
+
+    def test_token_expires_between_polls(self):
+        with FakeSeyServer(token=None) as server:
+            server.available_until = datetime(2025, 10, 27, 12)
+
+            def login():
+                scrapper = SeyHttpScraper(OUTPUT_FOLDER, base_url=server.url, issuer=server.issuer, client_id=CLIENT_ID)
+                scrapper.login("user", "password")
+                return scrapper
+
+            # Monotonic clock moved forward by the waits of the daemon
+            elapsed = []
+            monotonic = time.monotonic
+
+            def sleep(seconds):
+                elapsed.append(seconds)
+                server.available_until = None
+                server.token = "Bearer expired"
+
+            login = Mock(side_effect=login)
+            daemon = SeyDaemon(login, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, OUTPUT_FOLDER,
+                               first_day=datetime(2025, 10, 25), now=lambda: datetime(2025, 10, 28, 9), sleep=sleep)
+            try:
+                with patch("time.monotonic", side_effect=lambda: monotonic() + sum(elapsed)):
+                    daemon.run(cycles=2)
+            finally:
+                daemon.close()
+
+        # The expired token of the first login is renewed by the same scraper at the second poll
+        self.assertEqual(login.call_count, 1)
+        self.assertEqual(len(server.token_requests), 2)
+        self.assertEqual(SeyDataSaver.last_date(OUTPUT_FOLDER), datetime(2025, 10, 27))
+
+    def test_token_rejected_after_login(self):
+        with FakeSeyServer(token=None) as server:
+            scrapper = SeyHttpScraper(OUTPUT_FOLDER, base_url=server.url, issuer=server.issuer, client_id=CLIENT_ID)
+            try:
+                scrapper.login("user", "password")
+                server.token = "Bearer other"
+                with self.assertRaises(requests.HTTPError):
+                    scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 10, 25))
+            finally:
+                scrapper.close()
+
+        # A token refused right after its login is not renewed in a loop
+        self.assertEqual(len(server.token_requests), 1)
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+''' Test the offline export from the saved JSON '''
+
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sey_meter_data_web_scraping import export_json
+from sey_meter_data_web_scraping.__main__ import parse_args
+from sey_meter_data_web_scraping.export import index_json_files
+from sey_meter_data_web_scraping.utils import ELECTRICAL_JSON_FILENAME, SeyDataSaver
+from . import OUTPUT_FOLDER
+from .fake_sey import DEFAULT_CONTRACTS, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, generate_timeseries
+
+FIRST_DAY = datetime(2025, 10, 24)
+DAYS = 5  # Friday to Tuesday over the switch to winter time
+
+
+class ExportTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+        self.reference = os.path.join(OUTPUT_FOLDER, "reference")
+        os.mkdir(self.reference)
+
+    def write_json(self, folder, filename, first_day, last_day, revisions=None, interval=3600):
+        end_dt = last_day + timedelta(days = 1) - timedelta(minutes = 1)
+        for prefix, contract_id in (("electrical_data", ELECTRICAL_CONTRACT_ID), ("water_json_data", WATER_CONTRACT_ID)):
+            text = json.dumps(generate_timeseries(DEFAULT_CONTRACTS[contract_id], first_day, end_dt, revisions, interval))
+            with (gzip.open if filename.endswith(".gz") else open)(os.path.join(folder, prefix + filename), "wt", encoding="utf-8") as f:
+                f.write(text)
+
+    def export(self, max_workers):
+        ''' Export the days from the saved JSON into a new folder and return it '''
+
+        folder = os.path.join(OUTPUT_FOLDER, f"workers-{max_workers}")
+        os.mkdir(folder)
+
+        # A whole range fetched first then revised, the files saved later win
+        self.write_json(folder, "_20251024_20251028.json", FIRST_DAY, FIRST_DAY + timedelta(days = 4), {FIRST_DAY.date() + timedelta(days = i): 1.0 for i in range(DAYS)})
+        past = time.time() - 3600
+        os.utime(os.path.join(folder, "electrical_data_20251024_20251028.json"), (past, past))
+        os.utime(os.path.join(folder, "water_json_data_20251024_20251028.json"), (past, past))
+        self.write_json(folder, "_20251024.json", FIRST_DAY, FIRST_DAY)
+        self.write_json(folder, "_20251025_20251027.json.gz", FIRST_DAY + timedelta(days = 1), FIRST_DAY + timedelta(days = 3))
+        self.write_json(folder, "_20251028.json", FIRST_DAY + timedelta(days = 4), FIRST_DAY + timedelta(days = 4))
+
+        export_json(folder, FIRST_DAY, max_workers=max_workers)
+        return folder
+
+    def save_reference(self):
+        for i in range(DAYS):
+            dt = FIRST_DAY + timedelta(days = i)
+            end_dt = dt + timedelta(days = 1) - timedelta(minutes = 1)
+            saver = SeyDataSaver(self.reference, dt)
+            saver.save(generate_timeseries(DEFAULT_CONTRACTS[ELECTRICAL_CONTRACT_ID], dt, end_dt), generate_timeseries(DEFAULT_CONTRACTS[WATER_CONTRACT_ID], dt, end_dt))
+            saver.save_sums()
+
+    def assertSameExport(self, folder):
+        def read(filename):
+            with open(filename, "r", encoding="utf-8") as f:
+                return f.read()
+
+        expected = sorted(filename for filename in os.listdir(self.reference) if filename.endswith(".tsv"))
+        self.assertEqual(len(expected), DAYS * 10)
+        self.assertEqual(sorted(filename for filename in os.listdir(folder) if filename.endswith(".tsv")), expected)
+        for filename in expected + ["last_sums.json"]:
+            self.assertEqual(read(os.path.join(folder, filename)), read(os.path.join(self.reference, filename)), filename)
+
+        self.assertEqual(sorted(os.listdir(os.path.join(folder, "sums"))), sorted(os.listdir(os.path.join(self.reference, "sums"))))
+        for filename in os.listdir(os.path.join(self.reference, "sums")):
+            self.assertEqual(read(os.path.join(folder, "sums", filename)), read(os.path.join(self.reference, "sums", filename)), filename)
+
+    def test_index_of_revised_days(self):
+        folder = self.export(1)
+        files = index_json_files(folder, ELECTRICAL_JSON_FILENAME)
+
+        self.assertEqual(files[FIRST_DAY.date()], "electrical_data_20251024.json")
+        self.assertEqual(files[FIRST_DAY.date() + timedelta(days = 2)], "electrical_data_20251025_20251027.json.gz")
+        self.assertEqual(len(files), DAYS)
+
+    def test_index_prefers_most_recent_file(self):
+        folder = os.path.join(OUTPUT_FOLDER, "recent")
+        os.mkdir(folder)
+
+        # An incomplete day fetched first, then fetched again within a range by fill_gaps
+        self.write_json(folder, "_20251024.json", FIRST_DAY, FIRST_DAY)
+        past = time.time() - 86400
+        os.utime(os.path.join(folder, "electrical_data_20251024.json"), (past, past))
+        self.write_json(folder, "_20251024_20251026.json", FIRST_DAY, FIRST_DAY + timedelta(days = 2))
+
+        files = index_json_files(folder, ELECTRICAL_JSON_FILENAME)
+        self.assertEqual(files[FIRST_DAY.date()], "electrical_data_20251024_20251026.json")
+
+    def test_export_sequential(self):
+        self.save_reference()
+        self.assertSameExport(self.export(1))
+
+    def test_export_parallel(self):
+        self.save_reference()
+        self.assertSameExport(self.export(2))
+
+    def test_export_first_days_again(self):
+        self.save_reference()
+        for max_workers in (1, 2):
+            folder = self.export(max_workers)
+
+            # The saved days after the range are exported again from their JSON
+            export_json(folder, FIRST_DAY, FIRST_DAY + timedelta(days = 2), max_workers=max_workers)
+            self.assertSameExport(folder)
+
+    def test_missing_json_of_saved_day(self):
+        folder = self.export(2)
+        for filename in os.listdir(folder):
+            if filename.endswith("_20251028.json"):
+                os.remove(os.path.join(folder, filename))
+        os.remove(os.path.join(folder, "20251027-water-consumption-data.tsv"))
+
+        # Exporting the first days would invalidate the last one, which cannot be rebuilt
+        export_json(folder, FIRST_DAY, FIRST_DAY + timedelta(days = 2), max_workers=2)
+        self.assertEqual(len(os.listdir(os.path.join(folder, "sums"))), DAYS)
+        self.assertFalse(os.path.exists(os.path.join(folder, "20251027-water-consumption-data.tsv")))
+
+    def test_export_history_of_another_aggregation(self):
+        folder = os.path.join(OUTPUT_FOLDER, "aggregations")
+        os.mkdir(folder)
+
+        # Hourly responses saved before switching to samples of 15 minutes
+        self.write_json(folder, "_20251024.json", FIRST_DAY, FIRST_DAY)
+        self.write_json(folder, "_20251025.json", FIRST_DAY + timedelta(days = 1), FIRST_DAY + timedelta(days = 1), interval=900)
+        export_json(folder, FIRST_DAY, max_workers=1)
+
+        def lines(filename):
+            with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                return f.read().splitlines()
+
+        self.assertFalse(any(filename.startswith("20251024") and "-15min" in filename for filename in os.listdir(folder)))
+        self.assertEqual(len(lines("20251024-water-consumption-data.tsv")), 1 + 24)
+        self.assertEqual(lines("20251024-water-consumption-data.tsv")[1].split("\t")[2], "24.10.2025 00:00")
+        self.assertEqual(len(lines("20251025-water-consumption-data-15min.tsv")), 1 + 96)
+        self.assertEqual(lines("20251025-water-consumption-data-15min.tsv")[1].split("\t")[2], "25.10.2025 00:00")
+
+    def test_parse_export_args(self):
+        args = parse_args(["export", "--from", "20251024", "--workers", "2"])
+        self.assertEqual(args.command, "export")
+        self.assertEqual((args.date_from, args.date_to, args.workers), (datetime(2025, 10, 24), None, 2))
+
+        self.assertIsNone(parse_args(["20251024"]).command)
+
+        with self.assertRaises(SystemExit):
+            parse_args(["export", "--to", "20251028"])
+
+    def test_no_browser_import(self):
+        ''' The export and the saving of the files do not load the browser and HTTP libraries '''
+
+        code = "import sys, sey_meter_data_web_scraping.__main__; print(sorted({'selenium', 'requests', 'websocket'} & set(sys.modules)))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
@@ -5,10 +5,11 @@ import os
 import unittest
 import shutil
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from sey_meter_data_web_scraping.utils import SeyDataSaver
 from . import OUTPUT_FOLDER, REFERENCE_FOLDER
+from .fake_sey import DEFAULT_CONTRACTS, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, generate_timeseries
 
 class ExportCsvTestCase(unittest.TestCase):
 
@@ -37,6 +38,38 @@ class ExportCsvTestCase(unittest.TestCase):
 
         self.assertTrue(os.path.exists(os.path.join(OUTPUT_FOLDER, "last_sums.json")))
 
+    def test_export_is_unchanged(self):
+        ''' The exported files must stay byte-identical to the reference export '''
+
+        def load_data(filename):
+            with open(os.path.join(REFERENCE_FOLDER, filename), "r", encoding="utf-8") as f:
+                return json.loads(f.read())
+
+        data_electricity = load_data("electrical_data_20250818.json")
+        data_water = load_data("water_json_data_20250818.json")
+        days = [(datetime(2024, 6, 20), data_electricity, data_water), (datetime(2024, 6, 21), data_electricity, data_water)]
+
+        # Friday to Monday over the switch to winter time
+        for i in range(4):
+            dt = datetime(2025, 10, 24) + timedelta(days = i)
+            end_dt = dt + timedelta(days = 1) - timedelta(minutes = 1)
+            days.append((dt, generate_timeseries(DEFAULT_CONTRACTS[ELECTRICAL_CONTRACT_ID], dt, end_dt), generate_timeseries(DEFAULT_CONTRACTS[WATER_CONTRACT_ID], dt, end_dt)))
+
+        for dt, data_electricity, data_water in days:
+            saver = SeyDataSaver(OUTPUT_FOLDER, dt)
+            saver.save(data_electricity, data_water)
+            saver.save_sums()
+
+        files = []
+        for filename in sorted(os.listdir(OUTPUT_FOLDER)):
+            if os.path.isdir(os.path.join(OUTPUT_FOLDER, filename)):
+                continue
+            with open(os.path.join(OUTPUT_FOLDER, filename), "r", encoding="utf-8") as f:
+                files.append(f"### {filename}\n" + f.read())
+
+        with open(os.path.join(REFERENCE_FOLDER, "expected_export.txt"), "r", encoding="utf-8") as f:
+            self.assertEqual("\n".join(files), f.read())
+
     def tearDown(self):
         if os.path.exists(OUTPUT_FOLDER):
             shutil.rmtree(OUTPUT_FOLDER)
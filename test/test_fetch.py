@@ -0,0 +1,58 @@
+''' Test the concurrent fetching of the contracts '''
+
+import os
+import shutil
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from sey_meter_data_web_scraping.utils import SeyScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import SUBJECT_ID, FakeSeyServer
+
+CONTRACTS = {f"contract-{i}": ["1-1:1.29.0*255"] for i in range(4)}
+
+
+class FetchTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def _collect(self, server, **kwargs):
+        scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, **kwargs)
+        scrapper._set_header({"Authorization": server.token})
+        try:
+            return scrapper.collect_contracts(list(CONTRACTS), SUBJECT_ID, datetime(2025, 8, 1), datetime(2025, 8, 10), chunk_days=5)
+        finally:
+            scrapper.close()
+
+    def test_requests_run_concurrently(self):
+        with FakeSeyServer(contracts=CONTRACTS, latency=0.2) as server:
+            start = time.perf_counter()
+            contracts = self._collect(server, max_workers=8)
+            elapsed = time.perf_counter() - start
+
+        # 8 requests of 0.2 s each
+        self.assertEqual(len(server.requests), 8)
+        self.assertLess(elapsed, 0.2 * 4)
+        self.assertEqual(sorted(contracts), sorted(CONTRACTS))
+        self.assertEqual(len(contracts["contract-3"]), 10)
+        self.assertTrue(all(len(d[0]) == 24 for d in contracts["contract-0"].values()))
+
+    def test_transient_failures_are_retried(self):
+        with FakeSeyServer(contracts=CONTRACTS) as server:
+            server.failures = 3
+            with patch("sey_meter_data_web_scraping.utils.HTTP_BACKOFF", 0.0):
+                contracts = self._collect(server, max_workers=2)
+
+        self.assertEqual(len(server.requests), 8 + 3)
+        self.assertEqual(len(contracts["contract-1"]), 10)
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+''' Test the multi-account runner '''
+
+import os
+import shutil
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from sey_meter_data_web_scraping.fleet import run_fleet
+from sey_meter_data_web_scraping.utils import SeyWebScraper
+from . import OUTPUT_FOLDER
+
+
+class FakeChrome:
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, options=None):
+        with FakeChrome.lock:
+            FakeChrome.running += 1
+            FakeChrome.max_running = max(FakeChrome.max_running, FakeChrome.running)
+
+    def quit(self):
+        with FakeChrome.lock:
+            FakeChrome.running -= 1
+
+
+class FleetTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        FakeChrome.running = FakeChrome.max_running = 0
+        self._accounts = [{"NAME": f"account{i}", "DATA_FOLDER": os.path.join(OUTPUT_FOLDER, f"account{i}")} for i in range(5)]
+
+    def test_browser_pool_and_failure_isolation(self):
+        done = []
+
+        def collect(account, browser_pool):
+            if account["NAME"] == "account2":
+                raise RuntimeError("Login failed")
+
+            scrapper = SeyWebScraper(account["DATA_FOLDER"], browser_pool=browser_pool)
+            try:
+                scrapper._start_driver()
+                time.sleep(0.05)
+            finally:
+                scrapper.close()
+            done.append(account["NAME"])
+
+        with patch("selenium.webdriver.Chrome", FakeChrome):
+            failed = run_fleet(self._accounts, collect, browser_pool_size=2)
+
+        self.assertEqual(failed, ["account2"])
+        self.assertEqual(sorted(done), ["account0", "account1", "account3", "account4"])
+        self.assertEqual(FakeChrome.max_running, 2)
+        self.assertEqual(FakeChrome.running, 0)
+        self.assertTrue(all(os.path.isdir(account["DATA_FOLDER"]) for account in self._accounts))
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+''' Test the detection and the refetch of the missing readings '''
+
+import json
+import os
+import shutil
+import unittest
+from datetime import date, datetime, timedelta
+
+from sey_meter_data_web_scraping import export_from_store, refetch_gaps
+from sey_meter_data_web_scraping.gaps import coalesce_days, find_gaps
+from sey_meter_data_web_scraping.store import SeyStore
+from sey_meter_data_web_scraping.utils import SeyScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import DEFAULT_CONTRACTS, ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer, generate_timeseries
+
+DATE_FROM = datetime(2025, 10, 20)
+DATE_TO = datetime(2025, 10, 29)
+
+
+def fill_store(folder, with_gaps):
+    with SeyStore(folder) as store:
+        for i in range((DATE_TO - DATE_FROM).days + 1):
+            dt = DATE_FROM + timedelta(days = i)
+            end_dt = dt + timedelta(days = 1) - timedelta(minutes = 1)
+            data_electricity = generate_timeseries(DEFAULT_CONTRACTS[ELECTRICAL_CONTRACT_ID], dt, end_dt)
+            data_water = generate_timeseries(DEFAULT_CONTRACTS[WATER_CONTRACT_ID], dt, end_dt)
+
+            if with_gaps:
+                if dt.day == 22:
+                    # Day skipped
+                    continue
+                if dt.day in (23, 28):
+                    del data_water['timeseries'][0]['data'][10:13]
+                if dt.day == 24:
+                    del data_electricity['timeseries'][1]['data'][-1]
+
+            store.upsert(ELECTRICAL_CONTRACT_ID, data_electricity)
+            store.upsert(WATER_CONTRACT_ID, data_water)
+
+    export_from_store(folder, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, DATE_FROM, DATE_TO)
+
+
+class GapsTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def test_coalesce_days(self):
+        days = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 5), date(2025, 1, 9), date(2025, 3, 1)]
+        self.assertEqual(coalesce_days(days), [(date(2025, 1, 1), date(2025, 1, 5)), (date(2025, 1, 9), date(2025, 1, 9)), (date(2025, 3, 1), date(2025, 3, 1))])
+        self.assertEqual(coalesce_days([date(2025, 1, 1) + timedelta(days = i) for i in range(40)], max_span=31)[0], (date(2025, 1, 1), date(2025, 1, 31)))
+
+    def test_refetch_gaps(self):
+        fill_store(OUTPUT_FOLDER, with_gaps=True)
+
+        with SeyStore(OUTPUT_FOLDER) as store:
+            obis, = DEFAULT_CONTRACTS[WATER_CONTRACT_ID]
+            self.assertEqual(find_gaps(store, WATER_CONTRACT_ID, DATE_FROM, DATE_TO), [
+                (obis, date(2025, 10, 22), 24),
+                (obis, date(2025, 10, 23), 3),
+                (obis, date(2025, 10, 28), 3),
+            ])
+            self.assertEqual(len(find_gaps(store, ELECTRICAL_CONTRACT_ID, DATE_FROM, DATE_TO)), 3)
+
+        with FakeSeyServer() as server:
+            scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, save_json=False)
+            scrapper._set_header({"Authorization": server.token})
+            try:
+                remaining = refetch_gaps(scrapper, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, OUTPUT_FOLDER, DATE_FROM, DATE_TO)
+            finally:
+                scrapper.close()
+
+        # Electricity: 22 to 24, water: 22 to 23 and 28
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(remaining, [])
+
+        # The sums are the ones of a history without gaps
+        reference_folder = os.path.join(OUTPUT_FOLDER, "reference")
+        os.mkdir(reference_folder)
+        fill_store(reference_folder, with_gaps=False)
+
+        def load_sums(folder):
+            with open(os.path.join(folder, "last_sums.json"), "r", encoding="utf-8") as f:
+                return json.loads(f.read())
+
+        self.assertEqual(load_sums(OUTPUT_FOLDER)['date'], "20251029")
+        self.assertEqual(load_sums(OUTPUT_FOLDER), load_sums(reference_folder))
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+''' Test the import of the statistics into Home Assistant '''
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime
+
+from sey_meter_data_web_scraping.homeassistant import STATISTICS_OUTBOX_FILENAME, HomeAssistantError, HomeAssistantStatistics
+from sey_meter_data_web_scraping.utils import SeyDataSaver, SeyScraper
+from . import OUTPUT_FOLDER
+from .fake_home_assistant import FakeHomeAssistant
+from .fake_sey import ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+
+class HomeAssistantTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def test_push_several_days(self):
+        with FakeSeyServer() as server:
+            scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, save_json=False)
+            scrapper._set_header({"Authorization": server.token})
+            days = scrapper.collect_range(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 10, 25), datetime(2025, 10, 27))
+
+        with FakeHomeAssistant() as home_assistant:
+            statistics = HomeAssistantStatistics(home_assistant.url, home_assistant.token)
+            try:
+                for dt, data_electricity, data_water in days:
+                    saver = SeyDataSaver(OUTPUT_FOLDER, dt, statistics=statistics)
+                    saver.save_series(data_electricity, data_water)
+                    saver.save_sums()
+                statistics.flush()
+            finally:
+                statistics.close()
+
+        # One connection and one message per statistic ID for the three days
+        statistic_ids = [message["metadata"]["statistic_id"] for message in home_assistant.messages]
+        self.assertEqual(home_assistant.connections, 1)
+        self.assertEqual(len(statistic_ids), len(set(statistic_ids)))
+        self.assertIn("sensor.sey_water_consumption", statistic_ids)
+
+        # Same sums as the generated files
+        water = home_assistant.statistics("sensor.sey_water_consumption")
+        self.assertEqual(len(water), 24 + 25 + 24)
+        self.assertEqual(water[0]["start"], "2025-10-25T00:00:00+02:00")
+        with open(os.path.join(OUTPUT_FOLDER, "20251027-water-consumption-data.tsv"), "r", encoding="utf-8") as f:
+            self.assertEqual(f"{water[-1]['sum']:.3f}", f.read().splitlines()[-1].split("\t")[-1])
+
+    def test_authentication_refused(self):
+        with FakeHomeAssistant() as home_assistant:
+            statistics = HomeAssistantStatistics(home_assistant.url, "wrong")
+            statistics.add("sensor.sey_water_consumption", "m³", [1761343200], [7200], [1.0])
+            with self.assertRaises(HomeAssistantError):
+                statistics.flush()
+            statistics.close()
+
+    def test_statistics_refused(self):
+        with FakeHomeAssistant(refused=["sensor.sey_water_cost"]) as home_assistant:
+            statistics = HomeAssistantStatistics(home_assistant.url, home_assistant.token)
+            statistics.add("sensor.sey_water_consumption", "m³", [1761343200], [7200], [1.0])
+            statistics.add("sensor.sey_water_cost", "CHF/m³", [1761343200], [7200], [2.5])
+            with self.assertRaisesRegex(HomeAssistantError, "sensor.sey_water_cost"):
+                statistics.flush()
+            statistics.close()
+
+        # The other statistics are imported anyway
+        self.assertEqual(home_assistant.statistics("sensor.sey_water_consumption"), [{"start": "2025-10-25T00:00:00+02:00", "sum": 1.0}])
+
+    def test_statistic_ids_of_accounts(self):
+        with FakeHomeAssistant() as home_assistant:
+            for account in ("Home", "Chalet Lac"):
+                statistics = HomeAssistantStatistics(home_assistant.url, home_assistant.token, account=account)
+                statistics.add("sensor.sey_water_consumption", "m³", [1761343200], [7200], [1.0])
+                statistics.flush()
+                statistics.close()
+
+        self.assertEqual([message["metadata"]["statistic_id"] for message in home_assistant.messages], ["sensor.sey_home_water_consumption", "sensor.sey_chalet_lac_water_consumption"])
+
+    def test_failed_statistics_are_retried(self):
+        outbox = os.path.join(OUTPUT_FOLDER, STATISTICS_OUTBOX_FILENAME)
+
+        with FakeHomeAssistant(refused=["sensor.sey_water_cost"]) as home_assistant:
+            statistics = HomeAssistantStatistics(home_assistant.url, home_assistant.token, folder=OUTPUT_FOLDER)
+            statistics.add("sensor.sey_water_consumption", "m³", [1761343200], [7200], [1.0])
+            statistics.add("sensor.sey_water_cost", "CHF/m³", [1761343200], [7200], [2.5])
+            with self.assertRaises(HomeAssistantError):
+                statistics.flush()
+            statistics.close()
+            url = home_assistant.url
+
+        # Only the refused statistics are kept, Home Assistant is unreachable at the next run
+        statistics = HomeAssistantStatistics(url, home_assistant.token, folder=OUTPUT_FOLDER)
+        statistics.add("sensor.sey_water_cost", "CHF/m³", [1761346800], [7200], [5.0])
+        with self.assertRaises(OSError):
+            statistics.flush()
+
+        with open(outbox, "r", encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.read()), {"sensor.sey_water_cost": ["CHF/m³", [{"start": "2025-10-25T00:00:00+02:00", "sum": 2.5}, {"start": "2025-10-25T01:00:00+02:00", "sum": 5.0}]]})
+
+        with FakeHomeAssistant() as home_assistant:
+            statistics = HomeAssistantStatistics(home_assistant.url, home_assistant.token, folder=OUTPUT_FOLDER)
+            statistics.flush()
+            statistics.close()
+
+        self.assertEqual(len(home_assistant.statistics("sensor.sey_water_cost")), 2)
+        self.assertFalse(os.path.exists(outbox))
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
@@ -0,0 +1,81 @@
+''' Test the HTTP login engine against a fake keycloak '''
+
+import os
+import shutil
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from sey_meter_data_web_scraping import LOGIN_ENGINE_HTTP, CollectOptions, login_scraper
+from sey_meter_data_web_scraping.http_scraper import SeyHttpScraper, SeyLoginError
+from sey_meter_data_web_scraping.token_cache import TokenCache
+from sey_meter_data_web_scraping.utils import SeyWebScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import CLIENT_ID, ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+
+class HttpLoginTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+        self._server = FakeSeyServer(token=None).start()
+
+    def _scraper(self, token_cache=None):
+        return SeyHttpScraper(OUTPUT_FOLDER, token_cache, base_url=self._server.url, issuer=self._server.issuer, client_id=CLIENT_ID)
+
+    def test_login_and_collect(self):
+        scrapper = self._scraper()
+        try:
+            scrapper.login("user", "password")
+            data_electricity, data_water = scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 8, 18))
+        finally:
+            scrapper.close()
+
+        self.assertEqual(self._server.token_requests[0]["grant_type"], "authorization_code")
+        self.assertEqual(len(data_electricity[1]), 24)
+        self.assertEqual(len(data_water[0]), 24)
+
+    def test_wrong_password(self):
+        scrapper = self._scraper()
+        try:
+            with self.assertRaises(SeyLoginError):
+                scrapper.login("user", "wrong")
+        finally:
+            scrapper.close()
+
+    def test_refresh_token_is_used(self):
+        cache = TokenCache(OUTPUT_FOLDER)
+        scrapper = self._scraper(cache)
+        scrapper.login("user", "password")
+        scrapper.close()
+
+        # Expire the access token, keep the refresh token
+        cache.store(cache.header()["Authorization"], expires_at=0, refresh_token=cache.refresh_token)
+
+        scrapper = self._scraper(TokenCache(OUTPUT_FOLDER))
+        try:
+            scrapper.login("user", "password")
+            scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 8, 18))
+        finally:
+            scrapper.close()
+
+        self.assertEqual([r["grant_type"] for r in self._server.token_requests], ["authorization_code", "refresh_token"])
+
+    def test_fallback_to_selenium(self):
+        with patch.object(SeyWebScraper, "_login") as browser_login:
+            scrapper = login_scraper("user", "wrong", OUTPUT_FOLDER, CollectOptions(token_cache=False, login_engine=LOGIN_ENGINE_HTTP, keycloak={"issuer": self._server.issuer, "client_id": CLIENT_ID}))
+            scrapper.close()
+
+        self.assertIsInstance(scrapper, SeyWebScraper)
+        browser_login.assert_called_once()
+
+    def tearDown(self):
+        self._server.stop()
+
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,8 +41,8 @@ class ImportDataTestCase(unittest.TestCase):
             
             data_electricity, data_water = scrapper.collect(self._electrical_contract_id, self._water_contract_id, self._subject_id, dt)
 
-            save_data(os.path.join(OUTPUT_FOLDER, "data_electricity.json"), json.dumps(data_electricity, indent=3))
-            save_data(os.path.join(OUTPUT_FOLDER, "data_water.json"), json.dumps(data_water, indent=3))
+            save_data(os.path.join(OUTPUT_FOLDER, "data_electricity.json"), json.dumps({'timeseries': [s.to_timeserie() for s in data_electricity]}, indent=3))
+            save_data(os.path.join(OUTPUT_FOLDER, "data_water.json"), json.dumps({'timeseries': [s.to_timeserie() for s in data_water]}, indent=3))
 
             self.assertIsNotNone(data_electricity)
             self.assertIsNotNone(data_water)
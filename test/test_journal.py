@@ -0,0 +1,123 @@
+''' Test the journal of the sums '''
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime, timedelta
+
+from sey_meter_data_web_scraping import export_from_store
+from sey_meter_data_web_scraping.journal import SumsJournal, SumsJournalError
+from sey_meter_data_web_scraping.store import SeyStore
+from sey_meter_data_web_scraping.utils import SeyDataSaver
+from . import OUTPUT_FOLDER
+from .fake_sey import DEFAULT_CONTRACTS, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, generate_timeseries
+
+
+def day_data(dt):
+    end_dt = dt + timedelta(days = 1) - timedelta(minutes = 1)
+    return generate_timeseries(DEFAULT_CONTRACTS[ELECTRICAL_CONTRACT_ID], dt, end_dt), generate_timeseries(DEFAULT_CONTRACTS[WATER_CONTRACT_ID], dt, end_dt)
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def save_day(self, dt, data_electricity=None, data_water=None):
+        if data_electricity is None:
+            data_electricity, data_water = day_data(dt)
+
+        saver = SeyDataSaver(OUTPUT_FOLDER, dt)
+        saver.save(data_electricity, data_water)
+        return saver.save_sums()
+
+    def load_json(self, *path):
+        with open(os.path.join(OUTPUT_FOLDER, *path), "r", encoding="utf-8") as f:
+            return json.loads(f.read())
+
+    def test_save_same_day_again(self):
+        self.save_day(datetime(2025, 10, 24))
+        self.save_day(datetime(2025, 10, 25))
+        sums = self.load_json("last_sums.json")
+
+        # The second run of a day starts again from the previous day instead of adding the day twice
+        self.assertEqual(self.save_day(datetime(2025, 10, 25)), [])
+        self.assertEqual(self.load_json("last_sums.json"), sums)
+        self.assertEqual(SumsJournal(OUTPUT_FOLDER).days(), ["20251024", "20251025"])
+
+    def test_invalidate_later_days(self):
+        for i in range(3):
+            self.save_day(datetime(2025, 10, 24) + timedelta(days = i))
+        sums = self.load_json("last_sums.json")
+
+        self.assertEqual(self.save_day(datetime(2025, 10, 25)), ["20251026"])
+        self.assertEqual(SumsJournal(OUTPUT_FOLDER).days(), ["20251024", "20251025"])
+        self.assertEqual(SeyDataSaver.last_date(OUTPUT_FOLDER), datetime(2025, 10, 25))
+        self.assertEqual(self.load_json("last_sums.json"), self.load_json("sums", "20251025.json"))
+
+        self.save_day(datetime(2025, 10, 26))
+        self.assertEqual(self.load_json("last_sums.json"), sums)
+
+    def test_import_last_sums(self):
+        with open(os.path.join(OUTPUT_FOLDER, "last_sums.json"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"sensor.sey_water_consumption": 10.0, "date": "20251023"}))
+
+        self.assertEqual(SeyDataSaver.last_date(OUTPUT_FOLDER), datetime(2025, 10, 23))
+
+        data_electricity, data_water = day_data(datetime(2025, 10, 24))
+        self.save_day(datetime(2025, 10, 24), data_electricity, data_water)
+
+        total = sum(sample["y"] for sample in data_water["timeseries"][0]["data"])
+        self.assertAlmostEqual(self.load_json("last_sums.json")["sensor.sey_water_consumption"], 10.0 + total)
+
+    def test_save_imported_day_again(self):
+        with open(os.path.join(OUTPUT_FOLDER, "last_sums.json"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"sensor.sey_water_consumption": 10.0, "date": "20251023"}))
+        self.save_day(datetime(2025, 10, 24))
+        sums = self.load_json("last_sums.json")
+
+        # The sums before the imported day are unknown, they are not reset to zero
+        with self.assertRaises(SumsJournalError):
+            self.save_day(datetime(2025, 10, 23))
+        self.assertEqual(self.load_json("last_sums.json"), sums)
+        self.assertEqual(SumsJournal(OUTPUT_FOLDER).days(), ["20251023", "20251024"])
+
+    def test_load_before_gap(self):
+        self.save_day(datetime(2025, 10, 24))
+        self.save_day(datetime(2025, 10, 26))
+
+        journal = SumsJournal(OUTPUT_FOLDER)
+        self.assertEqual(journal.load_before("20251027"), self.load_json("sums", "20251026.json"))
+        self.assertEqual(journal.load_before("20251026"), self.load_json("sums", "20251024.json"))
+        self.assertEqual(journal.load_before("20251024"), {})
+
+    def test_export_from_store(self):
+        days = [datetime(2025, 10, 24) + timedelta(days = i) for i in range(3)]
+        with SeyStore(OUTPUT_FOLDER) as store:
+            for dt in days:
+                data_electricity, data_water = day_data(dt)
+                store.upsert(ELECTRICAL_CONTRACT_ID, data_electricity)
+                store.upsert(WATER_CONTRACT_ID, data_water)
+                self.save_day(dt, data_electricity, data_water)
+
+        sums = self.load_json("last_sums.json")
+        with open(os.path.join(OUTPUT_FOLDER, "20251026-water-consumption-data.tsv"), "r", encoding="utf-8") as f:
+            export = f.read()
+
+        export_from_store(OUTPUT_FOLDER, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, days[1], days[2])
+
+        self.assertEqual(self.load_json("last_sums.json"), sums)
+        with open(os.path.join(OUTPUT_FOLDER, "20251026-water-consumption-data.tsv"), "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), export)
+
+        # Only the checkpoints are left, no temporary file
+        self.assertEqual(sorted(os.listdir(os.path.join(OUTPUT_FOLDER, "sums"))), [f"{dt:%Y%m%d}.json" for dt in days])
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
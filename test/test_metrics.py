@@ -0,0 +1,89 @@
+''' Test the run log and the metrics file '''
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from sey_meter_data_web_scraping.metrics import METRICS_FILENAME, RUN_LOG_FILENAME, Metrics
+from sey_meter_data_web_scraping.utils import SeyDataSaver, SeyScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def _run_log(self):
+        with open(os.path.join(OUTPUT_FOLDER, RUN_LOG_FILENAME), "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_spans_of_a_run(self):
+        metrics = Metrics(OUTPUT_FOLDER, "home")
+
+        with FakeSeyServer() as server:
+            server.failures = 1
+            scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, save_json=False, max_workers=1, metrics=metrics)
+            scrapper._set_header({"Authorization": server.token})
+            try:
+                with patch("sey_meter_data_web_scraping.utils.HTTP_BACKOFF", 0.0):
+                    data_electricity, data_water = scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 8, 18))
+            finally:
+                scrapper.close()
+
+        saver = SeyDataSaver(OUTPUT_FOLDER, datetime(2025, 8, 18), metrics=metrics)
+        saver.save_series(data_electricity, data_water)
+        saver.save_sums()
+        metrics.flush()
+
+        lines = self._run_log()
+        self.assertEqual([line["span"] for line in lines], ["api_call", "api_call", "export", "save_sums", "run"])
+        self.assertTrue(all(line["account"] == "home" and line["status"] == "ok" for line in lines))
+
+        api_calls = {line["contract"]: line for line in lines[:2]}
+        self.assertEqual(api_calls[ELECTRICAL_CONTRACT_ID]["samples"], 48)
+        self.assertEqual(api_calls[WATER_CONTRACT_ID]["status_code"], 200)
+        self.assertGreater(api_calls[WATER_CONTRACT_ID]["bytes"], 0)
+        self.assertEqual(lines[2]["samples"], 72)
+        self.assertEqual(lines[-1]["counters"], {"http_retries": 1, "samples": 72, "response_bytes": sum(line["bytes"] for line in lines[:2])})
+
+        with open(os.path.join(OUTPUT_FOLDER, METRICS_FILENAME), "r", encoding="utf-8") as f:
+            prom = f.read().splitlines()
+        self.assertIn('sey_meter_data_phase_count{account="home",phase="api_call"} 2', prom)
+        self.assertIn('sey_meter_data_http_retries{account="home"} 1', prom)
+        self.assertIn('sey_meter_data_last_run_success{account="home"} 1', prom)
+
+    def test_failed_span(self):
+        metrics = Metrics(OUTPUT_FOLDER)
+        with self.assertRaises(TimeoutError):
+            with metrics.span("contracts_wait"):
+                raise TimeoutError()
+        metrics.flush(success=False)
+
+        # Nothing recorded since the last flush: no new run
+        metrics.flush()
+
+        lines = self._run_log()
+        self.assertEqual([(line["span"], line["status"]) for line in lines], [("contracts_wait", "error"), ("run", "error")])
+        self.assertEqual(lines[0]["error"], "TimeoutError")
+
+    def test_disabled(self):
+        metrics = Metrics()
+        with metrics.span("export") as span:
+            span["samples"] = 1
+        metrics.count("http_retries")
+        metrics.flush()
+
+        self.assertEqual(os.listdir(OUTPUT_FOLDER), [])
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+''' Test the skip of the unchanged responses of the SEY API '''
+
+import json
+import os
+import shutil
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from sey_meter_data_web_scraping import save_days
+from sey_meter_data_web_scraping.journal import SumsJournal
+from sey_meter_data_web_scraping.response_cache import ResponseCache
+from sey_meter_data_web_scraping.utils import SeyDataSaver, SeyScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+DATE_FROM = datetime(2025, 10, 20)
+DATE_TO = datetime(2025, 10, 29)
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def _backfill(self, server, date_from=DATE_FROM, date_to=DATE_TO):
+        ''' Collect and save the days with a new scraper, return the saved days '''
+
+        responses = ResponseCache(OUTPUT_FOLDER)
+        scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, save_json=False, response_cache=responses)
+        scrapper._set_header({"Authorization": server.token})
+        try:
+            days = scrapper.collect_range(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, date_from, date_to)
+        finally:
+            scrapper.close()
+
+        with patch.object(SeyDataSaver, "save_series", autospec=True, side_effect=SeyDataSaver.save_series) as save_series:
+            save_days(OUTPUT_FOLDER, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, days)
+        responses.save()
+
+        return [call.args[0]._date for call in save_series.call_args_list]
+
+    def _water_sum(self):
+        with open(os.path.join(OUTPUT_FOLDER, "last_sums.json"), "r", encoding="utf-8") as f:
+            return json.loads(f.read())["sensor.sey_water_consumption"]
+
+    def test_unchanged_and_revised_responses(self):
+        with FakeSeyServer() as server:
+            self.assertEqual(len(self._backfill(server)), 10)
+            water_sum = self._water_sum()
+
+            # Same answers: nothing is parsed nor saved
+            with patch("sey_meter_data_web_scraping.utils.parse_meterdatavalues", side_effect=AssertionError("Parsed")):
+                self.assertEqual(self._backfill(server), [])
+
+            # A revised day is saved again with the later days only
+            server.revisions = {date(2025, 10, 25): 1.0}
+            saved = self._backfill(server)
+
+        self.assertEqual(saved, [f"202510{day}" for day in range(25, 30)])
+        self.assertAlmostEqual(self._water_sum(), water_sum + 24 * 1.0)
+
+    def test_revised_day_inside_saved_range(self):
+        with FakeSeyServer() as server:
+            self._backfill(server)
+            water_sum = self._water_sum()
+
+            # Backfill of the first days only, the saved days after them are saved again from the store
+            server.revisions = {date(2025, 10, 21): 1.0}
+            saved = self._backfill(server, DATE_FROM, datetime(2025, 10, 22))
+
+        self.assertEqual(saved, [f"202510{day}" for day in range(21, 30)])
+        self.assertEqual(SumsJournal(OUTPUT_FOLDER).days(), [f"202510{day}" for day in range(20, 30)])
+        self.assertAlmostEqual(self._water_sum(), water_sum + 24 * 1.0)
+
+        with open(os.path.join(OUTPUT_FOLDER, "20251029-water-consumption-data.tsv"), "r", encoding="utf-8") as f:
+            self.assertEqual(f"{self._water_sum():.3f}", f.read().splitlines()[-1].split("\t")[-1])
+
+    def test_saved_json_of_unchanged_responses(self):
+        saved = []
+        with FakeSeyServer() as server:
+            for _ in range(2):
+                scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, compress_json=True, response_cache=ResponseCache(OUTPUT_FOLDER))
+                scrapper._set_header({"Authorization": server.token})
+                try:
+                    days = scrapper.collect_range(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, DATE_FROM, DATE_TO)
+                finally:
+                    scrapper.close()
+                scrapper._response_cache.save()
+                saved.append(len(days))
+
+        # Parsed from the file written while hashing at the first run, only the file is kept at the second
+        self.assertEqual(saved, [10, 0])
+        self.assertEqual(sorted(filename for filename in os.listdir(OUTPUT_FOLDER) if "json_data" in filename or "electrical" in filename), ["electrical_data_20251020_20251029.json.gz", "water_json_data_20251020_20251029.json.gz"])
+
+    def test_interrupted_run_is_fetched_again(self):
+        responses = ResponseCache(OUTPUT_FOLDER)
+        key = "el-contract/subject/20251020-20251029/2"
+        self.assertFalse(responses.unchanged(key, "abc"))
+        self.assertTrue(responses.unchanged(key, "abc"))
+
+        # Not saved: the response is new for the next run
+        self.assertFalse(ResponseCache(OUTPUT_FOLDER).unchanged(key, "abc"))
+
+        responses.save()
+        self.assertTrue(ResponseCache(OUTPUT_FOLDER).unchanged(key, "abc"))
+        self.assertFalse(ResponseCache(OUTPUT_FOLDER).unchanged(key, "def"))
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
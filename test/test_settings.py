@@ -4,6 +4,7 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
+from sey_meter_data_web_scraping import CollectOptions
 from sey_meter_data_web_scraping import __main__ as main
 
 
@@ -30,6 +31,63 @@ class SettingsLoadingTestCase(unittest.TestCase):
             self.assertEqual(settings["SEY_ELECTRICAL_CONTRACT_ID"], "el-contract")
             self.assertEqual(settings["SEY_WATER_CONTRACT_ID"], "water-contract")
             self.assertEqual(settings["DATA_FOLDER"], "/config/sey")
+            self.assertEqual(settings["ACCOUNTS"], [])
+
+    def test_load_settings_with_several_accounts(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            options_path = Path(tmpdir) / "options.json"
+            options = {
+                "data_folder": "/config/sey",
+                "browser_pool_size": 2,
+                "accounts": [
+                    {"name": "home", "sey_username": "user1", "sey_password": "pass1", "sey_subject_id": "s1", "sey_electrical_contract_id": "e1", "sey_water_contract_id": "w1"},
+                    {"name": "chalet", "sey_username": "user2", "sey_password": "pass2", "sey_subject_id": "s2", "sey_electrical_contract_id": "e2", "sey_water_contract_id": "w2", "data_folder": "/config/chalet"},
+                ],
+            }
+            options_path.write_text(json.dumps(options), encoding="utf-8")
+
+            with patch.object(main, "OPTIONS_FILE", options_path):
+                settings = main.load_settings()
+
+            self.assertEqual(settings["BROWSER_POOL_SIZE"], 2)
+            self.assertEqual([account["NAME"] for account in settings["ACCOUNTS"]], ["home", "chalet"])
+            self.assertEqual(settings["ACCOUNTS"][0]["SEY_USERNAME"], "user1")
+            self.assertEqual(settings["ACCOUNTS"][0]["DATA_FOLDER"], "/config/sey/home")
+            self.assertEqual(settings["ACCOUNTS"][1]["DATA_FOLDER"], "/config/chalet")
+
+    def test_run_collection_passes_the_settings_as_options(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            options_path = Path(tmpdir) / "options.json"
+            options_path.write_text(json.dumps({"data_folder": tmpdir, "login_engine": "http", "sample_interval": 15, "metrics": False}), encoding="utf-8")
+
+            with patch.object(main, "OPTIONS_FILE", options_path):
+                settings = main.load_settings()
+
+            with patch.object(main, "collect_meterdatavalues") as collect:
+                main.run_collection(settings, settings, main.parse_args(["20251024"]), {})
+
+            *args, options = collect.call_args.args
+            self.assertEqual(len(args), 7)
+            self.assertIsInstance(options, CollectOptions)
+            self.assertEqual((options.login_engine, options.sample_interval, options.tariffs), ("http", 900, {}))
+            self.assertIsNone(options.statistics)
+
+    def test_daemon_option_with_command_line_mode(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            options_path = Path(tmpdir) / "options.json"
+            options_path.write_text(json.dumps({"data_folder": tmpdir, "daemon": True, "metrics": False}), encoding="utf-8")
+
+            with patch.object(main, "OPTIONS_FILE", options_path):
+                settings = main.load_settings()
+
+            # The daemon option applies only without a date, --from or --no-daemon
+            for argv, expected in (([], "daemon"), (["20251024"], "day"), (["--from", "20251024", "--to", "20251026"], "range"), (["--no-daemon"], "day")):
+                with patch.object(main, "run_daemon") as daemon, patch.object(main, "collect_meterdatavalues") as day, patch.object(main, "collect_meterdatavalues_range") as days:
+                    main.run_collection(settings, settings, main.parse_args(argv), {})
+                self.assertEqual({"daemon": daemon.called, "day": day.called, "range": days.called}, {"daemon": expected == "daemon", "day": expected == "day", "range": expected == "range"}, argv)
+
+        with self.assertRaises(SystemExit):
+            main.parse_args(["--daemon", "--no-daemon"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+''' Test the local store of the readings '''
+
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime
+
+from sey_meter_data_web_scraping import regenerate, regenerate_json
+from sey_meter_data_web_scraping.__main__ import parse_args
+from sey_meter_data_web_scraping.series import MeterSeries
+from sey_meter_data_web_scraping.store import SeyStore
+from . import OUTPUT_FOLDER, REFERENCE_FOLDER
+from .fake_sey import DEFAULT_CONTRACTS, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, generate_timeseries
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def test_upsert_is_idempotent(self):
+        data = generate_timeseries(DEFAULT_CONTRACTS[ELECTRICAL_CONTRACT_ID], datetime(2025, 3, 1), datetime(2025, 3, 31, 23, 59))
+
+        with SeyStore(OUTPUT_FOLDER) as store:
+            self.assertEqual(store.upsert(ELECTRICAL_CONTRACT_ID, data), 2 * 31 * 24 - 2)
+            self.assertEqual(store.upsert(ELECTRICAL_CONTRACT_ID, data), 0)
+
+            data['timeseries'][1]['data'][5]['y'] += 1.0
+            self.assertEqual(store.upsert(ELECTRICAL_CONTRACT_ID, data), 1)
+
+            self.assertEqual(len(store.days(ELECTRICAL_CONTRACT_ID)), 31)
+
+            # The switch to summer time makes the 30th of March 23 hours long
+            series = store.series(ELECTRICAL_CONTRACT_ID, datetime(2025, 3, 30), datetime(2025, 3, 31))
+            self.assertEqual([s.obis for s in series], DEFAULT_CONTRACTS[ELECTRICAL_CONTRACT_ID])
+            self.assertEqual(len(series[0]), 23 + 24)
+
+    def test_change_of_aggregation(self):
+        hourly = generate_timeseries(DEFAULT_CONTRACTS[WATER_CONTRACT_ID], datetime(2025, 10, 1), datetime(2025, 10, 2, 23, 59))
+        quarterly = generate_timeseries(DEFAULT_CONTRACTS[WATER_CONTRACT_ID], datetime(2025, 10, 2), datetime(2025, 10, 2, 23, 59), interval=900)
+
+        with SeyStore(OUTPUT_FOLDER) as store:
+            store.upsert(WATER_CONTRACT_ID, hourly)
+            store.upsert_series(WATER_CONTRACT_ID, [MeterSeries.from_timeserie(timeserie, 900) for timeserie in quarterly['timeseries']])
+
+            # The hourly readings are not returned along with the readings every 15 minutes
+            self.assertEqual(set(store.intervals(WATER_CONTRACT_ID).values()), {900})
+            self.assertEqual(store.days(WATER_CONTRACT_ID), [datetime(2025, 10, 2).date()])
+            series = store.series(WATER_CONTRACT_ID, datetime(2025, 10, 1), datetime(2025, 10, 2))
+            self.assertEqual(len(series[0]), 96)
+
+    def test_regenerate_json(self):
+        with open(os.path.join(REFERENCE_FOLDER, "electrical_data_20250818.json"), "r", encoding="utf-8") as f:
+            data_electricity = json.loads(f.read())
+        with open(os.path.join(REFERENCE_FOLDER, "water_json_data_20250818.json"), "r", encoding="utf-8") as f:
+            data_water = json.loads(f.read())
+
+        with SeyStore(OUTPUT_FOLDER) as store:
+            store.upsert(ELECTRICAL_CONTRACT_ID, data_electricity)
+            store.upsert(WATER_CONTRACT_ID, data_water)
+
+        regenerate_json(OUTPUT_FOLDER, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, datetime(2025, 8, 18), datetime(2025, 8, 18))
+
+        with open(os.path.join(OUTPUT_FOLDER, "electrical_data_20250818.json"), "r", encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.read()), data_electricity)
+        with open(os.path.join(OUTPUT_FOLDER, "water_json_data_20250818.json"), "r", encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.read()), data_water)
+
+    def test_regenerate(self):
+        with SeyStore(OUTPUT_FOLDER) as store:
+            for contract_id in (ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID):
+                store.upsert(contract_id, generate_timeseries(DEFAULT_CONTRACTS[contract_id], datetime(2025, 10, 24), datetime(2025, 10, 26, 23, 59)))
+
+        args = parse_args(["regenerate", "--from", "20251001"])
+        self.assertEqual((args.command, args.date_from, args.date_to), ("regenerate", datetime(2025, 10, 1), None))
+
+        # From the first stored day to the last one
+        regenerate(OUTPUT_FOLDER, ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, args.date_from, args.date_to)
+
+        filenames = os.listdir(OUTPUT_FOLDER)
+        self.assertEqual(sorted(filename for filename in filenames if filename.startswith("water_json_data")), [f"water_json_data_202510{day}.json" for day in (24, 25, 26)])
+        self.assertEqual(sorted(filename for filename in filenames if filename.endswith("water-consumption-data.tsv")), [f"202510{day}-water-consumption-data.tsv" for day in (24, 25, 26)])
+        self.assertEqual(sorted(os.listdir(os.path.join(OUTPUT_FOLDER, "sums"))), [f"202510{day}.json" for day in (24, 25, 26)])
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+''' Test the incremental parsing and the capture of the responses '''
+
+import gzip
+import json
+import os
+import shutil
+import unittest
+from datetime import datetime
+
+from sey_meter_data_web_scraping.series import MeterSeries
+from sey_meter_data_web_scraping.stream import parse_meterdatavalues
+from sey_meter_data_web_scraping.utils import SeyScraper
+from . import OUTPUT_FOLDER, REFERENCE_FOLDER
+from .fake_sey import ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class StreamTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def test_parse_in_chunks(self):
+        with open(os.path.join(REFERENCE_FOLDER, "electrical_data_20250818.json"), "rb") as f:
+            data = f.read()
+
+        expected = [MeterSeries.from_timeserie(timeserie) for timeserie in json.loads(data)['timeseries']]
+
+        # Chunks of 1 byte split the numbers, the keywords and the UTF-8 characters
+        for size in (1, 7, 4096):
+            series_list = parse_meterdatavalues(split(data, size))
+            self.assertEqual([s.to_timeserie() for s in series_list], [s.to_timeserie() for s in expected])
+            self.assertEqual([s.obis for s in series_list], [s.obis for s in expected])
+
+        with self.assertRaises(ValueError):
+            parse_meterdatavalues(split(data[:-100], 7))
+
+    def test_capture_compressed(self):
+        with FakeSeyServer() as server:
+            scrapper = SeyScraper(OUTPUT_FOLDER, base_url=server.url, compress_json=True)
+            scrapper._set_header({"Authorization": server.token})
+            try:
+                data_electricity, data_water = scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 8, 18))
+            finally:
+                scrapper.close()
+
+        self.assertEqual(sorted(os.listdir(OUTPUT_FOLDER)), ["electrical_data_20250818.json.gz", "water_json_data_20250818.json.gz"])
+
+        with gzip.open(os.path.join(OUTPUT_FOLDER, "electrical_data_20250818.json.gz"), "rb") as f:
+            document = json.loads(f.read())
+
+        self.assertEqual(document, {'timeseries': [s.to_timeserie() for s in data_electricity]})
+        self.assertEqual(len(data_water[0]), 24)
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+''' Test the tariff schedule '''
+
+import unittest
+from array import array
+from datetime import datetime, timezone
+
+from sey_meter_data_web_scraping.tariffs import DEFAULT_TARIFFS, TariffSchedule, hour_of_week
+
+
+def local_time(*args):
+    ''' Local time in seconds since the epoch, as if local time was UTC '''
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def period(valid_from, price, holidays=()):
+    return {
+        "valid_from": valid_from,
+        "high_tariff": [{"weekdays": [0, 1, 2, 3, 4], "hours": [[6, 22]]}],
+        "holidays": list(holidays),
+        "prices": {"electricity_consumption": {"unit": "ct", "vat": 0.0, "high": [price], "low": [price / 2]}},
+    }
+
+
+class TariffsTestCase(unittest.TestCase):
+
+    def test_default_high_tariff_windows(self):
+        schedule = TariffSchedule(DEFAULT_TARIFFS)
+
+        # One week from Monday 2025-08-18 00:00
+        local_times = array('q', (local_time(2025, 8, 18) + 3600 * i for i in range(168)))
+        mask = schedule.high_tariff_mask(local_times)
+
+        for i, t in enumerate(local_times):
+            weekday, hour = i // 24, i % 24
+            if weekday < 4:
+                expected = 6 <= hour < 22
+            else:
+                expected = 10 <= hour < 13 or 17 <= hour < 22
+            self.assertEqual(mask[i], expected, f"weekday {weekday} hour {hour}")
+            self.assertEqual(hour_of_week(t), i)
+
+    def test_price_of_the_year_of_the_sample(self):
+        schedule = TariffSchedule({"periods": [period("2025-01-01", 30.0), period("2024-01-01", 20.0)]})
+
+        # Tuesday 2024-12-31 and Wednesday 2025-01-01 at 12:00
+        local_times = array('q', [local_time(2023, 12, 5, 12), local_time(2024, 12, 31, 12), local_time(2025, 1, 1, 12), local_time(2025, 1, 1, 23)])
+
+        self.assertEqual(list(schedule.prices("electricity_consumption", local_times)), [0.2, 0.2, 0.3, 0.15])
+
+    def test_holidays_use_the_sunday_tariff(self):
+        schedule = TariffSchedule({"periods": [period("2025-01-01", 30.0, ["2025-08-01"])]})
+
+        # Friday 2025-08-01 is a holiday, Monday 2025-08-04 is not
+        local_times = array('q', [local_time(2025, 7, 31, 12), local_time(2025, 8, 1, 12), local_time(2025, 8, 4, 12)])
+
+        self.assertEqual(list(schedule.high_tariff_mask(local_times)), [1, 0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+''' Test the persistent authorization token cache '''
+
+import base64
+import json
+import os
+import shutil
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from sey_meter_data_web_scraping.token_cache import TokenCache
+from sey_meter_data_web_scraping.utils import SeyWebScraper
+from . import OUTPUT_FOLDER
+from .fake_sey import ELECTRICAL_CONTRACT_ID, SUBJECT_ID, WATER_CONTRACT_ID, FakeSeyServer, generate_performance_log
+
+
+def make_token(exp, name="user"):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii").rstrip("=")
+
+    return f"Bearer {encode({'alg': 'none'})}.{encode({'exp': exp, 'name': name})}.signature"
+
+
+class TokenCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if not os.path.exists(OUTPUT_FOLDER):
+            os.mkdir(OUTPUT_FOLDER)
+
+    def test_token_is_reused_until_expiry(self):
+        token = make_token(time.time() + 3600)
+
+        TokenCache(OUTPUT_FOLDER).store(token, refresh_token="refresh")
+
+        cache = TokenCache(OUTPUT_FOLDER)
+        self.assertEqual(cache.header(), {"Authorization": token})
+        self.assertEqual(cache.refresh_token, "refresh")
+
+        cache.store(make_token(time.time() - 1))
+        self.assertIsNone(TokenCache(OUTPUT_FOLDER).header())
+
+        cache.invalidate()
+        self.assertIsNone(TokenCache(OUTPUT_FOLDER).header())
+
+    def test_collect_without_browser(self):
+        token = make_token(time.time() + 3600)
+        TokenCache(OUTPUT_FOLDER).store(token)
+
+        with FakeSeyServer(token=token) as server:
+            scrapper = SeyWebScraper(OUTPUT_FOLDER, TokenCache(OUTPUT_FOLDER), base_url=server.url)
+
+            with patch.object(SeyWebScraper, "_start_driver", side_effect=AssertionError("Browser started")):
+                scrapper.login("user", "password")
+                data_electricity, data_water = scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 8, 18))
+                scrapper.logout()
+                scrapper.close()
+
+        self.assertEqual(len(data_electricity), 2)
+        self.assertEqual(len(data_electricity[0]), 24)
+        self.assertEqual(len(data_water), 1)
+
+    def test_rejected_token_falls_back_to_browser_login(self):
+        stale_token = make_token(time.time() + 3600, "stale")
+        fresh_token = make_token(time.time() + 3600, "fresh")
+        TokenCache(OUTPUT_FOLDER).store(stale_token)
+
+        with FakeSeyServer(token=fresh_token) as server:
+            scrapper = SeyWebScraper(OUTPUT_FOLDER, TokenCache(OUTPUT_FOLDER), base_url=server.url)
+
+            def browser_login():
+                scrapper._driver = object()
+                scrapper._set_header({"Authorization": fresh_token})
+                scrapper._token_cache.store(fresh_token)
+
+            with patch.object(scrapper, "_login", side_effect=browser_login) as login:
+                scrapper.login("user", "password")
+                scrapper.collect(ELECTRICAL_CONTRACT_ID, WATER_CONTRACT_ID, SUBJECT_ID, datetime(2025, 8, 18))
+
+            self.assertEqual(login.call_count, 1)
+
+        self.assertEqual(TokenCache(OUTPUT_FOLDER).header(), {"Authorization": fresh_token})
+
+    def test_token_from_performance_log(self):
+        token = make_token(time.time() + 3600)
+        log = generate_performance_log(token)
+        scrapper = SeyWebScraper(OUTPUT_FOLDER)
+        scrapper.close()
+
+        # A token sent to another server before the calls to the API is ignored
+        other = generate_performance_log("Bearer other", events=0)[-1]
+        other["message"] = other["message"].replace("/ebpapi/", "/analytics/")
+
+        self.assertEqual(scrapper._get_authorization_token_id([other] + log), {"Authorization": token})
+        self.assertEqual(scrapper._get_authorization_token_id(log[:-2] + [other]), {"Authorization": "Bearer other"})
+        self.assertIsNone(scrapper._get_authorization_token_id(log[:-2]))
+
+    def tearDown(self):
+        if os.path.exists(OUTPUT_FOLDER):
+            shutil.rmtree(OUTPUT_FOLDER)
+
+if __name__ == '__main__':
+    unittest.main()